@@ -8,7 +8,7 @@ from alembic import context
 
 from app.config import get_settings
 from app.db.base import Base
-from app.models import User, Document, EmbeddingMeta, Chat  # noqa: F401
+from app.models import User, Document, EmbeddingMeta, IngestionJob, Chat  # noqa: F401
 
 config = context.config
 if config.config_file_name is not None:
@@ -0,0 +1,46 @@
+"""Background ingestion jobs.
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "002"
+down_revision: Union[str, None] = "001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ingestion_jobs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("document_id", sa.Integer(), nullable=False),
+        sa.Column("status", sa.String(20), nullable=False),
+        sa.Column("file_path", sa.String(1024), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("pages_total", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("pages_parsed", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("chunks_total", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("chunks_embedded", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(["document_id"], ["documents.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_ingestion_jobs_id"), "ingestion_jobs", ["id"], unique=False)
+    op.create_index(op.f("ix_ingestion_jobs_document_id"), "ingestion_jobs", ["document_id"], unique=False)
+    op.create_index(op.f("ix_ingestion_jobs_status"), "ingestion_jobs", ["status"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_ingestion_jobs_status"), table_name="ingestion_jobs")
+    op.drop_index(op.f("ix_ingestion_jobs_document_id"), table_name="ingestion_jobs")
+    op.drop_index(op.f("ix_ingestion_jobs_id"), table_name="ingestion_jobs")
+    op.drop_table("ingestion_jobs")
@@ -0,0 +1,33 @@
+"""Content hashes for upload deduplication; reused-chunk counter on jobs.
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "003"
+down_revision: Union[str, None] = "002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("documents", sa.Column("content_hash", sa.String(64), nullable=True))
+    op.create_index(op.f("ix_documents_content_hash"), "documents", ["content_hash"], unique=False)
+    op.add_column(
+        "ingestion_jobs",
+        sa.Column("chunks_reused", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("ingestion_jobs") as batch_op:
+        batch_op.drop_column("chunks_reused")
+    op.drop_index(op.f("ix_documents_content_hash"), table_name="documents")
+    with op.batch_alter_table("documents") as batch_op:
+        batch_op.drop_column("content_hash")
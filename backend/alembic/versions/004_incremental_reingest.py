@@ -0,0 +1,40 @@
+"""Incremental re-ingestion: stable Chroma ids on embeddings, update jobs.
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "004"
+down_revision: Union[str, None] = "003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("embeddings", sa.Column("vector_id", sa.String(64), nullable=True))
+    op.add_column(
+        "ingestion_jobs",
+        sa.Column("kind", sa.String(16), nullable=False, server_default="ingest"),
+    )
+    op.add_column("ingestion_jobs", sa.Column("filename", sa.String(512), nullable=True))
+    op.add_column("ingestion_jobs", sa.Column("content_hash", sa.String(64), nullable=True))
+    op.add_column(
+        "ingestion_jobs",
+        sa.Column("chunks_removed", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("ingestion_jobs") as batch_op:
+        batch_op.drop_column("chunks_removed")
+        batch_op.drop_column("content_hash")
+        batch_op.drop_column("filename")
+        batch_op.drop_column("kind")
+    with op.batch_alter_table("embeddings") as batch_op:
+        batch_op.drop_column("vector_id")
@@ -0,0 +1,53 @@
+"""FTS5 full-text index over embeddings.chunk_text, synced by triggers.
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "005"
+down_revision: Union[str, None] = "004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "sqlite":
+        # FTS5 is SQLite-only; /documents/search reports 501 on other backends
+        return
+    op.execute(
+        """CREATE VIRTUAL TABLE embeddings_fts USING fts5(
+            chunk_text, content='embeddings', content_rowid='id', tokenize='unicode61'
+        )"""
+    )
+    op.execute(
+        """CREATE TRIGGER embeddings_fts_ai AFTER INSERT ON embeddings BEGIN
+            INSERT INTO embeddings_fts(rowid, chunk_text) VALUES (new.id, new.chunk_text);
+        END"""
+    )
+    op.execute(
+        """CREATE TRIGGER embeddings_fts_ad AFTER DELETE ON embeddings BEGIN
+            INSERT INTO embeddings_fts(embeddings_fts, rowid, chunk_text) VALUES ('delete', old.id, old.chunk_text);
+        END"""
+    )
+    op.execute(
+        """CREATE TRIGGER embeddings_fts_au AFTER UPDATE OF chunk_text ON embeddings BEGIN
+            INSERT INTO embeddings_fts(embeddings_fts, rowid, chunk_text) VALUES ('delete', old.id, old.chunk_text);
+            INSERT INTO embeddings_fts(rowid, chunk_text) VALUES (new.id, new.chunk_text);
+        END"""
+    )
+    # Index chunks ingested before this migration
+    op.execute("INSERT INTO embeddings_fts(embeddings_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    op.execute("DROP TRIGGER IF EXISTS embeddings_fts_au")
+    op.execute("DROP TRIGGER IF EXISTS embeddings_fts_ad")
+    op.execute("DROP TRIGGER IF EXISTS embeddings_fts_ai")
+    op.execute("DROP TABLE IF EXISTS embeddings_fts")
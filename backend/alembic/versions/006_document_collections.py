@@ -0,0 +1,27 @@
+"""Document collections for scoped chat retrieval.
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "006"
+down_revision: Union[str, None] = "005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("documents", sa.Column("collection", sa.String(128), nullable=True))
+    op.create_index(op.f("ix_documents_collection"), "documents", ["collection"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_documents_collection"), table_name="documents")
+    with op.batch_alter_table("documents") as batch_op:
+        batch_op.drop_column("collection")
@@ -0,0 +1,27 @@
+"""Composite indexes for chat history and per-document chunk queries.
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "007"
+down_revision: Union[str, None] = "006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_chats_user_id_timestamp", "chats", ["user_id", "timestamp"], unique=False)
+    op.create_index(
+        "ix_embeddings_document_id_chunk_index", "embeddings", ["document_id", "chunk_index"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_embeddings_document_id_chunk_index", table_name="embeddings")
+    op.drop_index("ix_chats_user_id_timestamp", table_name="chats")
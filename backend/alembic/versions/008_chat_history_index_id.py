@@ -0,0 +1,25 @@
+"""Add chats.id to the chat history index so keyset pages are index ranges.
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "008"
+down_revision: Union[str, None] = "007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_chats_user_id_timestamp_id", "chats", ["user_id", "timestamp", "id"], unique=False)
+    op.drop_index("ix_chats_user_id_timestamp", table_name="chats")
+
+
+def downgrade() -> None:
+    op.create_index("ix_chats_user_id_timestamp", "chats", ["user_id", "timestamp"], unique=False)
+    op.drop_index("ix_chats_user_id_timestamp_id", table_name="chats")
@@ -7,12 +7,24 @@ from sqlalchemy import select
 from app.db.session import get_db
 from app.models import User
 from app.schemas.auth import UserCreate, UserLogin, UserResponse, Token
-from app.core.security import get_password_hash, verify_password, create_access_token
+from app.core.security import (
+    create_access_token,
+    get_password_hash_async,
+    needs_rehash,
+    verify_password_async,
+)
 from app.core.dependencies import get_current_user
+from app.core.executors import ExecutorSaturated
+from app.core.principals import Principal
 
 router = APIRouter()
 
 
+def _issue_token(user: User) -> str:
+    # uid/role claims let get_current_user skip the users query (core/principals.py)
+    return create_access_token(subject=user.email, claims={"uid": user.id, "role": user.role})
+
+
 @router.post("/register", response_model=Token)
 async def register(
     body: UserCreate,
@@ -28,13 +40,13 @@ async def register(
     user = User(
         name=body.name,
         email=body.email,
-        password=get_password_hash(body.password),
+        password=await get_password_hash_async(body.password),
         role=body.role if body.role in ("admin", "user") else "user",
     )
     db.add(user)
     await db.flush()
     await db.refresh(user)
-    access_token = create_access_token(subject=user.email)
+    access_token = _issue_token(user)
     return Token(
         access_token=access_token,
         user=UserResponse.model_validate(user),
@@ -49,12 +61,18 @@ async def login(
     """Login with email and password."""
     result = await db.execute(select(User).where(User.email == body.email))
     user = result.scalar_one_or_none()
-    if not user or not verify_password(body.password, user.password):
+    if not user or not await verify_password_async(body.password, user.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password",
         )
-    access_token = create_access_token(subject=user.email)
+    if needs_rehash(user.password):
+        # BCRYPT_ROUNDS changed since this hash was made; upgrade it while we have the password
+        try:
+            user.password = await get_password_hash_async(body.password)
+        except ExecutorSaturated:
+            pass  # next login will retry; don't fail a valid login over it
+    access_token = _issue_token(user)
     return Token(
         access_token=access_token,
         user=UserResponse.model_validate(user),
@@ -62,6 +80,16 @@ async def login(
 
 
 @router.get("/me", response_model=UserResponse)
-async def me(current_user: User = Depends(get_current_user)):
+async def me(
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
     """Return current authenticated user."""
-    return UserResponse.model_validate(current_user)
+    user = await db.get(User, current_user.id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return UserResponse.model_validate(user)
@@ -1,31 +1,76 @@
-"""Chat and RAG: ask question, get answer with sources; chat history."""
+"""Chat and RAG: ask question, get answer with sources; chat history and export."""
 
-from fastapi import APIRouter, Depends, Query
+import asyncio
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
-from app.db.session import get_db
-from app.models import User, Chat as ChatModel
-from app.schemas.chat import ChatRequest, ChatResponse, SourceItem, ChatHistoryItem, ChatHistoryResponse
-from app.core.dependencies import get_current_user
-from app.services.rag import rag_query
+from app.db.session import get_db, AsyncSessionLocal
+from app.models import Chat as ChatModel, Document as DocumentModel, User
+from app.config import get_settings
+from app.schemas.chat import (
+    ChatBatchItem,
+    ChatBatchRequest,
+    ChatExportItem,
+    ChatHistoryItem,
+    ChatHistoryResponse,
+    ChatRequest,
+    ChatResponse,
+    ChatScope,
+    SourceItem,
+)
+from app.core.dependencies import get_current_user, require_role
+from app.core.principals import Principal
+from app.core.executors import get_cpu_executor
+from app.core.executors import ExecutorSaturated
+from app.core.metrics import CHAT_STAGE_SECONDS
+from app.services.chat_history import history_page, iter_history
+from app.services.cursors import InvalidCursor
+from app.services.rag import Retrieval, retrieve, retrieve_many, agenerate, stream_generate, LLMError
 
 router = APIRouter()
 
 
+async def _resolve_scope(db: AsyncSession, body: ChatScope) -> tuple[int, ...] | None:
+    """Document ids a chat request is restricted to (None = whole corpus); 404 if the
+    requested documents or collection do not exist."""
+    if body.document_ids is None and body.collection is None:
+        return None
+    query = select(DocumentModel.id)
+    if body.document_ids is not None:
+        query = query.where(DocumentModel.id.in_(set(body.document_ids)))
+    if body.collection is not None:
+        query = query.where(DocumentModel.collection == body.collection)
+    found = set((await db.execute(query)).scalars().all())
+    missing = sorted(set(body.document_ids or ()) - found)
+    if missing and body.collection is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Documents not found: {missing}")
+    if not found:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No documents in the requested scope")
+    return tuple(sorted(found))
+
+
 @router.post("/", response_model=ChatResponse)
 async def chat(
     body: ChatRequest,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
-    """Submit a question; RAG retrieves context and returns answer with sources."""
+    """Submit a question; RAG retrieves context and returns answer with sources.
+
+    document_ids / collection restrict retrieval to those documents.
+    """
     question = (body.question or "").strip()
     if not question:
         return ChatResponse(response="Please provide a question.", sources=[])
 
-    response_text, sources = rag_query(question, top_k=5)
-    source_items = [SourceItem(text=s["text"], metadata=s["metadata"]) for s in sources]
+    scope = await _resolve_scope(db, body)
+    retrieval = await get_cpu_executor().run(retrieve, question, 5, scope)
+    response_text = retrieval.answer if retrieval.answer is not None else await agenerate(retrieval)
+    source_items = [SourceItem(text=s["text"], metadata=s["metadata"]) for s in retrieval.sources]
 
     chat_row = ChatModel(
         user_id=current_user.id,
@@ -33,25 +78,164 @@ async def chat(
         response=response_text,
     )
     db.add(chat_row)
-    await db.flush()
+    # Committed here rather than by get_db so "persist" covers the write, as in _save_chats
+    with CHAT_STAGE_SECONDS.time("persist"):
+        await db.commit()
+
+    return ChatResponse(response=response_text, sources=source_items, context=retrieval.context_stats)
+
+
+def _sse(event: str, data: dict) -> str:
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _save_chat(user_id: int, question: str, response: str) -> None:
+    """Persist a chat row in its own session (the request session is closed while streaming)."""
+    await _save_chats(user_id, [(question, response)])
+
+
+async def _save_chats(user_id: int, rows: list[tuple[str, str]]) -> None:
+    """Persist (question, response) chat rows in one transaction of their own session."""
+    with CHAT_STAGE_SECONDS.time("persist"):
+        async with AsyncSessionLocal() as session:
+            session.add_all(ChatModel(user_id=user_id, question=q, response=r) for q, r in rows)
+            await session.commit()
+
+
+@router.post("/stream")
+async def chat_stream(
+    body: ChatRequest,
+    current_user: Principal = Depends(get_current_user),
+):
+    """
+    Same as POST /chat/ but streams the answer as Server-Sent Events:
+    one `sources` event, then `token` events as Ollama generates, then `done` with the
+    context usage report (or `error`). The chat row is saved once the stream completes.
+    """
+    question = (body.question or "").strip()
+    user_id = current_user.id
+    retrieval = None
+    if question:
+        # Short-lived session: none is held open while the answer streams
+        async with AsyncSessionLocal() as session:
+            scope = await _resolve_scope(session, body)
+        # Retrieve before the response starts so a saturated pool still yields 503
+        retrieval = await get_cpu_executor().run(retrieve, question, 5, scope)
+
+    async def events():
+        if retrieval is None:
+            yield _sse("sources", {"sources": []})
+            yield _sse("token", {"text": "Please provide a question."})
+            yield _sse("done", {})
+            return
+        yield _sse("sources", {"sources": retrieval.sources})
+        if retrieval.answer is not None:
+            response_text = retrieval.answer
+            yield _sse("token", {"text": response_text})
+        else:
+            parts: list[str] = []
+            try:
+                async for token in stream_generate(retrieval):
+                    parts.append(token)
+                    yield _sse("token", {"text": token})
+                response_text = "".join(parts).strip()
+            except LLMError as e:
+                response_text = str(e)
+                yield _sse("error", {"message": response_text})
+        await _save_chat(user_id, question, response_text)
+        yield _sse("done", {"context": retrieval.context_stats})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/batch")
+async def chat_batch(
+    body: ChatBatchRequest,
+    current_user: Principal = Depends(get_current_user),
+):
+    """
+    Answer many questions (same optional scope as POST /chat/) in one request.
+
+    All distinct questions are embedded in one encode call and retrieved with one
+    vector-store query; LLM generations then run at most chat_batch_concurrency at a
+    time. The response is NDJSON: one ChatBatchItem per question, written as soon as
+    its answer is ready (completion order; `index` gives the request position).
+    Repeated questions are answered once.
+    """
+    questions = [(q or "").strip() for q in body.questions]
+    user_id = current_user.id
+    async with AsyncSessionLocal() as session:
+        scope = await _resolve_scope(session, body)
+    distinct = list(dict.fromkeys(q for q in questions if q))
+    # Retrieve before the response starts so a saturated pool still yields 503
+    retrievals = await get_cpu_executor().run(retrieve_many, distinct, 5, scope)
+    semaphore = asyncio.Semaphore(max(1, get_settings().chat_batch_concurrency))
+
+    async def answer(retrieval: Retrieval) -> tuple[Retrieval, str]:
+        if retrieval.answer is not None:
+            return retrieval, retrieval.answer
+        async with semaphore:
+            try:
+                return retrieval, await agenerate(retrieval)
+            except ExecutorSaturated:
+                return retrieval, "Local LLM is busy, please retry shortly."
+
+    def line(index: int, response: str, retrieval: Retrieval | None = None) -> str:
+        item = ChatBatchItem(
+            index=index,
+            question=questions[index],
+            response=response,
+            sources=retrieval.sources if retrieval else [],
+            context=retrieval.context_stats if retrieval else None,
+        )
+        return item.model_dump_json() + "\n"
+
+    async def lines():
+        for index, question in enumerate(questions):
+            if not question:
+                yield line(index, "Please provide a question.")
+        positions: dict[str, list[int]] = {}
+        for index, question in enumerate(questions):
+            if question:
+                positions.setdefault(question, []).append(index)
+        tasks = [asyncio.create_task(answer(r)) for r in retrievals]
+        saved: list[tuple[str, str]] = []
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                retrieval, response_text = await next_done
+                for index in positions[retrieval.question]:
+                    saved.append((retrieval.question, response_text))
+                    yield line(index, response_text, retrieval)
+        finally:
+            # Client went away mid-stream: stop pending generations
+            for task in tasks:
+                task.cancel()
+        if body.save_history and saved:
+            await _save_chats(user_id, saved)
 
-    return ChatResponse(response=response_text, sources=source_items)
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
 
 @router.get("/history", response_model=ChatHistoryResponse)
 async def chat_history(
     limit: int = Query(50, ge=1, le=100),
+    cursor: str | None = Query(None),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
-    """Return current user's recent chat history."""
-    result = await db.execute(
-        select(ChatModel)
-        .where(ChatModel.user_id == current_user.id)
-        .order_by(ChatModel.timestamp.desc())
-        .limit(limit)
-    )
-    rows = result.scalars().all()
+    """Return current user's chat history, newest first.
+
+    Keyset-paginated on (timestamp, id): pass next_cursor back as cursor for older rows.
+    """
+    try:
+        rows, next_cursor = await history_page(db, current_user.id, limit=limit, cursor=cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     items = [
         ChatHistoryItem(
             id=r.id,
@@ -61,4 +245,44 @@ async def chat_history(
         )
         for r in rows
     ]
-    return ChatHistoryResponse(items=items)
+    return ChatHistoryResponse(items=items, next_cursor=next_cursor)
+
+
+@router.get("/export")
+async def export_history(
+    user_id: int | None = Query(None, description="Only this user's chats (default: everyone's)"),
+    _admin: Principal = Depends(require_role("admin")),
+):
+    """
+    Stream chat history as NDJSON (one ChatExportItem per line, oldest first). Admin only.
+
+    Rows are read through a server-side cursor and written batch by batch, so memory
+    stays flat for exports of any size.
+    """
+    if user_id is not None:
+        async with AsyncSessionLocal() as session:
+            if await session.get(User, user_id) is None:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+
+    async def lines():
+        # Own session: it lives as long as the stream, not the request handler
+        async with AsyncSessionLocal() as session:
+            async for batch in iter_history(session, user_id):
+                yield "".join(
+                    ChatExportItem(
+                        id=r.id,
+                        user_id=r.user_id,
+                        question=r.question,
+                        response=r.response,
+                        timestamp=r.timestamp.isoformat() if r.timestamp else "",
+                    ).model_dump_json()
+                    + "\n"
+                    for r in batch
+                )
+
+    filename = f"chats-user-{user_id}.ndjson" if user_id is not None else "chats.ndjson"
+    return StreamingResponse(
+        lines(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
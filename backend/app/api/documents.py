@@ -1,84 +1,275 @@
-"""Document upload and list - admin only."""
+"""Documents: upload, update, ingestion job status and list (admin only); chunk search."""
 
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+import hashlib
+from pathlib import Path
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status, UploadFile, File, Form
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.session import get_db
-from app.models import User, Document as DocumentModel, EmbeddingMeta
-from app.schemas.document import DocumentResponse, DocumentUploadResponse
+from app.models import Document as DocumentModel, EmbeddingMeta, IngestionJob, JobKind, JobStatus
+from app.schemas.document import (
+    ChunkSearchHit,
+    ChunkSearchResponse,
+    DocumentResponse,
+    DocumentUploadResponse,
+    IngestionJobResponse,
+)
 from app.core.dependencies import get_current_user, require_role
-from app.services.ingestion import ingest_pdf
+from app.core.principals import Principal
+from app.services.chunk_search import search_chunks
+from app.services.cursors import InvalidCursor
+from app.services.embedding_cache import record_duplicate_upload
+from app.services.jobs import enqueue, get_live_progress, new_upload_path
 
 router = APIRouter()
 
 MAX_FILE_SIZE = 20 * 1024 * 1024  # 20 MB
 ALLOWED_CONTENT_TYPES = {"application/pdf"}
+UPLOAD_CHUNK_SIZE = 1024 * 1024
 
 
-@router.post("/upload", response_model=DocumentUploadResponse)
+@router.post("/upload", response_model=DocumentUploadResponse, status_code=status.HTTP_202_ACCEPTED)
 async def upload_document(
     file: UploadFile = File(...),
+    collection: str | None = Form(None, max_length=128),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(require_role("admin")),
+    current_user: Principal = Depends(require_role("admin")),
 ):
-    """Upload a PDF; extract, chunk, embed, and store. Admin only."""
-    if file.content_type not in ALLOWED_CONTENT_TYPES:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Only PDF files are allowed",
-        )
-    content = await file.read()
-    if len(content) > MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="File too large (max 20 MB)",
-        )
-    if not content:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Empty file",
+    """Upload a PDF and queue it for ingestion (extract, chunk, embed, store). Admin only.
+
+    Returns at once with a job id; poll GET /documents/jobs/{job_id} for progress.
+    A byte-identical file that is already ingested (or being ingested) is not
+    processed again: the existing document and job are returned with duplicate=true.
+    An optional `collection` form field groups the document for scoped chat queries.
+    """
+    upload_path, content_hash = await _receive_pdf(file)
+    existing = await _find_duplicate(db, content_hash)
+    if existing is not None:
+        upload_path.unlink(missing_ok=True)
+        doc, job = existing
+        chunks = await _count_chunks(db, doc.id)
+        record_duplicate_upload(chunks)
+        return DocumentUploadResponse(
+            id=doc.id,
+            filename=doc.filename,
+            job_id=job.id,
+            status=job.status,
+            chunks=chunks,
+            duplicate=True,
+            message=f"Identical file already uploaded as '{doc.filename}'; skipped re-embedding",
         )
 
     doc = DocumentModel(
         filename=file.filename or "document.pdf",
         uploaded_by=current_user.id,
+        content_hash=content_hash,
+        collection=(collection or "").strip() or None,
     )
     db.add(doc)
     await db.flush()
-    await db.refresh(doc)
+    job = IngestionJob(
+        document_id=doc.id,
+        status=JobStatus.queued.value,
+        file_path=str(upload_path),
+    )
+    db.add(job)
+    # Workers use their own sessions, so the job must be committed before it is queued
+    await db.commit()
+    enqueue(job.id)
 
-    try:
-        chunk_rows = ingest_pdf(content, doc.id, doc.filename)
-    except Exception as e:
+    return DocumentUploadResponse(
+        id=doc.id,
+        filename=doc.filename,
+        job_id=job.id,
+        status=job.status,
+        message="Document queued for ingestion",
+    )
+
+
+@router.put("/{document_id}", response_model=DocumentUploadResponse, status_code=status.HTTP_202_ACCEPTED)
+async def update_document(
+    document_id: int,
+    file: UploadFile = File(...),
+    db: AsyncSession = Depends(get_db),
+    _admin: Principal = Depends(require_role("admin")),
+):
+    """Replace a document with a new version of the PDF. Admin only.
+
+    Queues an update job that diffs the new chunks against the stored ones: only added
+    or changed chunks are embedded, removed ones are deleted from Chroma and the
+    embeddings table. Poll GET /documents/jobs/{job_id} for progress.
+    """
+    doc = await db.get(DocumentModel, document_id)
+    if doc is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
+    active = await db.scalar(
+        select(IngestionJob.id)
+        .where(IngestionJob.document_id == document_id)
+        .where(IngestionJob.status.in_([JobStatus.queued.value, JobStatus.running.value]))
+        .limit(1)
+    )
+    if active is not None:
         raise HTTPException(
-            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            detail=f"Failed to process PDF: {str(e)}",
-        ) from e
-
-    for chunk_text, page_number, chunk_index in chunk_rows:
-        meta = EmbeddingMeta(
-            document_id=doc.id,
-            page_number=page_number,
-            chunk_text=chunk_text,
-            chunk_index=chunk_index,
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Document is being ingested (job {active}); retry when it finishes",
+        )
+
+    upload_path, content_hash = await _receive_pdf(file)
+    if content_hash == doc.content_hash:
+        upload_path.unlink(missing_ok=True)
+        chunks = await _count_chunks(db, doc.id)
+        record_duplicate_upload(chunks)
+        last_job = await db.scalar(
+            select(IngestionJob).where(IngestionJob.document_id == doc.id).order_by(IngestionJob.id.desc()).limit(1)
         )
-        db.add(meta)
+        return DocumentUploadResponse(
+            id=doc.id,
+            filename=doc.filename,
+            job_id=last_job.id if last_job else 0,
+            status=last_job.status if last_job else JobStatus.succeeded.value,
+            chunks=chunks,
+            duplicate=True,
+            message="Document content is unchanged",
+        )
+
+    job = IngestionJob(
+        document_id=doc.id,
+        status=JobStatus.queued.value,
+        kind=JobKind.update.value,
+        filename=file.filename or doc.filename,
+        content_hash=content_hash,
+        file_path=str(upload_path),
+    )
+    db.add(job)
+    await db.commit()
+    enqueue(job.id)
 
     return DocumentUploadResponse(
         id=doc.id,
-        filename=doc.filename,
-        chunks=len(chunk_rows),
-        message="Document ingested successfully",
+        filename=job.filename,
+        job_id=job.id,
+        status=job.status,
+        message="Document update queued",
     )
 
 
+async def _receive_pdf(file: UploadFile) -> tuple[Path, str]:
+    """Validate and spool an uploaded PDF. Returns (spooled path, SHA-256 of the content)."""
+    if file.content_type not in ALLOWED_CONTENT_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only PDF files are allowed",
+        )
+    upload_path = new_upload_path()
+    try:
+        size, content_hash = await _spool_upload(file, upload_path)
+    except HTTPException:
+        upload_path.unlink(missing_ok=True)
+        raise
+    if not size:
+        upload_path.unlink(missing_ok=True)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Empty file",
+        )
+    return upload_path, content_hash
+
+
+async def _count_chunks(db: AsyncSession, document_id: int) -> int:
+    return await db.scalar(
+        select(func.count()).select_from(EmbeddingMeta).where(EmbeddingMeta.document_id == document_id)
+    ) or 0
+
+
+async def _spool_upload(file: UploadFile, path: Path) -> tuple[int, str]:
+    """
+    Copy the upload to path in chunks, enforcing MAX_FILE_SIZE.
+    Returns (bytes written, SHA-256 hex digest of the content).
+    """
+    size = 0
+    digest = hashlib.sha256()
+    with open(path, "wb") as out:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            digest.update(chunk)
+            if size > MAX_FILE_SIZE:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="File too large (max 20 MB)",
+                )
+            out.write(chunk)
+    return size, digest.hexdigest()
+
+
+async def _find_duplicate(db: AsyncSession, content_hash: str) -> tuple[DocumentModel, IngestionJob] | None:
+    """Latest document with this content whose newest job has not failed, with that job."""
+    result = await db.execute(
+        select(DocumentModel, IngestionJob)
+        .join(IngestionJob, IngestionJob.document_id == DocumentModel.id)
+        .where(DocumentModel.content_hash == content_hash)
+        .order_by(IngestionJob.id.desc())
+        .limit(1)
+    )
+    row = result.first()
+    if row is None or row[1].status == JobStatus.failed.value:
+        return None
+    return row[0], row[1]
+
+
+@router.get("/search", response_model=ChunkSearchResponse)
+async def search_documents(
+    q: str = Query(..., min_length=1, max_length=500),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = Query(None),
+    document_id: int | None = Query(None),
+    db: AsyncSession = Depends(get_db),
+    _user: Principal = Depends(get_current_user),
+):
+    """Full-text search over ingested chunks: ranked snippets with page numbers.
+
+    No embedding or LLM call. Pass next_cursor back as cursor for the next page.
+    """
+    if db.bind.dialect.name != "sqlite":
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Full-text search requires the SQLite backend",
+        )
+    try:
+        hits, next_cursor = await search_chunks(db, q, limit=limit, cursor=cursor, document_id=document_id)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return ChunkSearchResponse(items=[ChunkSearchHit(**h) for h in hits], next_cursor=next_cursor)
+
+
+@router.get("/jobs/{job_id}", response_model=IngestionJobResponse)
+async def get_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    _admin: Principal = Depends(require_role("admin")),
+):
+    """Status and progress (pages parsed, chunks embedded) of an ingestion job. Admin only."""
+    job = await db.get(IngestionJob, job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    response = IngestionJobResponse.model_validate(job)
+    live = get_live_progress(job_id)
+    if live:
+        response = response.model_copy(update=live)
+    return response
+
+
 @router.get("/", response_model=list[DocumentResponse])
 async def list_documents(
+    collection: str | None = Query(None, max_length=128),
     db: AsyncSession = Depends(get_db),
-    _admin: User = Depends(require_role("admin")),
+    _admin: Principal = Depends(require_role("admin")),
 ):
-    """List all uploaded documents. Admin only."""
-    from sqlalchemy import select
-    result = await db.execute(select(DocumentModel).order_by(DocumentModel.upload_date.desc()))
+    """List uploaded documents, optionally only one collection's. Admin only."""
+    query = select(DocumentModel).order_by(DocumentModel.upload_date.desc())
+    if collection is not None:
+        query = query.where(DocumentModel.collection == collection)
+    result = await db.execute(query)
     docs = result.scalars().all()
     return [DocumentResponse.model_validate(d) for d in docs]
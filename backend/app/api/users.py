@@ -8,6 +8,7 @@ from app.db.session import get_db
 from app.models import User
 from app.schemas.user import User as UserSchema
 from app.core.dependencies import get_current_user, require_role
+from app.core.principals import Principal
 
 router = APIRouter()
 
@@ -15,7 +16,7 @@ router = APIRouter()
 @router.get("/", response_model=list[UserSchema])
 async def list_users(
     db: AsyncSession = Depends(get_db),
-    _admin: User = Depends(require_role("admin")),
+    _admin: Principal = Depends(require_role("admin")),
 ):
     """List all users. Admin only."""
     result = await db.execute(select(User))
@@ -18,17 +18,103 @@ class Settings(BaseSettings):
     api_prefix: str = "/api/v1"
 
     database_url: str = ""
+    # Connection pool (db/session.py); SQLite files are pooled too so pragmas and page cache persist
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    # SQLite pragmas applied to every connection. WAL lets history reads run alongside chat writes;
+    # synchronous=NORMAL is safe in WAL (a power cut can lose the last commits, never corrupt)
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_mmap_size_mb: int = 256
+    sqlite_cache_size_mb: int = 64
 
     secret_key: str = "change-me-in-production"
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 60
+    # bcrypt cost factor (2^rounds iterations); hashes with another cost are upgraded at login
+    bcrypt_rounds: int = 12
+    # Principal cache (core/principals.py): TTL also bounds how long token uid/role claims are trusted; 0 disables both
+    principal_cache_ttl_seconds: float = 60.0
+    principal_cache_max_entries: int = 10000
+    # GET /metrics requires "Authorization: Bearer <metrics_token>"; empty disables the endpoint
+    metrics_token: str = ""
 
     # Local LLM (Ollama)
     ollama_base_url: str = "http://localhost:11434"
     ollama_model: str = "llama3.2"
+    # Shared async client pool (services/llm_client.py); max_connections caps concurrent generations
+    ollama_max_connections: int = 16
+    ollama_max_keepalive_connections: int = 16
+    ollama_keepalive_expiry: float = 60.0
+    ollama_connect_timeout: float = 5.0
+    ollama_read_timeout: float = 120.0
+    ollama_pool_timeout: float = 30.0
+    # Ollama model residency after each call (e.g. "5m", "1h", "-1" = keep loaded)
+    ollama_keep_alive: str = "5m"
 
     vector_store_path: str = ""
+    # Vector engine: "chroma" (default) or "numpy" (memory-mapped matrix, exact search)
+    vector_engine: str = "chroma"
+    # Chroma: also keep one collection per document group (upload `collection`) so chat queries
+    # scoped to a collection skip the global graph; opt-in, grouped chunks are stored twice
+    chroma_group_partitions: bool = False
+    numpy_index_path: str = ""
+    numpy_index_dtype: str = "float32"  # "float16" halves memory, "int8" (per-vector scale) quarters it
+    # With float16/int8: re-rank top_k * factor candidates using float32 copies on disk (0 = off)
+    numpy_rescore_factor: int = 0
     sentence_transformer_model: str = "all-MiniLM-L6-v2"
+    # Load and warm the embedding model at startup; /ready reports 503 until done
+    embedding_warmup: bool = True
+    # Micro-batching of concurrent embedding calls (see services/embedding_batcher.py)
+    embedding_batching: bool = True
+    embedding_batch_max_size: int = 32
+    embedding_batch_max_wait_ms: float = 5.0
+
+    # Semantic answer cache (see services/answer_cache.py); max_distance is cosine distance
+    answer_cache_enabled: bool = True
+    answer_cache_max_distance: float = 0.05
+    answer_cache_max_mb: int = 64
+
+    # Bounded executors for blocking work (see core/executors.py); full queue -> 503
+    llm_executor_workers: int = 8
+    llm_executor_queue: int = 32
+    cpu_executor_workers: int = 4
+    cpu_executor_queue: int = 64
+    # bcrypt pool: at most workers hashes run at once; a full queue -> 429
+    password_executor_workers: int = 2
+    password_executor_queue: int = 16
+    password_executor_nice: int = 10  # OS priority of bcrypt workers (Linux; 0 = unchanged)
+    executor_retry_after_seconds: int = 5
+    # POST /chat/batch: LLM generations in flight at once per batch request
+    chat_batch_concurrency: int = 4
+
+    # Background ingestion jobs (services/jobs.py); uploads are spooled to upload_dir
+    # Concurrent jobs; each runs on its own thread of the ingestion pool, never the cpu pool
+    ingestion_workers: int = 2
+    ingestion_executor_nice: int = 5  # OS priority of ingestion threads (Linux; 0 = unchanged)
+    ingestion_max_attempts: int = 3
+    ingestion_embed_batch_size: int = 64
+    # Rows per executemany INSERT into the embeddings (EmbeddingMeta) table
+    embedding_meta_insert_batch_size: int = 1000
+    # Hybrid retrieval: BM25 over chunk text fused with vector search (reciprocal rank fusion)
+    hybrid_search_enabled: bool = True
+    hybrid_dense_k: int = 20  # candidates from Chroma
+    hybrid_lexical_k: int = 20  # candidates from the BM25 index
+    hybrid_dense_weight: float = 1.0
+    hybrid_lexical_weight: float = 1.0
+    hybrid_rrf_k: int = 60  # RRF constant: score = sum(weight / (rrf_k + rank))
+    # Context packing (services/context_packer.py): merge overlapping chunks, cap prompt size
+    context_packing_enabled: bool = True
+    context_token_budget: int = 1500  # estimated tokens of retrieved context; 0 = unlimited
+    # Persistent chunk-hash -> vector cache reused across uploads (services/embedding_cache.py)
+    embedding_cache_enabled: bool = True
+    embedding_cache_path: str = ""
+    embedding_cache_max_mb: int = 512  # vector data kept, least recently used evicted first; 0 = unbounded
+    upload_dir: str = ""
+    # Parallel PDF text extraction: worker processes (0 = CPU count); smaller PDFs stay serial
+    pdf_extract_workers: int = 0
+    pdf_parallel_min_pages: int = 50
 
     class Config:
         # Load .env from project root (RAG/) so it works when running from backend/
@@ -54,6 +140,30 @@ class Settings(BaseSettings):
             return str(DATA_DIR / "chroma")
         return raw
 
+    @field_validator("upload_dir", mode="before")
+    @classmethod
+    def resolve_upload_dir(cls, v: str) -> str:
+        raw = (v or "").strip()
+        if not raw or raw.startswith("./data"):
+            return str(DATA_DIR / "uploads")
+        return raw
+
+    @field_validator("numpy_index_path", mode="before")
+    @classmethod
+    def resolve_numpy_index_path(cls, v: str) -> str:
+        raw = (v or "").strip()
+        if not raw or raw.startswith("./data"):
+            return str(DATA_DIR / "numpy_index")
+        return raw
+
+    @field_validator("embedding_cache_path", mode="before")
+    @classmethod
+    def resolve_embedding_cache_path(cls, v: str) -> str:
+        raw = (v or "").strip()
+        if not raw or raw.startswith("./data"):
+            return str(DATA_DIR / "embedding_cache.sqlite3")
+        return raw
+
 
 @lru_cache
 def get_settings() -> Settings:
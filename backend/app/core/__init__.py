@@ -1 +1 @@
-"""Core utilities - security, dependencies."""
+"""Core utilities - security, dependencies, executors."""
@@ -4,11 +4,11 @@ from typing import Annotated
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
-from app.db.session import get_db, AsyncSessionLocal
+from app.db.session import AsyncSessionLocal
 from app.models import User
+from app.core.principals import Principal, get_principal_cache
 from app.core.security import decode_token
 
 security = HTTPBearer(auto_error=False)
@@ -16,9 +16,12 @@ security = HTTPBearer(auto_error=False)
 
 async def get_current_user_optional(
     credentials: Annotated[HTTPAuthorizationCredentials | None, Depends(security)],
-    db: Annotated[AsyncSession, Depends(get_db)],
-) -> User | None:
-    """Return current user if valid JWT; else None (for optional auth)."""
+) -> Principal | None:
+    """Return current principal if valid JWT; else None (for optional auth).
+
+    Served from the principal cache or the token's claims when possible; only a miss
+    opens a DB session (see core/principals.py).
+    """
     if not credentials:
         return None
     payload = decode_token(credentials.credentials)
@@ -28,14 +31,23 @@ async def get_current_user_optional(
     email = payload.get("sub")
     if not email:
         return None
-    result = await db.execute(select(User).where(User.email == email))
-    user = result.scalar_one_or_none()
-    return user
+    cache = get_principal_cache()
+    principal = cache.get(email) or cache.from_claims(payload)
+    if principal is not None:
+        return principal
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(User).where(User.email == email))
+        user = result.scalar_one_or_none()
+    if user is None:
+        return None
+    principal = Principal.from_user(user)
+    cache.put(principal)
+    return principal
 
 
 async def get_current_user(
-    user: Annotated[User | None, Depends(get_current_user_optional)],
-) -> User:
+    user: Annotated[Principal | None, Depends(get_current_user_optional)],
+) -> Principal:
     """Require authenticated user."""
     if user is None:
         raise HTTPException(
@@ -50,8 +62,8 @@ def require_role(role: str):
     """Dependency that requires user to have given role."""
 
     async def _require_role(
-        current_user: Annotated[User, Depends(get_current_user)],
-    ) -> User:
+        current_user: Annotated[Principal, Depends(get_current_user)],
+    ) -> Principal:
         if current_user.role != role:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -0,0 +1,168 @@
+"""Bounded executors for blocking work called from async endpoints.
+
+Process-wide pools keep blocking calls off the event loop:
+- llm: I/O-bound Ollama calls (threads mostly waiting on the socket)
+- cpu: query embedding and retrieval for chat requests
+- ingestion: background ingestion jobs (PDF parsing, chunking, embedding, storing),
+  one thread per job worker, so a long document never holds a chat thread
+- password: bcrypt hashing and verification (register/login)
+
+Each pool accepts at most max_workers running + queue_size waiting tasks; beyond
+that submit() raises ExecutorSaturated, which the app turns into the pool's
+saturated status (503, or 429 for password) + Retry-After.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+from app.config import get_settings
+
+
+class ExecutorSaturated(Exception):
+    """Raised when a bounded executor has no free worker or queue slot."""
+
+    def __init__(self, name: str, status_code: int = 503):
+        super().__init__(f"Executor '{name}' is saturated")
+        self.name = name
+        self.status_code = status_code
+
+
+class BoundedExecutor:
+    """ThreadPoolExecutor with a hard cap on running + queued tasks."""
+
+    def __init__(
+        self,
+        name: str,
+        max_workers: int,
+        queue_size: int,
+        saturated_status: int = 503,
+        initializer: Callable[[], None] | None = None,
+    ):
+        self.name = name
+        self.saturated_status = saturated_status
+        self.max_workers = max(1, max_workers)
+        self.queue_size = max(0, queue_size)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix=f"{name}-worker", initializer=initializer
+        )
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.queue_size)
+        self._in_flight = 0
+        self._rejected = 0
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        """Submit without blocking; raise ExecutorSaturated if the queue is full."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise ExecutorSaturated(self.name, self.saturated_status)
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._in_flight += 1
+        future.add_done_callback(self._on_done)
+        return future
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Await fn(*args, **kwargs) executed on this pool."""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "queue_size": self.queue_size,
+                "in_flight": self._in_flight,
+                "rejected": self._rejected,
+            }
+
+    def _on_done(self, _future: Future) -> None:
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+
+_executors: dict[str, BoundedExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def _get_executor(name: str, max_workers: int, queue_size: int, **kwargs: Any) -> BoundedExecutor:
+    executor = _executors.get(name)
+    if executor is None:
+        with _executors_lock:
+            executor = _executors.get(name)
+            if executor is None:
+                executor = BoundedExecutor(name, max_workers, queue_size, **kwargs)
+                _executors[name] = executor
+    return executor
+
+
+def get_llm_executor() -> BoundedExecutor:
+    """Pool for blocking LLM (Ollama) HTTP calls."""
+    settings = get_settings()
+    return _get_executor("llm", settings.llm_executor_workers, settings.llm_executor_queue)
+
+
+def get_cpu_executor() -> BoundedExecutor:
+    """Pool for query embedding and retrieval."""
+    settings = get_settings()
+    return _get_executor("cpu", settings.cpu_executor_workers, settings.cpu_executor_queue)
+
+
+def _lower_thread_priority(niceness: int) -> Callable[[], None]:
+    def initializer() -> None:
+        # Linux schedules threads individually, so this nices only the calling worker
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), niceness)
+        except (AttributeError, OSError):
+            pass
+
+    return initializer
+
+
+def get_password_executor() -> BoundedExecutor:
+    """Pool for bcrypt; saturation is per-client backpressure (429), not an outage.
+    Workers run at password_executor_nice so the event loop wins a contended CPU."""
+    settings = get_settings()
+    return _get_executor(
+        "password",
+        settings.password_executor_workers,
+        settings.password_executor_queue,
+        saturated_status=429,
+        initializer=_lower_thread_priority(settings.password_executor_nice) if settings.password_executor_nice else None,
+    )
+
+
+def get_ingestion_executor() -> BoundedExecutor:
+    """Pool for ingestion jobs: one thread per job worker and no queue, since each
+    worker runs one job at a time. Threads run at ingestion_executor_nice."""
+    settings = get_settings()
+    return _get_executor(
+        "ingestion",
+        settings.ingestion_workers,
+        0,
+        initializer=_lower_thread_priority(settings.ingestion_executor_nice) if settings.ingestion_executor_nice else None,
+    )
+
+
+def get_executor_stats() -> dict:
+    return {name: ex.stats() for name, ex in _executors.items()}
+
+
+def shutdown_executors() -> None:
+    """Stop all pools (on shutdown)."""
+    with _executors_lock:
+        for executor in _executors.values():
+            executor.shutdown(wait=False)
+        _executors.clear()
@@ -0,0 +1,130 @@
+"""In-process metrics in Prometheus text format (served at GET /metrics).
+
+Stage latency histograms for chat and ingestion plus error counters by type.
+Each metric has a single label (stage or type). Observing is a bisect and a few
+additions under a lock (1-2 µs, see benchmarks/bench_metrics.py), negligible
+next to the stages it times, which take milliseconds. Values are per process:
+with several workers, scrape each one or aggregate in Prometheus.
+"""
+
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+
+# Seconds; wide enough for sub-millisecond cache lookups and two-minute LLM calls
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0,
+)
+
+
+class _Timer:
+    __slots__ = ("_histogram", "_label", "_start")
+
+    def __init__(self, histogram: Histogram, label: str):
+        self._histogram = histogram
+        self._label = label
+
+    def __enter__(self) -> _Timer:
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._histogram.observe(self._label, time.perf_counter() - self._start)
+
+
+class Histogram:
+    """Latency histogram keyed by one label value (e.g. stage="embed")."""
+
+    def __init__(self, name: str, documentation: str, label: str, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label = label
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[str, list] = {}  # label value -> [per-bucket counts (+Inf last), sum, count]
+        self._lock = threading.Lock()
+        _REGISTRY.append(self)
+
+    def observe(self, label_value: str, seconds: float) -> None:
+        slot = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][slot] += 1
+            series[1] += seconds
+            series[2] += 1
+
+    def time(self, label_value: str) -> _Timer:
+        """Context manager observing the duration of its block."""
+        return _Timer(self, label_value)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {value: (list(counts), total, n) for value, (counts, total, n) in self._series.items()}
+        for value, (counts, total, n) in sorted(snapshot.items()):
+            label = f'{self.label}="{_escape(value)}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {n}')
+            lines.append(f"{self.name}_sum{{{label}}} {total}")
+            lines.append(f"{self.name}_count{{{label}}} {n}")
+        return lines
+
+
+class Counter:
+    """Monotonic counter keyed by one label value (e.g. type="embedding")."""
+
+    def __init__(self, name: str, documentation: str, label: str):
+        self.name = name
+        self.documentation = documentation
+        self.label = label
+        self._values: dict[str, float] = {}
+        self._lock = threading.Lock()
+        _REGISTRY.append(self)
+
+    def inc(self, label_value: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_value] = self._values.get(label_value, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            snapshot = sorted(self._values.items())
+        lines.extend(f'{self.name}{{{self.label}="{_escape(value)}"}} {count}' for value, count in snapshot)
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+_REGISTRY: list[Histogram | Counter] = []
+
+CHAT_STAGE_SECONDS = Histogram(
+    "rag_chat_stage_seconds",
+    "Chat pipeline stage latency: embed, cache_lookup, vector_search, lexical_search, context, llm, llm_first_token, persist.",
+    "stage",
+)
+INGEST_STAGE_SECONDS = Histogram(
+    "rag_ingest_stage_seconds",
+    "Ingestion stage latency: extract (per page), chunk, embed and store (per batch).",
+    "stage",
+)
+ERRORS = Counter(
+    "rag_errors_total",
+    "Errors by type: ollama_not_running, ollama_busy, ollama_model_missing, ollama_http, llm, embedding, ingestion, saturated_<pool>.",
+    "type",
+)
+
+
+def render_metrics() -> str:
+    """All metrics in Prometheus text exposition format 0.0.4."""
+    lines: list[str] = []
+    for metric in _REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
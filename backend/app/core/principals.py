@@ -0,0 +1,154 @@
+"""Authenticated principals and their in-process cache.
+
+A Principal is what request handlers need from the users table (id, email, role).
+Resolving one for a token goes, in order:
+
+1. the cache, keyed by token subject (email), entries live principal_cache_ttl_seconds;
+2. the token's own uid/role claims, trusted for its first TTL seconds and only if
+   the user row has not changed since the token was issued (as if the token had
+   put an entry in the cache when it was minted);
+3. the database, whose result is cached.
+
+Any ORM update or delete of a User drops its entry and records the change, so this
+process stops trusting older claims at once. Bulk UPDATE/DELETE statements bypass
+ORM events and must call invalidate() themselves. Other processes see the change
+within one TTL.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from sqlalchemy import event, inspect
+
+from app.config import get_settings
+from app.models import User
+
+
+@dataclass(frozen=True)
+class Principal:
+    id: int
+    email: str
+    role: str
+
+    @classmethod
+    def from_user(cls, user: User) -> Principal:
+        return cls(id=user.id, email=user.email, role=user.role)
+
+
+class PrincipalCache:
+    """Thread-safe TTL + LRU map of subject -> Principal, plus recent change times."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[Principal, float]] = OrderedDict()  # subject -> (principal, expires)
+        self._changed: dict[str, float] = {}  # subject -> time its user row last changed
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._claims = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    def get(self, subject: str) -> Principal | None:
+        now = time.time()
+        with self._lock:
+            cached = self._entries.get(subject)
+            if cached is not None and cached[1] > now:
+                self._entries.move_to_end(subject)
+                self._hits += 1
+                return cached[0]
+            if cached is not None:
+                del self._entries[subject]
+            return None
+
+    def from_claims(self, payload: dict) -> Principal | None:
+        """Principal from the token's uid/role claims if they are still trustworthy;
+        it is cached until the token's TTL window closes."""
+        uid, role, issued = payload.get("uid"), payload.get("role"), payload.get("iat")
+        if uid is None or role is None or issued is None or self.ttl <= 0:
+            return None
+        subject = payload["sub"]
+        expires = float(issued) + self.ttl
+        with self._lock:
+            if expires <= time.time() or float(issued) <= self._changed.get(subject, 0.0):
+                return None
+            self._claims += 1
+        principal = Principal(id=int(uid), email=subject, role=str(role))
+        self._put(subject, principal, expires)
+        return principal
+
+    def put(self, principal: Principal) -> None:
+        """Cache a principal loaded from the database."""
+        with self._lock:
+            self._misses += 1
+        self._put(principal.email, principal, time.time() + self.ttl)
+
+    def _put(self, subject: str, principal: Principal, expires: float) -> None:
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[subject] = (principal, expires)
+            self._entries.move_to_end(subject)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, subject: str) -> None:
+        """The user row for subject changed: drop its entry and distrust older tokens."""
+        now = time.time()
+        with self._lock:
+            self._entries.pop(subject, None)
+            self._changed[subject] = now
+            self._invalidations += 1
+            # Claims older than one TTL are never trusted, so older changes can go
+            for stale in [s for s, t in self._changed.items() if t <= now - self.ttl]:
+                del self._changed[stale]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "claims": self._claims,
+                "misses": self._misses,
+                "invalidations": self._invalidations,
+                "ttl_seconds": self.ttl,
+            }
+
+
+_cache: PrincipalCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_principal_cache() -> PrincipalCache:
+    """Process-wide principal cache configured from Settings."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                settings = get_settings()
+                _cache = PrincipalCache(
+                    ttl_seconds=settings.principal_cache_ttl_seconds,
+                    max_entries=settings.principal_cache_max_entries,
+                )
+    return _cache
+
+
+def invalidate(subject: str) -> None:
+    get_principal_cache().invalidate(subject)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _user_changed(mapper, connection, target: User) -> None:
+    # On an email change the old address is the subject of the outstanding tokens
+    for email in {target.email, *inspect(target).attrs.email.history.deleted}:
+        if email:
+            invalidate(email)
@@ -1,4 +1,8 @@
-"""JWT and password hashing."""
+"""JWT and password hashing.
+
+bcrypt is deliberately slow (~0.3 s at cost 12), so async code must use the
+*_async variants, which run on the bounded password pool (core/executors.py).
+"""
 
 from datetime import datetime, timedelta, timezone
 from typing import Any
@@ -7,6 +11,7 @@ import bcrypt
 from jose import JWTError, jwt
 
 from app.config import get_settings
+from app.core.executors import get_password_executor
 
 settings = get_settings()
 
@@ -16,7 +21,7 @@ BCRYPT_MAX_PASSWORD_BYTES = 72
 
 def get_password_hash(password: str) -> str:
     pw_bytes = password.encode("utf-8")[:BCRYPT_MAX_PASSWORD_BYTES]
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=settings.bcrypt_rounds)
     return bcrypt.hashpw(pw_bytes, salt).decode("utf-8")
 
 
@@ -30,11 +35,33 @@ def verify_password(plain: str, hashed: str) -> bool:
         return False
 
 
-def create_access_token(subject: str | Any, expires_delta: timedelta | None = None) -> str:
+def needs_rehash(hashed: str) -> bool:
+    """True if hashed was made with a different cost factor than settings.bcrypt_rounds."""
+    # Modular crypt format: $2b$<cost>$<salt+hash>
+    parts = hashed.split("$")
+    return len(parts) < 4 or not parts[2].isdigit() or int(parts[2]) != settings.bcrypt_rounds
+
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash on the password pool (raises ExecutorSaturated when full)."""
+    return await get_password_executor().run(get_password_hash, password)
+
+
+async def verify_password_async(plain: str, hashed: str) -> bool:
+    """verify_password on the password pool (raises ExecutorSaturated when full)."""
+    return await get_password_executor().run(verify_password, plain, hashed)
+
+
+def create_access_token(
+    subject: str | Any,
+    expires_delta: timedelta | None = None,
+    claims: dict | None = None,
+) -> str:
+    """claims: extra payload, e.g. uid/role so auth can skip the user lookup."""
     if expires_delta is None:
         expires_delta = timedelta(minutes=settings.access_token_expire_minutes)
-    expire = datetime.now(timezone.utc) + expires_delta
-    to_encode = {"exp": expire, "sub": str(subject)}
+    now = datetime.now(timezone.utc)
+    to_encode = {**(claims or {}), "iat": now, "exp": now + expires_delta, "sub": str(subject)}
     return jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
 
 
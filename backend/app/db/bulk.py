@@ -0,0 +1,91 @@
+"""Core-level bulk writes for high-volume tables (no ORM identity map / unit of work)."""
+
+from __future__ import annotations
+
+from itertools import islice
+from typing import Iterable, Sequence
+
+from sqlalchemy import bindparam, delete, insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.models import EmbeddingMeta
+
+# Values per IN (...) list: each is a bound parameter, and SQLite before 3.32 allows 999
+IN_LIST_MAX_PARAMS = 900
+
+
+async def bulk_insert_embedding_meta(
+    session: AsyncSession,
+    document_id: int,
+    rows: Iterable[Sequence],
+    batch_size: int | None = None,
+) -> int:
+    """
+    Insert (chunk_text, page_number, chunk_index[, vector_id]) rows for a document with
+    batched executemany INSERTs (vector_id defaults to NULL, i.e. the positional Chroma
+    id). rows may be any iterable (e.g. a generator); at most batch_size parameter dicts
+    are held at once. Returns rows inserted; the caller commits.
+    """
+    batch_size = max(1, batch_size or get_settings().embedding_meta_insert_batch_size)
+    stmt = insert(EmbeddingMeta.__table__)
+    it = iter(rows)
+    total = 0
+    while batch := [
+        {
+            "document_id": document_id,
+            "chunk_text": row[0],
+            "page_number": row[1],
+            "chunk_index": row[2],
+            "vector_id": row[3] if len(row) > 3 else None,
+        }
+        for row in islice(it, batch_size)
+    ]:
+        await session.execute(stmt, batch)
+        total += len(batch)
+    return total
+
+
+async def bulk_update_embedding_positions(
+    session: AsyncSession,
+    rows: Iterable[tuple[int, str, int | None, int]],
+    batch_size: int | None = None,
+) -> int:
+    """
+    Move existing EmbeddingMeta rows: (row_id, vector_id, page_number, chunk_index)
+    per row, as executemany UPDATEs keyed on the primary key. The caller commits.
+    """
+    batch_size = max(1, batch_size or get_settings().embedding_meta_insert_batch_size)
+    table = EmbeddingMeta.__table__
+    stmt = (
+        update(table)
+        .where(table.c.id == bindparam("row_id"))
+        .values(
+            vector_id=bindparam("new_vector_id"),
+            page_number=bindparam("new_page"),
+            chunk_index=bindparam("new_index"),
+        )
+    )
+    it = iter(rows)
+    total = 0
+    while batch := [
+        {"row_id": row_id, "new_vector_id": vector_id, "new_page": page, "new_index": index}
+        for row_id, vector_id, page, index in islice(it, batch_size)
+    ]:
+        await session.execute(stmt, batch)
+        total += len(batch)
+    return total
+
+
+async def bulk_delete_embedding_meta(
+    session: AsyncSession,
+    row_ids: Sequence[int],
+    batch_size: int | None = None,
+) -> int:
+    """Delete EmbeddingMeta rows by primary key in IN (...) batches of at most
+    IN_LIST_MAX_PARAMS ids. The caller commits."""
+    batch_size = max(1, min(batch_size or get_settings().embedding_meta_insert_batch_size, IN_LIST_MAX_PARAMS))
+    table = EmbeddingMeta.__table__
+    for start in range(0, len(row_ids), batch_size):
+        await session.execute(delete(table).where(table.c.id.in_(row_ids[start:start + batch_size])))
+    return len(row_ids)
@@ -0,0 +1,42 @@
+"""SQLite FTS5 index over embeddings.chunk_text (external content, trigger-synced).
+
+The virtual table stores only the token index; text is read back from `embeddings`
+by rowid. Triggers mirror every INSERT/UPDATE/DELETE on `embeddings`, so bulk
+ingestion, re-ingestion and cascaded deletes stay in sync without extra code.
+Alembic migration 005 creates the same objects; init_db() calls ensure_fts() for
+databases created with create_all.
+"""
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+FTS_TABLE = "embeddings_fts"
+
+FTS_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        chunk_text, content='embeddings', content_rowid='id', tokenize='unicode61'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS embeddings_fts_ai AFTER INSERT ON embeddings BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, chunk_text) VALUES (new.id, new.chunk_text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS embeddings_fts_ad AFTER DELETE ON embeddings BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, chunk_text) VALUES ('delete', old.id, old.chunk_text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS embeddings_fts_au AFTER UPDATE OF chunk_text ON embeddings BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, chunk_text) VALUES ('delete', old.id, old.chunk_text);
+        INSERT INTO {FTS_TABLE}(rowid, chunk_text) VALUES (new.id, new.chunk_text);
+    END""",
+]
+
+
+def ensure_fts(conn: Connection) -> None:
+    """Create the FTS table and triggers if missing and index existing rows (SQLite only)."""
+    if conn.dialect.name != "sqlite":
+        return
+    exists = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE}
+    ).first()
+    for statement in FTS_DDL:
+        conn.exec_driver_sql(statement)
+    if not exists:
+        conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
@@ -1,19 +1,63 @@
 """Async database session and engine."""
 
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from app.config import get_settings
 from app.db.base import Base
-from app.models import User, Document, EmbeddingMeta, Chat  # noqa: F401 - register tables
+from app.db.fts import ensure_fts
+from app.models import User, Document, EmbeddingMeta, IngestionJob, Chat  # noqa: F401 - register tables
 
 settings = get_settings()
 
+
+def _engine_options(url: str) -> dict:
+    options = {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+    }
+    if url.startswith("sqlite"):
+        if ":memory:" in url or url.rstrip("/").endswith(":"):
+            return {}  # in-memory databases live and die with their one connection
+        # aiosqlite defaults to NullPool (a new connection, thread and page cache per session)
+        options["poolclass"] = AsyncAdaptedQueuePool
+    else:
+        options["pool_pre_ping"] = True
+    return options
+
+
+def _sqlite_pragmas() -> list[str]:
+    for name, value in (("journal_mode", settings.sqlite_journal_mode), ("synchronous", settings.sqlite_synchronous)):
+        if not value.isalpha():
+            raise ValueError(f"Invalid SQLite {name}: {value!r}")
+    return [
+        f"PRAGMA journal_mode={settings.sqlite_journal_mode}",
+        f"PRAGMA synchronous={settings.sqlite_synchronous}",
+        f"PRAGMA mmap_size={settings.sqlite_mmap_size_mb * 1024 * 1024}",
+        f"PRAGMA cache_size={-settings.sqlite_cache_size_mb * 1024}",  # negative = KiB
+    ]
+
+
 # SQLite needs aiosqlite; for postgres use asyncpg
 engine = create_async_engine(
     settings.database_url,
     echo=settings.debug,
+    **_engine_options(settings.database_url),
 )
 
+if engine.dialect.name == "sqlite":
+    _PRAGMAS = _sqlite_pragmas()
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, _record) -> None:
+        cursor = dbapi_connection.cursor()
+        for pragma in _PRAGMAS:
+            cursor.execute(pragma)
+        cursor.close()
+
+
 AsyncSessionLocal = async_sessionmaker(
     engine,
     class_=AsyncSession,
@@ -36,7 +80,23 @@ async def get_db():
             await session.close()
 
 
+# Indexes replaced by a wider one in a later migration
+SUPERSEDED_INDEXES = ("ix_chats_user_id_timestamp",)
+
+
+def ensure_indexes(conn) -> None:
+    """Create model indexes missing from tables made by an older create_all and drop the
+    ones they supersede (migrations do both too)."""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+    for name in SUPERSEDED_INDEXES:
+        conn.exec_driver_sql(f"DROP INDEX IF EXISTS {name}")
+
+
 async def init_db():
     """Create all tables (for dev; use Alembic in production)."""
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(ensure_indexes)
+        await conn.run_sync(ensure_fts)
@@ -1,22 +1,77 @@
 """FastAPI application entry point."""
 
+import asyncio
+import logging
+import secrets
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 from app.config import get_settings, DATA_DIR
 from app.api import router as api_router
-from app.db.session import init_db
+from app.db.session import engine as db_engine, init_db
+from app.core.dependencies import require_role
+from app.core.executors import ExecutorSaturated, get_executor_stats, shutdown_executors
+from app.core.metrics import ERRORS, render_metrics
+from app.core.principals import get_principal_cache
+from app.services.embeddings import (
+    warm_up as warm_up_embeddings,
+    is_ready as embeddings_ready,
+    close_batcher,
+    get_embedding_stats,
+)
+from app.services.answer_cache import get_answer_cache
+from app.services.embedding_cache import close_embedding_cache, get_dedup_stats
+from app.services.lexical_index import build_lexical_index, get_lexical_index
+from app.services.context_packer import get_packer_stats
+from app.services.vector_store import open_store, close_store, get_engine
+from app.services.llm_client import open_llm_client, close_llm_client
+from app.services.pdf_extractor import shutdown_extract_pool
+from app.services.jobs import start_workers as start_ingestion_workers, stop_workers as stop_ingestion_workers
+
+logger = logging.getLogger(__name__)
+
+
+async def _warm_up_embeddings() -> None:
+    try:
+        await asyncio.to_thread(warm_up_embeddings)
+    except Exception:
+        # Model loads lazily on first request instead; /ready stays 503
+        logger.exception("Embedding model warm-up failed")
+
+
+async def _build_lexical_index() -> None:
+    try:
+        await build_lexical_index()
+    except Exception:
+        # Retrieval stays vector-only until the next start
+        logger.exception("Building the lexical index failed")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Create data dir and DB tables on startup."""
+    """Create data dir and DB tables, open the vector store; warm the embedding model in the background."""
     DATA_DIR.mkdir(parents=True, exist_ok=True)
     await init_db()
+    await asyncio.to_thread(open_store)
+    await open_llm_client()
+    await start_ingestion_workers()
+    warmup_task = asyncio.create_task(_warm_up_embeddings()) if settings.embedding_warmup else None
+    lexical_task = asyncio.create_task(_build_lexical_index()) if settings.hybrid_search_enabled else None
     yield
-    # shutdown if needed
+    for task in (warmup_task, lexical_task):
+        if task is not None and not task.done():
+            task.cancel()
+    await stop_ingestion_workers()
+    await close_llm_client()
+    shutdown_executors()
+    shutdown_extract_pool()
+    close_batcher()
+    close_embedding_cache()
+    close_store()
+    await db_engine.dispose()
 
 
 settings = get_settings()
@@ -41,6 +96,65 @@ app.add_middleware(
 app.include_router(api_router, prefix=settings.api_prefix)
 
 
+@app.exception_handler(ExecutorSaturated)
+async def executor_saturated_handler(request: Request, exc: ExecutorSaturated):
+    """Shed load instead of queueing without bound."""
+    ERRORS.inc(f"saturated_{exc.name}")
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": "Server is busy, please retry shortly"},
+        headers={"Retry-After": str(settings.executor_retry_after_seconds)},
+    )
+
+
 @app.get("/health")
 def health():
     return {"status": "ok", "app": settings.app_name}
+
+
+@app.get("/ready")
+def ready():
+    """Readiness probe: 200 once the embedding model is loaded and warm, else 503."""
+    if not embeddings_ready():
+        return JSONResponse(status_code=503, content={"status": "warming_up", "app": settings.app_name})
+    return {"status": "ready", "app": settings.app_name}
+
+
+def _vector_store_stats() -> dict:
+    engine = get_engine()
+    stats = {"engine": engine.name, "count": engine.count()}
+    if hasattr(engine, "stats"):
+        stats.update(engine.stats())
+    return stats
+
+
+@app.get("/stats", dependencies=[Depends(require_role("admin"))])
+def stats():
+    """In-process counters for tuning (embedding batch sizes, answer cache hit ratio). Admin only."""
+    return {
+        "embedding_batcher": get_embedding_stats(),
+        "answer_cache": get_answer_cache().stats(),
+        "dedup": get_dedup_stats(),
+        "lexical_index": get_lexical_index().stats(),
+        "context_packer": get_packer_stats(),
+        "vector_store": _vector_store_stats(),
+        "executors": get_executor_stats(),
+        "principal_cache": get_principal_cache().stats(),
+    }
+
+
+@app.get("/metrics")
+def metrics(request: Request):
+    """Stage latency histograms and error counters in Prometheus text format.
+
+    Scrapers authenticate with "Authorization: Bearer <METRICS_TOKEN>"; without a
+    configured token the endpoint does not exist.
+    """
+    if not settings.metrics_token:
+        return JSONResponse(status_code=404, content={"detail": "Not Found"})
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(token.encode(), settings.metrics_token.encode()):
+        return JSONResponse(
+            status_code=401, content={"detail": "Invalid metrics token"}, headers={"WWW-Authenticate": "Bearer"}
+        )
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,7 +1,7 @@
 """SQLAlchemy models - Module 2."""
 
 from app.models.user import User, UserRole
-from app.models.document import Document, EmbeddingMeta
+from app.models.document import Document, EmbeddingMeta, IngestionJob, JobKind, JobStatus
 from app.models.chat import Chat
 
-__all__ = ["User", "UserRole", "Document", "EmbeddingMeta", "Chat"]
+__all__ = ["User", "UserRole", "Document", "EmbeddingMeta", "IngestionJob", "JobKind", "JobStatus", "Chat"]
@@ -1,6 +1,6 @@
 """Chat history model per README §13.4."""
 
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, func
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, Text, func
 from sqlalchemy.orm import relationship
 
 from app.db.base import Base
@@ -8,6 +8,9 @@ from app.db.base import Base
 
 class Chat(Base):
     __tablename__ = "chats"
+    # /chat/history: one user's rows, newest first (migration 007)
+    # id completes the history sort key (timestamp, id), so keyset pages are index ranges
+    __table_args__ = (Index("ix_chats_user_id_timestamp_id", "user_id", "timestamp", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -1,9 +1,22 @@
 """Document model per README §13.2."""
 
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, func
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, Text, func
 from sqlalchemy.orm import relationship
 
 from app.db.base import Base
+import enum
+
+
+class JobStatus(str, enum.Enum):
+    queued = "queued"
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+
+
+class JobKind(str, enum.Enum):
+    ingest = "ingest"  # first ingestion of a new document
+    update = "update"  # re-ingest a new version of an existing document by chunk diff
 
 
 class Document(Base):
@@ -13,20 +26,55 @@ class Document(Base):
     filename = Column(String(512), nullable=False)
     uploaded_by = Column(Integer, ForeignKey("users.id"), nullable=False)
     upload_date = Column(DateTime(timezone=True), server_default=func.now())
+    content_hash = Column(String(64), nullable=True, index=True)  # SHA-256 of the uploaded file
+    # Optional group name; chat requests can be scoped to a collection's documents
+    collection = Column(String(128), nullable=True, index=True)
 
     uploaded_by_user = relationship("User", back_populates="documents")
     embeddings_meta = relationship("EmbeddingMeta", back_populates="document", cascade="all, delete-orphan")
+    jobs = relationship("IngestionJob", back_populates="document", cascade="all, delete-orphan")
 
 
 class EmbeddingMeta(Base):
     """Embedding metadata per README §13.3 (chunk-level)."""
 
     __tablename__ = "embeddings"
+    # A document's chunks in order: re-ingest diffs, counts, deletes (migration 007)
+    __table_args__ = (Index("ix_embeddings_document_id_chunk_index", "document_id", "chunk_index"),)
 
     id = Column(Integer, primary_key=True, index=True)
     document_id = Column(Integer, ForeignKey("documents.id"), nullable=False)
     page_number = Column(Integer, nullable=True)
     chunk_text = Column(Text, nullable=False)
     chunk_index = Column(Integer, nullable=False)  # order within document
+    # Chroma id of the chunk; NULL means the positional id f"{document_id}_{chunk_index}"
+    vector_id = Column(String(64), nullable=True)
 
     document = relationship("Document", back_populates="embeddings_meta")
+
+
+class IngestionJob(Base):
+    """Background ingestion of an uploaded PDF (spooled to file_path until done)."""
+
+    __tablename__ = "ingestion_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    document_id = Column(Integer, ForeignKey("documents.id"), nullable=False, index=True)
+    status = Column(String(20), nullable=False, default=JobStatus.queued.value, index=True)
+    kind = Column(String(16), nullable=False, default=JobKind.ingest.value)
+    # New filename / content hash of the document, applied when an update job succeeds
+    filename = Column(String(512), nullable=True)
+    content_hash = Column(String(64), nullable=True)
+    file_path = Column(String(1024), nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    pages_total = Column(Integer, nullable=False, default=0)
+    pages_parsed = Column(Integer, nullable=False, default=0)
+    chunks_total = Column(Integer, nullable=False, default=0)
+    chunks_embedded = Column(Integer, nullable=False, default=0)
+    chunks_reused = Column(Integer, nullable=False, default=0)  # served from the embedding cache
+    chunks_removed = Column(Integer, nullable=False, default=0)  # update jobs: chunks no longer present
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    document = relationship("Document", back_populates="jobs")
@@ -1,20 +1,55 @@
 """Chat request/response schemas."""
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
+MAX_SCOPE_DOCUMENTS = 100
+MAX_BATCH_QUESTIONS = 200
 
-class ChatRequest(BaseModel):
+
+class ChatScope(BaseModel):
+    # Optional retrieval scope: these documents and/or the documents of one collection
+    # (both given = intersection). Omitted = the whole corpus.
+    document_ids: list[int] | None = Field(default=None, max_length=MAX_SCOPE_DOCUMENTS)
+    collection: str | None = Field(default=None, max_length=128)
+
+
+class ChatRequest(ChatScope):
     question: str
 
 
+class ChatBatchRequest(ChatScope):
+    questions: list[str] = Field(min_length=1, max_length=MAX_BATCH_QUESTIONS)
+    save_history: bool = True  # evaluation jobs may not want their questions in chat history
+
+
 class SourceItem(BaseModel):
     text: str
     metadata: dict
 
 
+class ContextUsage(BaseModel):
+    tokens: int  # estimated prompt-context tokens sent to the LLM
+    naive_tokens: int  # tokens of the retrieved chunks joined as-is
+    tokens_saved: int
+    chunks: int
+    passages: int
+    truncated: bool = False
+
+
 class ChatResponse(BaseModel):
     response: str
     sources: list[SourceItem]
+    context: ContextUsage | None = None
+
+
+class ChatBatchItem(BaseModel):
+    """One NDJSON line of POST /chat/batch."""
+
+    index: int  # position in the request's questions
+    question: str
+    response: str
+    sources: list[SourceItem]
+    context: ContextUsage | None = None
 
 
 class ChatHistoryItem(BaseModel):
@@ -26,3 +61,10 @@ class ChatHistoryItem(BaseModel):
 
 class ChatHistoryResponse(BaseModel):
     items: list[ChatHistoryItem]
+    next_cursor: str | None = None  # pass back as ?cursor= for the next (older) page
+
+
+class ChatExportItem(ChatHistoryItem):
+    """One NDJSON line of GET /chat/export."""
+
+    user_id: int
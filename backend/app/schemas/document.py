@@ -10,6 +10,7 @@ class DocumentResponse(BaseModel):
     filename: str
     uploaded_by: int
     upload_date: datetime
+    collection: str | None = None
 
     class Config:
         from_attributes = True
@@ -18,5 +19,43 @@ class DocumentResponse(BaseModel):
 class DocumentUploadResponse(BaseModel):
     id: int
     filename: str
-    chunks: int
+    job_id: int
+    status: str
+    chunks: int = 0
+    duplicate: bool = False
     message: str
+
+
+class IngestionJobResponse(BaseModel):
+    id: int
+    document_id: int
+    status: str
+    kind: str = "ingest"
+    attempts: int
+    pages_total: int
+    pages_parsed: int
+    chunks_total: int
+    chunks_embedded: int
+    chunks_reused: int = 0
+    chunks_removed: int = 0
+    error: str | None = None
+    created_at: datetime | None = None
+    updated_at: datetime | None = None
+
+    class Config:
+        from_attributes = True
+
+
+class ChunkSearchHit(BaseModel):
+    id: int
+    document_id: int
+    filename: str
+    page_number: int | None = None
+    chunk_index: int
+    snippet: str  # matched terms wrapped in <mark></mark>
+    score: float
+
+
+class ChunkSearchResponse(BaseModel):
+    items: list[ChunkSearchHit]
+    next_cursor: str | None = None
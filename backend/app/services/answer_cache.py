@@ -0,0 +1,204 @@
+"""Semantic answer cache for rag_query and the chat endpoints (consulted by rag.retrieve_many).
+
+Entries are keyed on the normalized question embedding; a lookup hits when a cached
+question is within max_distance (cosine distance) of the new one. Every entry is
+tagged with the corpus version at the time it was answered, so bumping the version
+(on ingestion) makes older answers unreachable. Answers to questions scoped to a
+set of documents only match lookups with the same scope. Eviction is LRU under a
+byte cap.
+"""
+
+from __future__ import annotations
+
+import sys
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+
+from app.config import get_settings
+
+
+@dataclass
+class _Entry:
+    response: str
+    sources: list[dict]
+    corpus_version: int
+    size: int
+    scope: tuple[int, ...] | None = None
+
+
+def _scope_key(scope: tuple[int, ...] | None) -> int:
+    """Per-slot integer tag so a lookup can mask other scopes in one vector op."""
+    return 0 if scope is None else (hash(scope) or 1)
+
+
+def _entry_size(vector: np.ndarray, response: str, sources: list[dict]) -> int:
+    """Rough memory footprint of an entry in bytes."""
+    size = vector.nbytes + sys.getsizeof(response)
+    for s in sources:
+        size += sys.getsizeof(s.get("text") or "") + 64 * len(s.get("metadata") or {})
+    return size
+
+
+class AnswerCache:
+    """Thread-safe LRU of (question vector -> answer, sources).
+
+    Question vectors live in one contiguous matrix (one row per slot) so a lookup is a
+    single matrix-vector product; the OrderedDict keeps slot recency for eviction.
+    """
+
+    def __init__(self, max_bytes: int, max_distance: float):
+        self.max_bytes = max_bytes
+        self.max_distance = max_distance
+        self._entries: OrderedDict[int, _Entry] = OrderedDict()  # slot -> entry, LRU first
+        self._matrix: np.ndarray | None = None
+        self._valid: np.ndarray = np.zeros(0, dtype=bool)
+        self._scope_keys: np.ndarray = np.zeros(0, dtype=np.int64)
+        self._free: list[int] = []
+        self._bytes = 0
+        self._corpus_version = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @property
+    def corpus_version(self) -> int:
+        return self._corpus_version
+
+    def bump_corpus_version(self) -> int:
+        """Invalidate all cached answers (the document corpus changed)."""
+        with self._lock:
+            self._corpus_version += 1
+            self._clear_locked()
+            return self._corpus_version
+
+    def get(
+        self,
+        query_embedding: np.ndarray,
+        scope: tuple[int, ...] | None = None,
+    ) -> tuple[str, list[dict]] | None:
+        """Return (response, sources) of the closest cached question within max_distance
+        that was asked with the same document scope (None = whole corpus)."""
+        q = _normalize(query_embedding)
+        with self._lock:
+            if not self._entries or self._matrix is None or self._matrix.shape[1] != q.shape[0]:
+                self._misses += 1
+                return None
+            sims = self._matrix @ q
+            sims[~self._valid | (self._scope_keys != _scope_key(scope))] = -np.inf
+            slot = int(np.argmax(sims))
+            if 1.0 - float(sims[slot]) > self.max_distance or self._entries[slot].scope != scope:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(slot)
+            self._hits += 1
+            entry = self._entries[slot]
+            return entry.response, entry.sources
+
+    def put(
+        self,
+        query_embedding: np.ndarray,
+        response: str,
+        sources: list[dict],
+        corpus_version: int | None = None,
+        scope: tuple[int, ...] | None = None,
+    ) -> None:
+        """Store an answer. corpus_version is the version seen when retrieval ran."""
+        vector = _normalize(query_embedding)
+        size = _entry_size(vector, response, sources)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            version = self._corpus_version if corpus_version is None else corpus_version
+            if version != self._corpus_version:
+                # Corpus changed while the answer was being generated
+                return
+            while self._entries and self._bytes + size > self.max_bytes:
+                self._evict_locked()
+            slot = self._alloc_slot_locked(vector.shape[0])
+            self._matrix[slot] = vector
+            self._valid[slot] = True
+            self._scope_keys[slot] = _scope_key(scope)
+            self._entries[slot] = _Entry(response, sources, version, size, scope)
+            self._bytes += size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clear_locked()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": (self._hits / lookups) if lookups else 0.0,
+                "evictions": self._evictions,
+                "corpus_version": self._corpus_version,
+            }
+
+    def _alloc_slot_locked(self, dim: int) -> int:
+        if self._matrix is None or self._matrix.shape[1] != dim:
+            self._matrix = np.zeros((64, dim), dtype=np.float32)
+            self._valid = np.zeros(64, dtype=bool)
+            self._scope_keys = np.zeros(64, dtype=np.int64)
+            self._free = list(range(63, -1, -1))
+            self._entries.clear()
+            self._bytes = 0
+        if not self._free:
+            old = self._matrix.shape[0]
+            self._matrix = np.vstack([self._matrix, np.zeros_like(self._matrix)])
+            self._valid = np.concatenate([self._valid, np.zeros(old, dtype=bool)])
+            self._scope_keys = np.concatenate([self._scope_keys, np.zeros(old, dtype=np.int64)])
+            self._free = list(range(2 * old - 1, old - 1, -1))
+        return self._free.pop()
+
+    def _evict_locked(self) -> None:
+        slot, old = self._entries.popitem(last=False)
+        self._valid[slot] = False
+        self._free.append(slot)
+        self._bytes -= old.size
+        self._evictions += 1
+
+    def _clear_locked(self) -> None:
+        self._entries.clear()
+        self._matrix = None
+        self._valid = np.zeros(0, dtype=bool)
+        self._scope_keys = np.zeros(0, dtype=np.int64)
+        self._free = []
+        self._bytes = 0
+
+
+def _normalize(v: np.ndarray) -> np.ndarray:
+    v = np.asarray(v, dtype=np.float32).ravel()
+    norm = float(np.linalg.norm(v))
+    return v / norm if norm > 0 else v
+
+
+_cache: AnswerCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_answer_cache() -> AnswerCache:
+    """Process-wide answer cache configured from Settings."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                settings = get_settings()
+                _cache = AnswerCache(
+                    max_bytes=settings.answer_cache_max_mb * 1024 * 1024,
+                    max_distance=settings.answer_cache_max_distance,
+                )
+    return _cache
+
+
+def bump_corpus_version() -> int:
+    """Called after the document corpus changes; invalidates cached answers."""
+    return get_answer_cache().bump_corpus_version()
@@ -0,0 +1,75 @@
+"""Chat history reads: keyset-paginated pages and a streamed export.
+
+Pages are ordered newest first on (timestamp, id) and continue strictly after
+the last row of the previous page, so page N costs the same as page 1 on the
+(user_id, timestamp, id) index (an OFFSET would re-read every earlier row). The
+export streams rows through a server-side cursor in yield_per batches, so
+memory stays flat however many rows there are.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import AsyncIterator
+
+from sqlalchemy import String, select, tuple_, type_coerce
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Chat
+from app.services.cursors import decode_cursor, encode_cursor
+
+EXPORT_BATCH_ROWS = 1000
+
+
+def _timestamp_key(dialect: str):
+    """Sort/compare expression for chats.timestamp as a cursor can round-trip it.
+
+    SQLite stores the text CURRENT_TIMESTAMP produced ("2026-01-02 03:04:05"),
+    while a bound datetime is rendered with microseconds, which would never
+    compare equal. So on SQLite the key is the stored text itself.
+    """
+    return type_coerce(Chat.timestamp, String) if dialect == "sqlite" else Chat.timestamp
+
+
+async def history_page(
+    session: AsyncSession,
+    user_id: int,
+    limit: int = 50,
+    cursor: str | None = None,
+) -> tuple[list, str | None]:
+    """One page of a user's chats, newest first. Returns (rows, next_cursor or None);
+    raises InvalidCursor."""
+    dialect = session.bind.dialect.name
+    key = _timestamp_key(dialect)
+    stmt = select(Chat, key.label("timestamp_key")).where(Chat.user_id == user_id)
+    if cursor:
+        after_ts, after_id = decode_cursor(cursor, str, int)
+        after = after_ts if dialect == "sqlite" else datetime.fromisoformat(after_ts)
+        # A row-value comparison, not key < after OR (key = after AND id < after_id):
+        # SQLite only turns the former into an index range, the latter rescans newer rows
+        stmt = stmt.where(tuple_(key, Chat.id) < tuple_(after, after_id))
+    stmt = stmt.order_by(key.desc(), Chat.id.desc()).limit(limit + 1)
+    rows = (await session.execute(stmt)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        ts = last.timestamp_key
+        next_cursor = encode_cursor(ts.isoformat() if isinstance(ts, datetime) else ts, last.Chat.id)
+    return [row.Chat for row in rows[:limit]], next_cursor
+
+
+async def iter_history(session: AsyncSession, user_id: int | None = None) -> AsyncIterator[list]:
+    """Batches of chat rows (id, user_id, question, response, timestamp), oldest first,
+    for one user or everyone, read through a server-side cursor."""
+    stmt = select(Chat.id, Chat.user_id, Chat.question, Chat.response, Chat.timestamp)
+    if user_id is not None:
+        key = _timestamp_key(session.bind.dialect.name)
+        stmt = stmt.where(Chat.user_id == user_id).order_by(key, Chat.id)
+    else:
+        stmt = stmt.order_by(Chat.id)
+    result = await session.stream(stmt.execution_options(yield_per=EXPORT_BATCH_ROWS))
+    try:
+        async for partition in result.partitions():
+            yield partition
+    finally:
+        await result.close()
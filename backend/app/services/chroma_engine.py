@@ -0,0 +1,402 @@
+"""ChromaDB vector engine (default): persistent HNSW collection with metadata filters.
+
+With partitions enabled (settings.chroma_group_partitions, off by default) chunks of
+documents that belong to a group (Document.collection, carried in chunk metadata as
+"collection") are also written to that group's collection, rag_chunks_group_<hash>.
+Unscoped queries use the global collection. A scope made of whole groups (what a
+`collection` chat scope resolves to) queries one partition per group and merges by
+distance, so it costs one small query whatever the corpus size. Any other scope
+uses a `where` filter on the global collection, which still walks its whole HNSW
+graph. That includes arbitrary document_ids and part of a group, so their latency
+still grows with the corpus. The price is a second copy of grouped chunks. Each
+partition records its member documents in its metadata ("doc_<id>" keys). Only documents whose every chunk is labelled are members, so a
+document ingested before its label was written stays on the global path.
+Partitions are backfilled from the global collection the first time the engine
+opens with them enabled, and dropped when it opens with them disabled.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+# Disable Chroma telemetry before import (avoids capture() argument errors)
+os.environ.setdefault("ANONYMIZED_TELEMETRY", "FALSE")
+
+import chromadb
+import numpy as np
+from chromadb.config import Settings as ChromaSettings
+
+from app.config import get_settings
+
+COLLECTION_NAME = "rag_chunks"
+PARTITION_PREFIX = f"{COLLECTION_NAME}_group_"
+LEGACY_PARTITION_PREFIX = f"{COLLECTION_NAME}_doc_"  # per-document partitions of earlier versions
+PARTITIONED_FLAG = "partitioned"  # global collection metadata key: partitions are complete
+GROUP_KEY = "group"  # partition metadata: the group name
+MEMBER_PREFIX = "doc_"  # partition metadata: "doc_<id>": 1 per member document
+BACKFILL_BATCH = 5000
+
+
+def _partition_name(group: str) -> str:
+    # Chroma names allow 3-63 chars of [a-zA-Z0-9._-]; group labels are free text
+    return PARTITION_PREFIX + hashlib.sha1(group.encode("utf-8")).hexdigest()[:16]
+
+
+def _group_by_document(metadatas: list[dict | None]) -> dict[int, list[int]]:
+    """document_id -> positions in the batch (chunks without one are left out)."""
+    groups: dict[int, list[int]] = {}
+    for i, meta in enumerate(metadatas):
+        document_id = (meta or {}).get("document_id")
+        if document_id is not None:
+            groups.setdefault(int(document_id), []).append(i)
+    return groups
+
+
+def _unpack(results: dict, query: int = 0) -> list[tuple[float, dict]]:
+    """(distance, chunk dict) pairs for one query of a Chroma query result."""
+
+    def column(key: str) -> list:
+        lists = results.get(key) or []
+        return lists[query] if query < len(lists) and lists[query] is not None else []
+
+    query_ids = column("ids")
+    metas, docs, distances = column("metadatas"), column("documents"), column("distances")
+    out: list[tuple[float, dict]] = []
+    for i, chunk_id in enumerate(query_ids):
+        meta = metas[i] if i < len(metas) else {}
+        doc = docs[i] if i < len(docs) else ""
+        if not isinstance(doc, str):
+            doc = str(doc) if doc is not None else ""
+        distance = distances[i] if i < len(distances) else float(i)
+        out.append((distance, {"id": chunk_id, "metadata": meta, "document": doc}))
+    return out
+
+
+class _Partition:
+    """A group's collection, its chunk count and its member documents."""
+
+    __slots__ = ("collection", "count", "documents")
+
+    def __init__(self, collection, count: int, documents: set[int]):
+        self.collection = collection
+        self.count = count
+        self.documents = documents
+
+
+class ChromaEngine:
+    """One client/collection per process; chunk counts (global and per partition) and
+    partition membership are tracked in memory so queries need no count() round trip.
+    Partition bookkeeping is changed only under _lock (writes run on several threads)."""
+
+    name = "chroma"
+
+    def __init__(self, path: str | None = None, partitions: bool = False):
+        self.path = path
+        self.partitions = partitions
+        self._client = None
+        self._collection = None
+        self._count: int | None = None
+        self._partitions: dict[str, _Partition] = {}  # group -> partition
+        self._groups: dict[int, str] = {}  # member document_id -> group
+        self._lock = threading.Lock()
+
+    def open(self):
+        """Open the client and collection (idempotent). Returns the collection."""
+        if self._collection is not None:
+            return self._collection
+        with self._lock:
+            if self._collection is None:
+                self._client = chromadb.PersistentClient(
+                    path=self.path or get_settings().vector_store_path,
+                    settings=ChromaSettings(anonymized_telemetry=False),
+                )
+                try:
+                    # Not get_or_create_collection: it would overwrite the stored metadata
+                    collection = self._client.get_collection(COLLECTION_NAME)
+                except ValueError:
+                    collection = self._client.create_collection(
+                        name=COLLECTION_NAME,
+                        metadata={"description": "RAG document chunks"},
+                    )
+                self._count = collection.count()
+                partitioned = bool((collection.metadata or {}).get(PARTITIONED_FLAG))
+                self._drop_partitions(LEGACY_PARTITION_PREFIX)
+                if self.partitions and partitioned:
+                    self._load_partitions()
+                elif self.partitions:
+                    self._backfill_partitions(collection)
+                elif partitioned:
+                    self._drop_partitions(PARTITION_PREFIX)
+                    self._set_partitioned(collection, False)
+                self._collection = collection
+        return self._collection
+
+    def close(self) -> None:
+        """Release the client (stops Chroma's system and closes SQLite)."""
+        with self._lock:
+            if self._client is not None:
+                self._client.clear_system_cache()
+            self._client = None
+            self._collection = None
+            self._count = None
+            self._partitions.clear()
+            self._groups.clear()
+
+    @property
+    def collection(self):
+        return self.open()
+
+    def count(self) -> int:
+        self.open()
+        return self._count or 0
+
+    def _adjust_count(self, delta: int) -> None:
+        with self._lock:
+            if self._count is not None:
+                self._count = max(0, self._count + delta)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "partitioned": self.partitions,
+                "partitions": len(self._partitions),
+                "partitioned_documents": len(self._groups),
+            }
+
+    # --- per-group partitions (callers hold _lock) ----------------------------------
+
+    def _set_partitioned(self, collection, value: bool) -> None:
+        metadata = dict(collection.metadata or {})
+        metadata[PARTITIONED_FLAG] = int(value)
+        collection.modify(metadata=metadata)
+
+    def _load_partitions(self) -> None:
+        for existing in self._client.list_collections():
+            metadata = existing.metadata or {}
+            if not existing.name.startswith(PARTITION_PREFIX) or GROUP_KEY not in metadata:
+                continue
+            group = metadata[GROUP_KEY]
+            documents = {int(key[len(MEMBER_PREFIX):]) for key in metadata if key.startswith(MEMBER_PREFIX)}
+            self._partitions[group] = _Partition(existing, existing.count(), documents)
+            self._groups.update((document_id, group) for document_id in documents)
+
+    def _backfill_partitions(self, collection) -> None:
+        """Copy labelled chunks into their groups; documents with any unlabelled chunk
+        are left out (and their copied chunks removed)."""
+        self._drop_partitions(PARTITION_PREFIX)
+        labelled: dict[int, str] = {}
+        unlabelled: set[int] = set()
+        offset = 0
+        while True:
+            got = collection.get(
+                include=["embeddings", "metadatas", "documents"], limit=BACKFILL_BATCH, offset=offset
+            )
+            if not got["ids"]:
+                break
+            for meta in got["metadatas"]:
+                meta = meta or {}
+                if meta.get("document_id") is None:
+                    continue
+                if meta.get("collection"):
+                    labelled[int(meta["document_id"])] = meta["collection"]
+                else:
+                    unlabelled.add(int(meta["document_id"]))
+            self._write_partitions(
+                "add", got["ids"], got["embeddings"], got["metadatas"], got["documents"], members=None
+            )
+            offset += len(got["ids"])
+        for document_id, group in labelled.items():
+            if document_id in unlabelled:
+                self._remove_from_partition(group, document_id)
+            else:
+                self._groups[document_id] = group
+                self._partitions[group].documents.add(document_id)
+        for group in self._partitions:
+            self._save_members(group)
+        self._set_partitioned(collection, True)
+
+    def _drop_partitions(self, prefix: str) -> None:
+        for existing in self._client.list_collections():
+            if existing.name.startswith(prefix):
+                self._client.delete_collection(existing.name)
+        if prefix == PARTITION_PREFIX:
+            self._partitions.clear()
+            self._groups.clear()
+
+    def _partition(self, group: str) -> _Partition:
+        partition = self._partitions.get(group)
+        if partition is None:
+            collection = self._client.get_or_create_collection(
+                name=_partition_name(group), metadata={GROUP_KEY: group}
+            )
+            partition = self._partitions[group] = _Partition(collection, collection.count(), set())
+        return partition
+
+    def _save_members(self, group: str) -> None:
+        partition = self._partitions[group]
+        metadata = {GROUP_KEY: group}
+        metadata.update((f"{MEMBER_PREFIX}{document_id}", 1) for document_id in sorted(partition.documents))
+        partition.collection.modify(metadata=metadata)
+
+    def _remove_from_partition(self, group: str, document_id: int) -> None:
+        partition = self._partitions.get(group)
+        if partition is None:
+            return
+        ids = partition.collection.get(where={"document_id": document_id}, include=[])["ids"]
+        if ids:
+            partition.collection.delete(ids=ids)
+            partition.count = max(0, partition.count - len(ids))
+
+    def _write_partitions(self, method: str, ids, embeddings, metadatas, documents, members: bool | None) -> None:
+        """Mirror an add/upsert into the group collections. members=True (a fresh
+        ingestion) makes the documents members; False only touches existing members;
+        None (backfill) copies labelled chunks and leaves membership to the caller."""
+        for document_id, rows in _group_by_document(metadatas).items():
+            group = (metadatas[rows[0]] or {}).get("collection")
+            if not group or (members is False and self._groups.get(document_id) != group):
+                continue
+            if members is None:
+                rows = [i for i in rows if (metadatas[i] or {}).get("collection") == group]
+            partition = self._partition(group)
+            part_ids = [ids[i] for i in rows]
+            existing = len(partition.collection.get(ids=part_ids, include=[])["ids"]) if method == "upsert" else 0
+            getattr(partition.collection, method)(
+                ids=part_ids,
+                embeddings=[embeddings[i] for i in rows],
+                metadatas=[metadatas[i] for i in rows],
+                documents=[documents[i] for i in rows],
+            )
+            partition.count += len(part_ids) - existing
+            if members and document_id not in partition.documents:
+                partition.documents.add(document_id)
+                self._groups[document_id] = group
+                self._save_members(group)
+
+    # --- writes ----------------------------------------------------------------------
+
+    def add(self, ids, embeddings, metadatas, documents) -> None:
+        # Chroma only accepts nested Python lists; convert the whole batch in one call
+        vectors = np.asarray(embeddings).tolist()
+        self.collection.add(ids=ids, embeddings=vectors, metadatas=metadatas, documents=documents)
+        self._adjust_count(len(ids))
+        if self.partitions:
+            with self._lock:
+                self._write_partitions("add", ids, vectors, metadatas, documents, members=True)
+
+    def upsert(self, ids, embeddings, metadatas, documents) -> None:
+        coll = self.collection
+        vectors = np.asarray(embeddings).tolist()
+        existing = len(coll.get(ids=ids, include=[])["ids"])
+        coll.upsert(ids=ids, embeddings=vectors, metadatas=metadatas, documents=documents)
+        self._adjust_count(len(ids) - existing)
+        if self.partitions:
+            with self._lock:
+                self._write_partitions("upsert", ids, vectors, metadatas, documents, members=False)
+
+    def update_metadata(self, ids, metadatas) -> None:
+        self.collection.update(ids=ids, metadatas=metadatas)
+        if not self.partitions:
+            return
+        with self._lock:
+            for document_id, rows in _group_by_document(metadatas).items():
+                group = self._groups.get(document_id)
+                if group is not None:
+                    self._partitions[group].collection.update(
+                        ids=[ids[i] for i in rows], metadatas=[metadatas[i] for i in rows]
+                    )
+
+    def delete(self, ids=None, document_id=None) -> int:
+        coll = self.collection
+        if ids is None:
+            if document_id is None:
+                return 0
+            ids = coll.get(where={"document_id": document_id}, include=[])["ids"]
+            if self.partitions:
+                with self._lock:
+                    group = self._groups.pop(document_id, None)
+                    if group is not None:
+                        self._remove_from_partition(group, document_id)
+                        self._partitions[group].documents.discard(document_id)
+                        self._save_members(group)
+        else:
+            got = coll.get(ids=ids, include=["metadatas"] if self.partitions else [])
+            ids = got["ids"]
+            if self.partitions and ids:
+                with self._lock:
+                    for part_document_id, rows in _group_by_document(got["metadatas"]).items():
+                        group = self._groups.get(part_document_id)
+                        if group is not None:
+                            partition = self._partitions[group]
+                            partition.collection.delete(ids=[ids[i] for i in rows])
+                            partition.count = max(0, partition.count - len(rows))
+        if not ids:
+            return 0
+        coll.delete(ids=ids)
+        self._adjust_count(-len(ids))
+        return len(ids)
+
+    # --- reads -----------------------------------------------------------------------
+
+    def get(self, ids) -> list[dict]:
+        got = self.collection.get(ids=ids, include=["metadatas", "documents"])
+        found = {
+            chunk_id: {"id": chunk_id, "metadata": meta or {}, "document": doc or ""}
+            for chunk_id, meta, doc in zip(got["ids"], got["metadatas"], got["documents"])
+        }
+        return [found[i] for i in ids if i in found]
+
+    def _partition_plan(self, scope: set[int]) -> list[tuple[object, int]] | None:
+        """(collection, size) of each group when the scope is exactly a union of whole
+        groups, else None (search the global collection with a filter: Chroma's metadata
+        filter costs about the same on a partition as on the global collection)."""
+        with self._lock:
+            by_group: dict[str, int] = {}
+            for document_id in scope:
+                group = self._groups.get(document_id)
+                if group is None:
+                    return None
+                by_group[group] = by_group.get(group, 0) + 1
+            plan = []
+            for group, members in by_group.items():
+                partition = self._partitions[group]
+                if members != len(partition.documents):
+                    return None
+                if partition.count:
+                    plan.append((partition.collection, partition.count))
+            return plan
+
+    def search(self, query_embedding, top_k, document_ids=None) -> list[dict]:
+        return self.search_many([query_embedding], top_k, document_ids=document_ids)[0]
+
+    def search_many(self, query_embeddings, top_k, document_ids=None) -> list[list[dict]]:
+        """Top_k chunks for each query: one Chroma query call carrying all embeddings
+        (one per scoped group when partitioned)."""
+        if len(query_embeddings) == 0:
+            return []
+        coll = self.collection
+        queries = np.asarray(query_embeddings, dtype=np.float32).reshape(len(query_embeddings), -1).tolist()
+        include = ["metadatas", "documents", "distances"]
+        if document_ids is not None and self.partitions:
+            plan = self._partition_plan(set(document_ids))
+            if plan is not None:
+                hits: list[list[tuple[float, dict]]] = [[] for _ in queries]
+                for collection, size in plan:
+                    results = collection.query(query_embeddings=queries, n_results=min(top_k, size), include=include)
+                    for i, query_hits in enumerate(hits):
+                        query_hits.extend(_unpack(results, i))
+                return [[chunk for _, chunk in sorted(query_hits, key=lambda hit: hit[0])[:top_k]] for query_hits in hits]
+        where = None
+        if document_ids is not None:
+            scope = sorted(set(document_ids))
+            if not scope:
+                return [[] for _ in queries]
+            where = {"document_id": scope[0]} if len(scope) == 1 else {"document_id": {"$in": scope}}
+        # Chroma returns lists of lists: one list per query embedding
+        results = coll.query(
+            query_embeddings=queries,
+            n_results=min(top_k, max(1, self._count or 0)),  # avoid asking for more than exist
+            where=where,
+            include=include,
+        )
+        return [[chunk for _, chunk in _unpack(results, i)] for i in range(len(queries))]
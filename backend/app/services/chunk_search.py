@@ -0,0 +1,80 @@
+"""Full-text search over ingested chunks (SQLite FTS5): ranked snippets, no model/LLM."""
+
+from __future__ import annotations
+
+import re
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.fts import FTS_TABLE
+from app.services.cursors import decode_cursor, encode_cursor
+
+SNIPPET_TOKENS = 24
+SNIPPET_OPEN = "<mark>"
+SNIPPET_CLOSE = "</mark>"
+
+_TERM_RE = re.compile(r"\w[\w\-./]*", re.UNICODE)
+
+
+def build_match_query(q: str) -> str:
+    """
+    Turn free text into an FTS5 query: every term quoted (so user input never parses as
+    FTS syntax) and AND-ed; identifier-like terms ("XK-4471") match as a phrase.
+    """
+    terms = _TERM_RE.findall(q)
+    return " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+async def search_chunks(
+    session: AsyncSession,
+    q: str,
+    limit: int = 20,
+    cursor: str | None = None,
+    document_id: int | None = None,
+) -> tuple[list[dict], str | None]:
+    """
+    Best-first chunks matching q, limit per page. Pages are keyed on (bm25 score, row id)
+    so later pages cost the same as the first. Returns (hits, next_cursor or None).
+    """
+    match = build_match_query(q)
+    if not match:
+        return [], None
+    params: dict = {"match": match, "limit": limit + 1, "document_id": document_id}
+    after = ""
+    if cursor:
+        params["after_score"], params["after_id"] = decode_cursor(cursor, float, int)
+        after = "AND (m.score > :after_score OR (m.score = :after_score AND m.row_id > :after_id))"
+    sql = text(
+        f"""
+        SELECT m.row_id, m.score, m.snippet, e.document_id, e.page_number, e.chunk_index, d.filename
+        FROM (
+            SELECT rowid AS row_id,
+                   bm25({FTS_TABLE}) AS score,
+                   snippet({FTS_TABLE}, 0, '{SNIPPET_OPEN}', '{SNIPPET_CLOSE}', '…', {SNIPPET_TOKENS}) AS snippet
+            FROM {FTS_TABLE}
+            WHERE {FTS_TABLE} MATCH :match
+        ) AS m
+        JOIN embeddings AS e ON e.id = m.row_id
+        JOIN documents AS d ON d.id = e.document_id
+        WHERE (:document_id IS NULL OR e.document_id = :document_id) {after}
+        ORDER BY m.score, m.row_id
+        LIMIT :limit
+        """
+    )
+    rows = (await session.execute(sql, params)).all()
+    hits = [
+        {
+            "id": row.row_id,
+            "document_id": row.document_id,
+            "filename": row.filename,
+            "page_number": row.page_number,
+            "chunk_index": row.chunk_index,
+            "snippet": row.snippet,
+            # bm25() is lower-is-better; expose higher-is-better
+            "score": -row.score,
+        }
+        for row in rows[:limit]
+    ]
+    next_cursor = encode_cursor(rows[limit - 1].score, rows[limit - 1].row_id) if len(rows) > limit else None
+    return hits, next_cursor
@@ -1,5 +1,7 @@
 """Split text into semantic chunks for RAG."""
 
+from typing import Iterable, Iterator
+
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 
 
@@ -20,6 +22,20 @@ def get_text_splitter(
     )
 
 
+def iter_chunks(
+    pages: Iterable[tuple[int, str]],
+    chunk_size: int = CHUNK_SIZE,
+    chunk_overlap: int = CHUNK_OVERLAP,
+) -> Iterator[tuple[str, int | None]]:
+    """Lazily split a stream of (page_number, text) into (chunk_text, page_number)."""
+    splitter = get_text_splitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    for page_num, text in pages:
+        if not text:
+            continue
+        for chunk in splitter.split_text(text):
+            yield chunk, page_num
+
+
 def chunk_pages(
     pages: list[tuple[int, str]],
     chunk_size: int = CHUNK_SIZE,
@@ -29,11 +45,4 @@ def chunk_pages(
     Split page texts into chunks. Returns list of (chunk_text, page_number).
     page_number is None when chunk spans multiple pages (we use first page).
     """
-    splitter = get_text_splitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
-    result: list[tuple[str, int | None]] = []
-    for page_num, text in pages:
-        if not text:
-            continue
-        for chunk in splitter.split_text(text):
-            result.append((chunk, page_num))
-    return result
+    return list(iter_chunks(pages, chunk_size=chunk_size, chunk_overlap=chunk_overlap))
@@ -0,0 +1,196 @@
+"""Token-budgeted context assembly for the RAG prompt.
+
+Retrieved chunks overlap: the splitter repeats up to CHUNK_OVERLAP characters between
+neighbouring chunks, and hybrid retrieval often returns neighbours together. Before
+prompting, chunks from the same document and page are merged when they are adjacent
+(consecutive chunk_index) or their texts overlap, with the repeated span kept once;
+chunks contained in another and exact duplicates are dropped. The resulting passages
+fill the token budget in relevance order (best chunk first), so Ollama prefills fewer
+tokens for the same evidence.
+"""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass, field
+
+from app.config import get_settings
+
+CONTEXT_SEPARATOR = "\n\n---\n\n"
+# Rough chars-per-token of English text for Llama-family tokenizers
+CHARS_PER_TOKEN = 4
+# Shortest prefix match accepted as a real overlap between two chunks
+MIN_OVERLAP_CHARS = 16
+# Do not add a truncated passage shorter than this
+MIN_PARTIAL_TOKENS = 48
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+@dataclass
+class PackedContext:
+    text: str
+    tokens: int  # estimated tokens of text
+    naive_tokens: int  # estimated tokens of all chunks joined as-is
+    chunks: int  # chunks in
+    passages: int  # passages out, after merging
+    truncated: bool = False
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(0, self.naive_tokens - self.tokens)
+
+    def as_dict(self) -> dict:
+        return {
+            "tokens": self.tokens,
+            "naive_tokens": self.naive_tokens,
+            "tokens_saved": self.tokens_saved,
+            "chunks": self.chunks,
+            "passages": self.passages,
+            "truncated": self.truncated,
+        }
+
+
+@dataclass
+class _Passage:
+    rank: int  # best relevance rank among merged chunks (0 = most relevant)
+    key: tuple
+    first_index: int
+    last_index: int
+    text: str
+    members: list[int] = field(default_factory=list)
+
+
+def overlap_length(a: str, b: str, min_overlap: int = MIN_OVERLAP_CHARS) -> int:
+    """Length of the longest suffix of a that is a prefix of b (0 if below min_overlap)."""
+    if len(a) < min_overlap or len(b) < min_overlap:
+        return 0
+    probe = b[:min_overlap]
+    pos = a.find(probe, max(0, len(a) - len(b)))
+    while pos != -1:
+        k = len(a) - pos
+        if b.startswith(a[pos:]):
+            return k
+        pos = a.find(probe, pos + 1)
+    return 0
+
+
+def _merge(first: _Passage, second: _Passage) -> _Passage | None:
+    """Merge second (later in the document) into first if adjacent, overlapping or contained."""
+    if second.text in first.text:
+        merged_text = first.text
+    else:
+        k = overlap_length(first.text, second.text)
+        if k == 0 and second.first_index != first.last_index + 1:
+            return None
+        merged_text = first.text + (second.text[k:] if k else "\n" + second.text)
+    return _Passage(
+        rank=min(first.rank, second.rank),
+        key=first.key,
+        first_index=first.first_index,
+        last_index=max(first.last_index, second.last_index),
+        text=merged_text,
+        members=first.members + second.members,
+    )
+
+
+def _passages(chunks: list[dict]) -> list[_Passage]:
+    groups: dict[tuple, list[_Passage]] = {}
+    for rank, chunk in enumerate(chunks):
+        meta = chunk.get("metadata") or {}
+        text = (chunk.get("document") or "").strip()
+        if not text:
+            continue
+        index = meta.get("chunk_index")
+        key = (meta.get("document_id"), meta.get("page_number"))
+        if index is None:
+            # Unknown position: never merged, only de-duplicated
+            key, index = ("chunk", rank), 0
+        groups.setdefault(key, []).append(_Passage(rank, key, int(index), int(index), text, [rank]))
+
+    passages: list[_Passage] = []
+    for group in groups.values():
+        group.sort(key=lambda p: p.first_index)
+        current = group[0]
+        for nxt in group[1:]:
+            merged = _merge(current, nxt)
+            if merged is None:
+                passages.append(current)
+                current = nxt
+            else:
+                current = merged
+        passages.append(current)
+
+    passages.sort(key=lambda p: p.rank)
+    # The same text under another document/page (e.g. a re-uploaded copy) is kept once
+    unique: list[_Passage] = []
+    for passage in passages:
+        if not any(passage.text in kept.text for kept in unique):
+            unique.append(passage)
+    return unique
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    limit = max_tokens * CHARS_PER_TOKEN
+    cut = text.rfind(" ", 0, limit)
+    return text[: cut if cut > limit // 2 else limit].rstrip() + " …"
+
+
+def pack_context(chunks: list[dict], token_budget: int | None = None) -> PackedContext:
+    """
+    Build the prompt context from chunks in relevance order (similarity_search dicts).
+    token_budget defaults to settings.context_token_budget (0 = unlimited).
+    """
+    if token_budget is None:
+        token_budget = get_settings().context_token_budget
+    naive = CONTEXT_SEPARATOR.join(c.get("document", "") or "" for c in chunks)
+    separator_tokens = estimate_tokens(CONTEXT_SEPARATOR)
+
+    selected: list[str] = []
+    used = 0
+    truncated = False
+    passages = _passages(chunks)
+    for passage in passages:
+        cost = estimate_tokens(passage.text) + (separator_tokens if selected else 0)
+        if token_budget and used + cost > token_budget:
+            remaining = token_budget - used - (separator_tokens if selected else 0)
+            if remaining >= MIN_PARTIAL_TOKENS or not selected:
+                selected.append(_truncate(passage.text, max(remaining, MIN_PARTIAL_TOKENS)))
+            truncated = True
+            break
+        selected.append(passage.text)
+        used += cost
+
+    text = CONTEXT_SEPARATOR.join(selected)
+    packed = PackedContext(
+        text=text,
+        tokens=estimate_tokens(text),
+        naive_tokens=estimate_tokens(naive),
+        chunks=len(chunks),
+        passages=len(selected),
+        truncated=truncated,
+    )
+    _record(packed)
+    return packed
+
+
+_stats_lock = threading.Lock()
+_stats = {"requests": 0, "naive_tokens": 0, "tokens": 0, "tokens_saved": 0, "truncated": 0}
+
+
+def _record(packed: PackedContext) -> None:
+    with _stats_lock:
+        _stats["requests"] += 1
+        _stats["naive_tokens"] += packed.naive_tokens
+        _stats["tokens"] += packed.tokens
+        _stats["tokens_saved"] += packed.tokens_saved
+        _stats["truncated"] += int(packed.truncated)
+
+
+def get_packer_stats() -> dict:
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["saved_ratio"] = (stats["tokens_saved"] / stats["naive_tokens"]) if stats["naive_tokens"] else 0.0
+    return stats
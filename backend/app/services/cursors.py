@@ -0,0 +1,27 @@
+"""Opaque keyset-pagination cursors: the sort key of the last row on a page,
+as URL-safe base64 JSON. Clients pass next_cursor back unchanged."""
+
+from __future__ import annotations
+
+import base64
+import json
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(*keys) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(keys)).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *types: type) -> tuple:
+    """Decode a cursor into len(types) keys, each converted with its type."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        keys = json.loads(base64.urlsafe_b64decode(padded))
+        if not isinstance(keys, list) or len(keys) != len(types):
+            raise ValueError("wrong number of keys")
+        return tuple(kind(key) for kind, key in zip(types, keys))
+    except Exception as e:
+        raise InvalidCursor("Invalid cursor") from e
@@ -0,0 +1,144 @@
+"""Cross-request micro-batching for embedding calls.
+
+Concurrent callers (one question each) are collected for up to max_wait_ms or
+max_batch_size texts and encoded in a single model.encode call; each caller gets
+back only its own rows.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Callable
+
+import numpy as np
+
+# Upper bounds (inclusive) of the batch-size histogram buckets; last bucket is +Inf
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+@dataclass
+class _Request:
+    texts: list[str]
+    future: Future = field(default_factory=Future)
+
+
+class EmbeddingBatcher:
+    """Background thread that coalesces embedding requests into batched encode calls."""
+
+    def __init__(
+        self,
+        encode: Callable[[list[str]], np.ndarray],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+    ):
+        self._encode = encode
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue: queue.Queue[_Request | None] = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._requests = 0
+        self._batches = 0
+        self._texts = 0
+        self._histogram = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """Embed texts, sharing one encode call with any concurrent callers."""
+        if not texts:
+            return self._encode(texts)
+        if len(texts) >= self.max_batch_size:
+            # Already a full batch (e.g. ingestion); queueing would only add latency
+            self._record(requests=1, batch_size=len(texts))
+            return self._encode(texts)
+        self._ensure_started()
+        req = _Request(texts)
+        self._queue.put(req)
+        return req.future.result()
+
+    def close(self) -> None:
+        """Stop the worker thread after draining queued requests."""
+        with self._start_lock:
+            if self._thread is None:
+                return
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def stats(self) -> dict:
+        """Counters for tuning max_wait_ms / max_batch_size."""
+        with self._stats_lock:
+            labels = [str(b) for b in BATCH_SIZE_BUCKETS] + ["+Inf"]
+            return {
+                "requests": self._requests,
+                "batches": self._batches,
+                "texts": self._texts,
+                "mean_batch_size": (self._texts / self._batches) if self._batches else 0.0,
+                "batch_size_histogram": dict(zip(labels, self._histogram)),
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+            }
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._thread.start()
+
+    def _record(self, requests: int, batch_size: int) -> None:
+        bucket = len(BATCH_SIZE_BUCKETS)
+        for i, bound in enumerate(BATCH_SIZE_BUCKETS):
+            if batch_size <= bound:
+                bucket = i
+                break
+        with self._stats_lock:
+            self._requests += requests
+            self._batches += 1
+            self._texts += batch_size
+            self._histogram[bucket] += 1
+
+    def _collect(self, first: _Request) -> tuple[list[_Request], bool]:
+        """Gather requests until the batch is full or max_wait elapses. Returns (batch, stop)."""
+        batch = [first]
+        size = len(first.texts)
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                req = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if req is None:
+                return batch, True
+            batch.append(req)
+            size += len(req.texts)
+        return batch, False
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch, stop = self._collect(first)
+            texts = [t for req in batch for t in req.texts]
+            try:
+                vectors = self._encode(texts)
+            except BaseException as e:
+                for req in batch:
+                    req.future.set_exception(e)
+                continue
+            self._record(requests=len(batch), batch_size=len(texts))
+            offset = 0
+            for req in batch:
+                n = len(req.texts)
+                req.future.set_result(vectors[offset:offset + n])
+                offset += n
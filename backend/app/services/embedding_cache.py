@@ -0,0 +1,209 @@
+"""Persistent chunk-hash -> embedding cache, plus counters of embedding work saved.
+
+Vectors are stored in a small SQLite file (settings.embedding_cache_path) keyed by
+SHA-256 of (model name, chunk text), so re-uploads and revisions that share chunks
+reuse stored vectors instead of calling the model.
+
+The file is bounded by settings.embedding_cache_max_mb: each row records when it was
+last read or written, and once the stored vectors exceed the cap the least recently
+used rows are deleted down to 90% of it (SQLite reuses the freed pages). Changing
+the embedding model clears the cache, since no old key can be hit again.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+
+from app.config import get_settings
+
+
+def chunk_hash(text: str, model: str | None = None) -> str:
+    """Cache key of a chunk for the given (default: configured) embedding model."""
+    model = model or get_settings().sentence_transformer_model
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Thread-safe SQLite-backed map of chunk hash -> float32 vector, LRU-bounded by
+    max_bytes of vector data (0 = unbounded)."""
+
+    def __init__(self, path: str, model: str = "", max_bytes: int = 0):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunk_embeddings ("
+            "hash TEXT PRIMARY KEY, dim INTEGER NOT NULL, vector BLOB NOT NULL, "
+            "used INTEGER NOT NULL DEFAULT 0)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(chunk_embeddings)")}
+        if "used" not in columns:  # cache file from before the size bound
+            self._conn.execute("ALTER TABLE chunk_embeddings ADD COLUMN used INTEGER NOT NULL DEFAULT 0")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_chunk_embeddings_used ON chunk_embeddings (used)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS cache_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        stored = self._conn.execute("SELECT value FROM cache_meta WHERE key = 'model'").fetchone()
+        if model and (stored is None or stored[0] != model):
+            if stored is not None:
+                # Keys include the model name, so another model's rows are dead weight
+                self._conn.execute("DELETE FROM chunk_embeddings")
+            self._conn.execute("INSERT OR REPLACE INTO cache_meta (key, value) VALUES ('model', ?)", (model,))
+        self._conn.commit()
+        self._rows, self._bytes, self._clock = self._conn.execute(
+            "SELECT count(*), coalesce(sum(length(vector)), 0), coalesce(max(used), 0) FROM chunk_embeddings"
+        ).fetchone()
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def _tick(self) -> int:
+        self._clock += 1
+        return self._clock
+
+    def get_many(self, hashes: list[str]) -> dict[str, np.ndarray]:
+        found: dict[str, np.ndarray] = {}
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(hashes), 500):
+                part = hashes[start:start + 500]
+                marks = ",".join("?" * len(part))
+                for h, dim, blob in self._conn.execute(
+                    f"SELECT hash, dim, vector FROM chunk_embeddings WHERE hash IN ({marks})", part
+                ):
+                    found[h] = np.frombuffer(blob, dtype=np.float32, count=dim)
+            if found and self.max_bytes:
+                self._conn.executemany(
+                    "UPDATE chunk_embeddings SET used = ? WHERE hash = ?", ((self._tick(), h) for h in found)
+                )
+                self._conn.commit()
+        return found
+
+    def put_many(self, items: dict[str, np.ndarray]) -> None:
+        if not items:
+            return
+        with self._lock:
+            rows = [
+                (h, int(v.shape[0]), np.ascontiguousarray(v, dtype=np.float32).tobytes(), self._tick())
+                for h, v in items.items()
+            ]
+            # Keys are content hashes, so a row that already exists holds the same vector
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO chunk_embeddings (hash, dim, vector, used) VALUES (?, ?, ?, ?)", rows
+            )
+            inserted = self._conn.total_changes - before
+            self._rows += inserted
+            self._bytes += inserted * sum(len(r[2]) for r in rows) // len(rows)
+            self._prune()
+            self._conn.commit()
+
+    def _prune(self) -> None:
+        """Delete least recently used rows down to 90% of max_bytes (lock held)."""
+        if not self.max_bytes or self._bytes <= self.max_bytes or not self._rows:
+            return
+        per_row = self._bytes / self._rows
+        drop = min(self._rows, math.ceil((self._bytes - self.max_bytes * 0.9) / per_row))
+        self._conn.execute(
+            "DELETE FROM chunk_embeddings WHERE hash IN "
+            "(SELECT hash FROM chunk_embeddings ORDER BY used LIMIT ?)",
+            (drop,),
+        )
+        self._rows, self._bytes = self._conn.execute(
+            "SELECT count(*), coalesce(sum(length(vector)), 0) FROM chunk_embeddings"
+        ).fetchone()
+        self.evictions += drop
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "rows": self._rows,
+                "mb": round(self._bytes / 2**20, 2),
+                "max_mb": round(self.max_bytes / 2**20, 2),
+                "evictions": self.evictions,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_cache: EmbeddingCache | None = None
+_cache_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {
+    "chunk_hits": 0,
+    "chunk_misses": 0,
+    "duplicate_uploads": 0,
+    "duplicate_upload_chunks": 0,
+}
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                settings = get_settings()
+                _cache = EmbeddingCache(
+                    settings.embedding_cache_path,
+                    model=settings.sentence_transformer_model,
+                    max_bytes=settings.embedding_cache_max_mb * 2**20,
+                )
+    return _cache
+
+
+def close_embedding_cache() -> None:
+    global _cache
+    with _cache_lock:
+        if _cache is not None:
+            _cache.close()
+        _cache = None
+
+
+def _count(**deltas: int) -> None:
+    with _stats_lock:
+        for key, delta in deltas.items():
+            _stats[key] += delta
+
+
+def record_duplicate_upload(chunks: int) -> None:
+    """An identical file was uploaded again; chunks is the embedding work skipped."""
+    _count(duplicate_uploads=1, duplicate_upload_chunks=chunks)
+
+
+def get_dedup_stats() -> dict:
+    with _stats_lock:
+        stats = dict(_stats)
+    cache = _cache
+    if cache is not None:
+        stats["cache"] = cache.stats()
+    return stats
+
+
+def embed_with_cache(
+    texts: list[str],
+    embed_fn: Callable[[list[str]], np.ndarray],
+) -> tuple[np.ndarray, int]:
+    """
+    Embed texts, reusing cached vectors for chunks seen before; only misses go to
+    embed_fn and are then stored. Returns (vectors in input order, number reused).
+    """
+    if not texts or not get_settings().embedding_cache_enabled:
+        return embed_fn(texts), 0
+    cache = get_embedding_cache()
+    hashes = [chunk_hash(t) for t in texts]
+    found = cache.get_many(list(set(hashes)))
+    missing = [i for i, h in enumerate(hashes) if h not in found]
+    if missing:
+        fresh = embed_fn([texts[i] for i in missing])
+        cache.put_many({hashes[i]: fresh[j] for j, i in enumerate(missing)})
+        for j, i in enumerate(missing):
+            found[hashes[i]] = fresh[j]
+    _count(chunk_hits=len(texts) - len(missing), chunk_misses=len(missing))
+    return np.stack([found[h] for h in hashes]), len(texts) - len(missing)
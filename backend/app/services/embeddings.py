@@ -1,20 +1,89 @@
 """Embedding generation: local sentence-transformers only."""
 
-from typing import Callable
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable
+
+import numpy as np
 
 from app.config import get_settings
+from app.services.embedding_batcher import EmbeddingBatcher
 
 settings = get_settings()
 
+# Process-wide model registry: model name -> loaded SentenceTransformer.
+_models: dict[str, Any] = {}
+_models_lock = threading.Lock()
+_ready = threading.Event()
+_batcher: EmbeddingBatcher | None = None
+
+
+def get_model(name: str | None = None):
+    """Return the loaded SentenceTransformer for name (default: configured model), loading it once."""
+    name = name or settings.sentence_transformer_model
+    model = _models.get(name)
+    if model is not None:
+        return model
+    with _models_lock:
+        model = _models.get(name)
+        if model is None:
+            from sentence_transformers import SentenceTransformer  # type: ignore
+            model = SentenceTransformer(name)
+            _models[name] = model
+    return model
+
+
+def warm_up() -> None:
+    """Load the configured model and run one encode so the first real request is not slow."""
+    model = get_model()
+    model.encode(["warm-up"], convert_to_numpy=True)
+    _ready.set()
+
+
+def is_ready() -> bool:
+    """True once warm_up() has completed in this process."""
+    return _ready.is_set()
+
+
+def get_batcher() -> EmbeddingBatcher:
+    """Return the process-wide micro-batching scheduler wrapping _local_embed."""
+    global _batcher
+    if _batcher is None:
+        with _models_lock:
+            if _batcher is None:
+                _batcher = EmbeddingBatcher(
+                    _local_embed,
+                    max_batch_size=settings.embedding_batch_max_size,
+                    max_wait_ms=settings.embedding_batch_max_wait_ms,
+                )
+    return _batcher
+
+
+def close_batcher() -> None:
+    """Stop the batching thread (on shutdown)."""
+    global _batcher
+    if _batcher is not None:
+        _batcher.close()
+        _batcher = None
+
+
+def get_embedding_stats() -> dict:
+    """Batch-size counters of the scheduler (empty until first use)."""
+    return _batcher.stats() if _batcher is not None else {}
+
+
+def get_embedding_function() -> Callable[[list[str]], np.ndarray]:
+    """Return a function that embeds a list of texts using local sentence-transformers.
 
-def get_embedding_function() -> Callable[[list[str]], list[list[float]]]:
-    """Return a function that embeds a list of texts using local sentence-transformers."""
+    With embedding_batching enabled, concurrent calls are coalesced into one encode.
+    """
+    if settings.embedding_batching:
+        return get_batcher().embed
     return _local_embed
 
 
-def _local_embed(texts: list[str]) -> list[list[float]]:
-    """Use sentence-transformers (no API key required)."""
-    from sentence_transformers import SentenceTransformer  # type: ignore
-    model = SentenceTransformer(settings.sentence_transformer_model)
-    embeddings = model.encode(texts, convert_to_numpy=True)
-    return [e.tolist() for e in embeddings]
+def _local_embed(texts: list[str]) -> np.ndarray:
+    """Use sentence-transformers (no API key required). Returns a (len(texts), dim) float32 array."""
+    model = get_model()
+    return model.encode(texts, convert_to_numpy=True)
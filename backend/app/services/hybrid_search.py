@@ -0,0 +1,83 @@
+"""Hybrid retrieval: vector search + BM25, fused with reciprocal rank fusion (RRF).
+
+Each retriever returns its own top candidates (hybrid_dense_k / hybrid_lexical_k);
+a chunk's fused score is sum(weight / (hybrid_rrf_k + rank)) over the rankings it
+appears in, so a chunk that ranks first lexically (an exact part number) can make a
+small top_k even when its embedding is only mid-ranked.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Collection
+
+import numpy as np
+
+from app.config import get_settings
+from app.core.metrics import CHAT_STAGE_SECONDS
+from app.services import lexical_index
+from app.services.vector_store import get_chunks, similarity_search_many
+
+
+def reciprocal_rank_fusion(
+    rankings: list[list[str]],
+    weights: list[float],
+    k: int,
+) -> list[tuple[str, float]]:
+    """Fuse ranked id lists; returns (id, score) best first."""
+    scores: dict[str, float] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, chunk_id in enumerate(ranking, start=1):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + weight / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+def hybrid_search(
+    question: str,
+    query_embedding: list[float],
+    top_k: int = 5,
+    document_ids: Collection[int] | None = None,
+) -> list[dict]:
+    """Top_k chunks for one question; see hybrid_search_many."""
+    return hybrid_search_many([question], [query_embedding], top_k=top_k, document_ids=document_ids)[0]
+
+
+def hybrid_search_many(
+    questions: list[str],
+    query_embeddings: np.ndarray | list[list[float]],
+    top_k: int = 5,
+    document_ids: Collection[int] | None = None,
+) -> list[list[dict]]:
+    """
+    Top_k chunks per question by RRF over the vector store and the BM25 index, in
+    similarity_search's dict shape, optionally restricted to document_ids. One
+    vector-store call serves all questions, BM25 runs per question, and the
+    lexical-only hits of the whole batch are fetched in one call. Falls back to plain
+    vector search when disabled or the index is still building.
+    """
+    settings = get_settings()
+    if not settings.hybrid_search_enabled or not lexical_index.is_ready():
+        with CHAT_STAGE_SECONDS.time("vector_search"):
+            return similarity_search_many(query_embeddings, top_k=top_k, document_ids=document_ids)
+
+    with CHAT_STAGE_SECONDS.time("vector_search"):
+        dense_all = similarity_search_many(
+            query_embeddings, top_k=max(top_k, settings.hybrid_dense_k), document_ids=document_ids
+        )
+    # BM25, fusion, and fetching the lexical-only hits
+    with CHAT_STAGE_SECONDS.time("lexical_search"):
+        index = lexical_index.get_lexical_index()
+        top_ids_all: list[list[str]] = []
+        for question, dense in zip(questions, dense_all):
+            lexical = index.search(question, max(top_k, settings.hybrid_lexical_k), document_ids=document_ids)
+            fused = reciprocal_rank_fusion(
+                [[c["id"] for c in dense], [chunk_id for chunk_id, _ in lexical]],
+                [settings.hybrid_dense_weight, settings.hybrid_lexical_weight],
+                settings.hybrid_rrf_k,
+            )
+            # Over-select so ids removed from Chroma since indexing do not shrink the result
+            top_ids_all.append([chunk_id for chunk_id, _ in fused[: top_k * 2]])
+        by_id = {c["id"]: c for dense in dense_all for c in dense}
+        missing = sorted({chunk_id for top_ids in top_ids_all for chunk_id in top_ids if chunk_id not in by_id})
+        for chunk in get_chunks(missing):
+            by_id[chunk["id"]] = chunk
+    return [[by_id[chunk_id] for chunk_id in top_ids if chunk_id in by_id][:top_k] for top_ids in top_ids_all]
@@ -2,46 +2,293 @@
 
 from __future__ import annotations
 
-from app.services.pdf_extractor import extract_text_from_pdf
-from app.services.chunker import chunk_pages
+import hashlib
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Callable, Iterable, Iterator
+
+from app.config import get_settings
+from app.core.metrics import INGEST_STAGE_SECONDS
+from app.services.pdf_extractor import PdfSource, count_pages, iter_pages
+from app.services.chunker import iter_chunks
 from app.services.embeddings import get_embedding_function
-from app.services.vector_store import add_chunks
+from app.services.embedding_cache import embed_with_cache
+from app.services.vector_store import add_chunks, delete_chunks, update_chunk_metadata, upsert_chunks
+from app.services.answer_cache import bump_corpus_version
+from app.services.lexical_index import index_chunks, remove_chunks
 
+ProgressCallback = Callable[..., None]
+# (chunk_text, page_number, chunk_index), as stored in EmbeddingMeta
+ChunkRow = tuple[str, int, int]
+BatchSink = Callable[[list[ChunkRow]], None]
 
-def ingest_pdf(
-    file_content: bytes,
+
+def text_hash(text: str) -> str:
+    """Identity of a chunk's content when diffing document versions."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class StoredChunk:
+    """A chunk of the currently stored version of a document (an EmbeddingMeta row)."""
+
+    row_id: int
+    vector_id: str
+    text_hash: str
+    page_number: int
+    chunk_index: int
+
+
+@dataclass
+class ChunkDiff:
+    """What re-ingesting a new version changed, for the caller to apply to EmbeddingMeta."""
+
+    # (chunk_text, page_number, chunk_index, vector_id) rows to insert
+    added: list[tuple[str, int, int, str]] = field(default_factory=list)
+    # (row_id, vector_id, page_number, chunk_index): same text, new position
+    moved: list[tuple[int, str, int, int]] = field(default_factory=list)
+    removed: list[int] = field(default_factory=list)  # EmbeddingMeta row ids
+    # Vector ids of the removed rows, dropped from the stores after the commit
+    stale: list[str] = field(default_factory=list)
+    unchanged: int = 0
+    total: int = 0
+
+
+def _chunk_metadata(document_id: int, page: int, index: int, filename: str, collection: str | None) -> dict:
+    """Vector store metadata of a chunk; collection (the document's group) only when set."""
+    metadata = {"document_id": document_id, "chunk_index": index, "page_number": page, "filename": filename}
+    if collection:
+        metadata["collection"] = collection
+    return metadata
+
+
+def _batched(items: Iterable, size: int) -> Iterator[list]:
+    it = iter(items)
+    while batch := list(islice(it, size)):
+        yield batch
+
+
+def _timed_pages(
+    source: PdfSource, n_pages: int, report: ProgressCallback, extract_clock: list[float]
+) -> Iterator[tuple[int, str]]:
+    """iter_pages with progress reports; records each page's extract time and adds it
+    to extract_clock[0] so chunking time can be told apart from it."""
+    pages = iter_pages(source, n_pages=n_pages)
+    parsed = 0
+    while True:
+        started = time.perf_counter()
+        page = next(pages, None)
+        elapsed = time.perf_counter() - started
+        if page is None:
+            return
+        INGEST_STAGE_SECONDS.observe("extract", elapsed)
+        extract_clock[0] += elapsed
+        parsed += 1
+        report(pages_parsed=parsed)
+        yield page
+
+
+def _timed_batches(chunks: Iterable, size: int, extract_clock: list[float]) -> Iterator[list]:
+    """_batched over the lazy page -> chunk pipeline, recording chunking time per batch
+    (time to pull the batch minus the extraction it triggered)."""
+    batches = _batched(chunks, size)
+    while True:
+        started, extracted = time.perf_counter(), extract_clock[0]
+        batch = next(batches, None)
+        if batch is None:
+            return
+        INGEST_STAGE_SECONDS.observe("chunk", time.perf_counter() - started - (extract_clock[0] - extracted))
+        yield batch
+
+
+def ingest_pdf_stream(
+    source: PdfSource,
     document_id: int,
     filename: str,
-) -> list[tuple[str, int | None, int]]:
+    sink: BatchSink | None = None,
+    progress: ProgressCallback | None = None,
+    batch_size: int | None = None,
+    collection: str | None = None,
+) -> int:
     """
-    Process PDF: extract text, chunk, embed, store in Chroma.
-    Returns list of (chunk_text, page_number, chunk_index) for caller to insert EmbeddingMeta.
+    Streaming ingestion: pages flow lazily into the chunker and chunks are embedded in
+    fixed-size batches. Each batch is written to Chroma and handed to sink (the caller
+    persists EmbeddingMeta) before the next batch is read, so peak memory is bounded by
+    the batch size rather than the document size. source is PDF bytes or a file path.
+    Chunks already in the persistent embedding cache reuse their stored vectors.
+    progress, if given, is called with keyword counters
+    (pages_total, pages_parsed, chunks_total, chunks_embedded, chunks_reused).
+    collection (the document's group) is stored in each chunk's metadata.
+    Returns the number of chunks stored.
     """
-    pages = extract_text_from_pdf(file_content)
-    chunks_with_pages = chunk_pages(pages)
-    if not chunks_with_pages:
-        return []
+    report = progress or (lambda **_: None)
+    batch_size = max(1, batch_size or get_settings().ingestion_embed_batch_size)
+    n_pages = count_pages(source)
+    report(pages_total=n_pages)
+
+    extract_clock = [0.0]
+    embed_fn = get_embedding_function()
+    total = 0
+    reused = 0
+    chunks = iter_chunks(_timed_pages(source, n_pages, report, extract_clock))
+    for batch in _timed_batches(chunks, batch_size, extract_clock):
+        rows = [(text, page or 0, total + i) for i, (text, page) in enumerate(batch)]
+        total += len(rows)
+        report(chunks_total=total)
+        texts = [r[0] for r in rows]
+        with INGEST_STAGE_SECONDS.time("embed"):
+            embeddings, batch_reused = embed_with_cache(texts, embed_fn)
+        reused += batch_reused
+        ids = [f"{document_id}_{r[2]}" for r in rows]
+        with INGEST_STAGE_SECONDS.time("store"):
+            add_chunks(
+                ids=ids,
+                embeddings=embeddings,
+                metadatas=[_chunk_metadata(document_id, r[1], r[2], filename, collection) for r in rows],
+                documents=texts,
+            )
+            index_chunks(ids, document_id, texts)
+            if sink is not None:
+                sink(rows)
+        report(chunks_embedded=total, chunks_reused=reused)
+    if total:
+        # New content can change answers: drop cached ones
+        bump_corpus_version()
+    return total
 
-    chunk_texts = [c[0] for c in chunks_with_pages]
-    page_numbers = [c[1] for c in chunks_with_pages]
+
+def reingest_pdf_stream(
+    source: PdfSource,
+    document_id: int,
+    filename: str,
+    existing: list[StoredChunk],
+    revision: int,
+    filename_changed: bool = False,
+    progress: ProgressCallback | None = None,
+    batch_size: int | None = None,
+    previous_filename: str | None = None,
+    collection: str | None = None,
+) -> ChunkDiff:
+    """
+    Re-ingest a new version of a document by diffing its chunks against the stored ones.
+    New chunks are matched to stored chunks by content (in order); matches keep their
+    Chroma vector and only get a metadata update if their page/index moved. Unmatched
+    chunks are embedded (through the embedding cache) and upserted under ids suffixed
+    with revision. Stored chunks left unmatched are only listed in diff.stale.
+
+    The caller applies the returned ChunkDiff to EmbeddingMeta, then calls
+    drop_stale_chunks; if applying it fails, revert_reingest undoes the vector store
+    and lexical index changes. If this function raises, it has reverted its own writes.
+    After a process crash, recover_jobs reruns the job with the same revision, which
+    overwrites the ids an interrupted run upserted.
+    """
+    report = progress or (lambda **_: None)
+    batch_size = max(1, batch_size or get_settings().ingestion_embed_batch_size)
+    n_pages = count_pages(source)
+    report(pages_total=n_pages)
+    extract_clock = [0.0]
+
+    def metadata(page: int, index: int) -> dict:
+        return _chunk_metadata(document_id, page, index, filename, collection)
+
+    by_hash: dict[str, deque[StoredChunk]] = {}
+    for chunk in sorted(existing, key=lambda c: c.chunk_index):
+        by_hash.setdefault(chunk.text_hash, deque()).append(chunk)
 
     embed_fn = get_embedding_function()
-    embeddings = embed_fn(chunk_texts)
-
-    ids = [f"{document_id}_{i}" for i in range(len(chunk_texts))]
-    metadatas = [
-        {
-            "document_id": document_id,
-            "chunk_index": i,
-            "page_number": page_numbers[i] if page_numbers[i] is not None else 0,
-            "filename": filename,
-        }
-        for i in range(len(chunk_texts))
-    ]
-    add_chunks(
-        ids=ids,
-        embeddings=embeddings,
-        metadatas=metadatas,
-        documents=chunk_texts,
+    diff = ChunkDiff()
+    reused = 0
+    chunks = iter_chunks(_timed_pages(source, n_pages, report, extract_clock))
+    try:
+        for batch in _timed_batches(chunks, batch_size, extract_clock):
+            added: list[tuple[str, int, int, str]] = []
+            moved: list[tuple[int, str, int, int]] = []
+            for text, page in batch:
+                page, index = page or 0, diff.total
+                diff.total += 1
+                bucket = by_hash.get(text_hash(text))
+                if not bucket:
+                    added.append((text, page, index, f"{document_id}_{index}.{revision}"))
+                    continue
+                old = bucket.popleft()
+                if old.page_number != page or old.chunk_index != index or filename_changed:
+                    moved.append((old.row_id, old.vector_id, page, index))
+                else:
+                    diff.unchanged += 1
+            if added:
+                texts = [r[0] for r in added]
+                with INGEST_STAGE_SECONDS.time("embed"):
+                    embeddings, batch_reused = embed_with_cache(texts, embed_fn)
+                reused += batch_reused
+            # Recorded before writing, so a half-written batch is reverted too
+            diff.added.extend(added)
+            diff.moved.extend(moved)
+            with INGEST_STAGE_SECONDS.time("store"):
+                if added:
+                    upsert_chunks(
+                        ids=[r[3] for r in added],
+                        embeddings=embeddings,
+                        metadatas=[metadata(r[1], r[2]) for r in added],
+                        documents=texts,
+                    )
+                    index_chunks([r[3] for r in added], document_id, texts)
+                update_chunk_metadata([m[1] for m in moved], [metadata(m[2], m[3]) for m in moved])
+            report(chunks_total=diff.total, chunks_embedded=len(diff.added), chunks_reused=reused)
+    except BaseException:
+        revert_reingest(diff, document_id, existing, previous_filename or filename, collection)
+        raise
+
+    stale = [chunk for bucket in by_hash.values() for chunk in bucket]
+    diff.removed = [c.row_id for c in stale]
+    diff.stale = [c.vector_id for c in stale]
+    report(chunks_removed=len(diff.removed))
+    if diff.added or diff.moved:
+        bump_corpus_version()
+    return diff
+
+
+def drop_stale_chunks(diff: ChunkDiff, batch_size: int | None = None) -> None:
+    """Delete the vectors of chunks an update removed, once EmbeddingMeta no longer lists them."""
+    batch_size = max(1, batch_size or get_settings().ingestion_embed_batch_size)
+    for part in _batched(diff.stale, batch_size):
+        delete_chunks(ids=part)
+        remove_chunks(part)
+    if diff.stale:
+        bump_corpus_version()
+
+
+def revert_reingest(
+    diff: ChunkDiff, document_id: int, existing: list[StoredChunk], filename: str, collection: str | None = None
+) -> None:
+    """Undo reingest_pdf_stream's writes: delete the upserted chunks and put the metadata
+    of moved chunks back to the stored version (existing, under filename)."""
+    added = [r[3] for r in diff.added]
+    for part in _batched(added, get_settings().ingestion_embed_batch_size):
+        delete_chunks(ids=part)
+        remove_chunks(part)
+    stored = {c.vector_id: c for c in existing}
+    restore = [stored[m[1]] for m in diff.moved if m[1] in stored]
+    update_chunk_metadata(
+        [c.vector_id for c in restore],
+        [_chunk_metadata(document_id, c.page_number, c.chunk_index, filename, collection) for c in restore],
     )
-    return [(chunk_texts[i], page_numbers[i] or 0, i) for i in range(len(chunk_texts))]
+    if added or restore:
+        bump_corpus_version()
+
+
+def ingest_pdf(
+    file_content: PdfSource,
+    document_id: int,
+    filename: str,
+    progress: ProgressCallback | None = None,
+) -> list[ChunkRow]:
+    """
+    Process PDF: extract text, chunk, embed, store in Chroma.
+    Returns list of (chunk_text, page_number, chunk_index) for caller to insert EmbeddingMeta.
+    Prefer ingest_pdf_stream for large documents; this collects every row in memory.
+    """
+    rows: list[ChunkRow] = []
+    ingest_pdf_stream(file_content, document_id, filename, sink=rows.extend, progress=progress)
+    return rows
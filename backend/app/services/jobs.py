@@ -0,0 +1,388 @@
+"""Background ingestion jobs: upload -> IngestionJob row -> local worker pool.
+
+Uploads are spooled to settings.upload_dir and a queued IngestionJob is committed;
+worker tasks pick job ids off an asyncio queue and run ingest_pdf_stream on the
+ingestion executor (not the cpu pool chat retrieval uses), persisting EmbeddingMeta
+batch by batch. Progress is kept in memory (served live by GET /documents/jobs/{id})
+and flushed to the row periodically. On startup, recover_jobs() re-queues unfinished
+jobs whose file still exists and fails the rest.
+
+Update jobs (PUT /documents/{id}) diff the new version against the stored chunks
+instead: only added/changed chunks are embedded, and EmbeddingMeta is patched in one
+transaction at the end. Removed chunks leave the vector store only after that commit,
+and a failed update reverts the vector store to the stored version.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import logging
+import os
+import threading
+import uuid
+from pathlib import Path
+
+from sqlalchemy import select, delete
+
+from app.config import get_settings
+from app.core.executors import get_ingestion_executor
+from app.core.metrics import ERRORS
+from app.db.bulk import (
+    bulk_delete_embedding_meta,
+    bulk_insert_embedding_meta,
+    bulk_update_embedding_positions,
+)
+from app.db.session import AsyncSessionLocal
+from app.models import Document, EmbeddingMeta, IngestionJob, JobKind, JobStatus
+from app.services.ingestion import (
+    ChunkDiff,
+    ChunkRow,
+    StoredChunk,
+    drop_stale_chunks,
+    ingest_pdf_stream,
+    reingest_pdf_stream,
+    revert_reingest,
+    text_hash,
+)
+from app.services.lexical_index import remove_document as remove_lexical_document
+from app.services.vector_store import delete_chunks
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_FIELDS = (
+    "pages_total",
+    "pages_parsed",
+    "chunks_total",
+    "chunks_embedded",
+    "chunks_reused",
+    "chunks_removed",
+)
+PROGRESS_FLUSH_SECONDS = 1.0
+# How often a blocked batch sink checks whether the workers are stopping
+SINK_POLL_SECONDS = 1.0
+
+_queue: asyncio.Queue[int] | None = None
+_workers: list[asyncio.Task] = []
+# job_id -> latest progress counters of running jobs
+_live_progress: dict[int, dict[str, int]] = {}
+# Set by stop_workers so ingestion threads blocked on the event loop give up
+_stopping = threading.Event()
+
+
+class IngestionInterrupted(Exception):
+    """The workers stopped mid-job; the job stays 'running' for recover_jobs."""
+
+
+def new_upload_path() -> Path:
+    """Fresh path under upload_dir to spool an uploaded PDF to."""
+    upload_dir = Path(get_settings().upload_dir)
+    upload_dir.mkdir(parents=True, exist_ok=True)
+    return upload_dir / f"{uuid.uuid4().hex}.pdf"
+
+
+def get_live_progress(job_id: int) -> dict[str, int] | None:
+    """Progress of a job running in this process (fresher than the DB row)."""
+    progress = _live_progress.get(job_id)
+    return dict(progress) if progress is not None else None
+
+
+def enqueue(job_id: int) -> None:
+    """Hand a committed queued job to the worker pool."""
+    if _queue is None:
+        raise RuntimeError("Ingestion workers are not running")
+    _queue.put_nowait(job_id)
+
+
+async def start_workers() -> None:
+    """Start the worker tasks and resume unfinished jobs (call from lifespan)."""
+    global _queue
+    if _queue is not None:
+        return
+    _queue = asyncio.Queue()
+    _stopping.clear()
+    for i in range(max(1, get_settings().ingestion_workers)):
+        _workers.append(asyncio.create_task(_worker_loop(), name=f"ingestion-worker-{i}"))
+    await recover_jobs()
+
+
+async def stop_workers() -> None:
+    """Cancel worker tasks; interrupted jobs stay 'running' and are resumed on next start."""
+    global _queue
+    _stopping.set()
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+    _queue = None
+
+
+async def recover_jobs() -> None:
+    """Re-queue jobs left queued/running by a previous process, or fail them cleanly."""
+    settings = get_settings()
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(IngestionJob)
+            .where(IngestionJob.status.in_([JobStatus.queued.value, JobStatus.running.value]))
+            .order_by(IngestionJob.id)
+        )
+        jobs = result.scalars().all()
+        resume: list[int] = []
+        for job in jobs:
+            if not os.path.exists(job.file_path):
+                job.status = JobStatus.failed.value
+                job.error = "Uploaded file missing after restart"
+            elif job.attempts >= settings.ingestion_max_attempts:
+                job.status = JobStatus.failed.value
+                job.error = f"Gave up after {job.attempts} attempts"
+                _remove_file(job.file_path)
+            else:
+                job.status = JobStatus.queued.value
+                resume.append(job.id)
+        await session.commit()
+    for job_id in resume:
+        logger.info("Resuming ingestion job %s", job_id)
+        enqueue(job_id)
+
+
+async def _worker_loop() -> None:
+    assert _queue is not None
+    queue = _queue
+    while True:
+        job_id = await queue.get()
+        try:
+            await _run_job(job_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Ingestion job %s crashed", job_id)
+        finally:
+            queue.task_done()
+
+
+async def _run_job(job_id: int) -> None:
+    async with AsyncSessionLocal() as session:
+        job = await session.get(IngestionJob, job_id)
+        if job is None or job.status != JobStatus.queued.value:
+            return
+        doc = await session.get(Document, job.document_id)
+        if doc is None:
+            job.status = JobStatus.failed.value
+            job.error = "Document no longer exists"
+            await session.commit()
+            return
+        job.status = JobStatus.running.value
+        job.attempts += 1
+        job.error = None
+        await session.commit()
+        document_id, filename, file_path, collection = doc.id, doc.filename, job.file_path, doc.collection
+        is_update = job.kind == JobKind.update.value
+        new_filename = job.filename or filename
+
+    if is_update:
+        await _run_update_job(job_id, document_id, filename, new_filename, file_path, collection)
+        return
+
+    # A previous attempt may have written part of the chunks before dying
+    await _delete_document_chunks(document_id)
+
+    progress = {f: 0 for f in PROGRESS_FIELDS}
+    _live_progress[job_id] = progress
+
+    def report(**counters: int) -> None:
+        progress.update(counters)
+
+    loop = asyncio.get_running_loop()
+
+    def sink(rows: list[ChunkRow]) -> None:
+        # Called on the ingestion thread once per batch; wait so batches never pile up,
+        # but give up once the workers stop, or this thread would block process exit
+        if _stopping.is_set():
+            raise IngestionInterrupted(f"Ingestion job {job_id} interrupted by shutdown")
+        future = asyncio.run_coroutine_threadsafe(_insert_chunk_rows(document_id, rows), loop)
+        while True:
+            try:
+                future.result(timeout=SINK_POLL_SECONDS)
+                return
+            except concurrent.futures.TimeoutError:
+                if _stopping.is_set():
+                    future.cancel()
+                    raise IngestionInterrupted(f"Ingestion job {job_id} interrupted by shutdown")
+
+    flusher = asyncio.create_task(_flush_progress(job_id, progress))
+    try:
+        await get_ingestion_executor().run(
+            ingest_pdf_stream, file_path, document_id, filename, sink, report, None, collection
+        )
+    except IngestionInterrupted:
+        flusher.cancel()
+        _live_progress.pop(job_id, None)
+        return
+    except Exception as e:
+        flusher.cancel()
+        await _finish_failed(job_id, document_id, file_path, e)
+        _live_progress.pop(job_id, None)
+        return
+    flusher.cancel()
+
+    async with AsyncSessionLocal() as session:
+        job = await session.get(IngestionJob, job_id)
+        job.status = JobStatus.succeeded.value
+        for field in PROGRESS_FIELDS:
+            setattr(job, field, progress[field])
+        await session.commit()
+    _live_progress.pop(job_id, None)
+    _remove_file(file_path)
+
+
+async def _run_update_job(
+    job_id: int, document_id: int, filename: str, new_filename: str, file_path: str, collection: str | None
+) -> None:
+    """Re-ingest a new version of a document, touching only the chunks that changed."""
+    existing = await _load_stored_chunks(document_id)
+    progress = {f: 0 for f in PROGRESS_FIELDS}
+    _live_progress[job_id] = progress
+
+    def report(**counters: int) -> None:
+        progress.update(counters)
+
+    flusher = asyncio.create_task(_flush_progress(job_id, progress))
+    diff: ChunkDiff | None = None
+    try:
+        diff = await get_ingestion_executor().run(
+            reingest_pdf_stream,
+            file_path,
+            document_id,
+            new_filename,
+            existing,
+            job_id,
+            new_filename != filename,
+            report,
+            None,
+            filename,
+            collection,
+        )
+        await _apply_chunk_diff(job_id, document_id, diff, progress)
+    except Exception as e:
+        flusher.cancel()
+        if diff is not None:
+            # EmbeddingMeta still describes the previous version; put Chroma and BM25 back
+            try:
+                await asyncio.to_thread(revert_reingest, diff, document_id, existing, filename, collection)
+            except Exception:
+                logger.exception("Reverting update of document %s failed", document_id)
+        await _finish_failed(job_id, document_id, file_path, e, keep_chunks=True)
+        _live_progress.pop(job_id, None)
+        return
+    flusher.cancel()
+    _live_progress.pop(job_id, None)
+    _remove_file(file_path)
+    try:
+        await asyncio.to_thread(drop_stale_chunks, diff)
+    except Exception:
+        logger.exception("Deleting stale chunks of document %s failed", document_id)
+    logger.info(
+        "Updated document %s: %d added, %d moved, %d removed, %d unchanged",
+        document_id, len(diff.added), len(diff.moved), len(diff.removed), diff.unchanged,
+    )
+
+
+async def _load_stored_chunks(document_id: int) -> list[StoredChunk]:
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(
+                EmbeddingMeta.id,
+                EmbeddingMeta.vector_id,
+                EmbeddingMeta.chunk_text,
+                EmbeddingMeta.page_number,
+                EmbeddingMeta.chunk_index,
+            )
+            .where(EmbeddingMeta.document_id == document_id)
+            .order_by(EmbeddingMeta.chunk_index)
+        )
+        return [
+            StoredChunk(
+                row_id=row_id,
+                vector_id=vector_id or f"{document_id}_{index}",
+                text_hash=text_hash(text),
+                page_number=page or 0,
+                chunk_index=index,
+            )
+            for row_id, vector_id, text, page, index in result
+        ]
+
+
+async def _apply_chunk_diff(job_id: int, document_id: int, diff: ChunkDiff, progress: dict[str, int]) -> None:
+    """Patch EmbeddingMeta and finish the job in one transaction."""
+    async with AsyncSessionLocal() as session:
+        await bulk_delete_embedding_meta(session, diff.removed)
+        await bulk_update_embedding_positions(session, diff.moved)
+        await bulk_insert_embedding_meta(session, document_id, diff.added)
+        job = await session.get(IngestionJob, job_id)
+        doc = await session.get(Document, document_id)
+        if job.filename:
+            doc.filename = job.filename
+        if job.content_hash:
+            doc.content_hash = job.content_hash
+        job.status = JobStatus.succeeded.value
+        for field in PROGRESS_FIELDS:
+            setattr(job, field, progress[field])
+        await session.commit()
+
+
+async def _insert_chunk_rows(document_id: int, rows: list[ChunkRow]) -> None:
+    async with AsyncSessionLocal() as session:
+        await bulk_insert_embedding_meta(session, document_id, rows)
+        await session.commit()
+
+
+async def _delete_document_chunks(document_id: int) -> None:
+    """Remove a document's chunks from Chroma, the lexical index and EmbeddingMeta."""
+    await asyncio.to_thread(delete_chunks, None, document_id)
+    remove_lexical_document(document_id)
+    async with AsyncSessionLocal() as session:
+        await session.execute(delete(EmbeddingMeta).where(EmbeddingMeta.document_id == document_id))
+        await session.commit()
+
+
+async def _flush_progress(job_id: int, progress: dict[str, int]) -> None:
+    """Periodically persist live progress so other processes can see it."""
+    last: dict[str, int] = {}
+    while True:
+        await asyncio.sleep(PROGRESS_FLUSH_SECONDS)
+        if progress == last:
+            continue
+        last = dict(progress)
+        async with AsyncSessionLocal() as session:
+            job = await session.get(IngestionJob, job_id)
+            if job is None:
+                return
+            for field, value in last.items():
+                setattr(job, field, value)
+            await session.commit()
+
+
+async def _finish_failed(
+    job_id: int, document_id: int, file_path: str, error: Exception, keep_chunks: bool = False
+) -> None:
+    logger.warning("Ingestion job %s failed: %s", job_id, error)
+    ERRORS.inc("ingestion")
+    if not keep_chunks:
+        try:
+            await _delete_document_chunks(document_id)
+        except Exception:
+            logger.exception("Cleanup of chunks for document %s failed", document_id)
+    async with AsyncSessionLocal() as session:
+        job = await session.get(IngestionJob, job_id)
+        if job is not None:
+            job.status = JobStatus.failed.value
+            job.error = f"Failed to process PDF: {error}"
+            await session.commit()
+    _remove_file(file_path)
+
+
+def _remove_file(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,216 @@
+"""In-memory BM25 inverted index over chunk text (EmbeddingMeta.chunk_text).
+
+Complements dense retrieval for exact tokens (part numbers, error codes, clause
+numbers) that embeddings tend to blur. The index is built from the embeddings table
+at startup (build_lexical_index, in the background) and kept current by ingestion,
+which calls index_chunks / remove_chunks / remove_document next to its Chroma writes.
+Entries are keyed by Chroma id so hits can be fused with vector search results.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import logging
+import math
+import re
+import threading
+from collections import Counter
+from collections.abc import Collection
+
+from sqlalchemy import select
+
+from app.db.session import AsyncSessionLocal
+from app.models import EmbeddingMeta
+
+logger = logging.getLogger(__name__)
+
+# Identifier-like runs ("E-1234", "3.2.1", "ab_cd") stay whole; their parts are indexed too
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+_PART_RE = re.compile(r"[a-z0-9]+")
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+BUILD_BATCH_SIZE = 2000
+
+
+def tokenize(text: str) -> list[str]:
+    tokens: list[str] = []
+    for match in _TOKEN_RE.findall(text.lower()):
+        tokens.append(match)
+        if not match.isalnum():
+            tokens.extend(_PART_RE.findall(match))
+    return tokens
+
+
+class BM25Index:
+    """Thread-safe BM25 index with incremental add/remove by chunk id."""
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self._postings: dict[str, dict[int, int]] = {}  # term -> {slot: term frequency}
+        self._slot_of: dict[str, int] = {}  # chunk id -> slot
+        self._ids: list[str | None] = []  # slot -> chunk id
+        self._doc_ids: list[int] = []  # slot -> document_id
+        self._terms: list[tuple[str, ...]] = []  # slot -> distinct terms (for removal)
+        self._lengths: list[int] = []  # slot -> token count
+        self._free: list[int] = []
+        self._by_document: dict[int, set[int]] = {}
+        self._total_length = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    def add(self, chunk_id: str, document_id: int, text: str) -> None:
+        """Index a chunk (replacing any previous entry with the same id)."""
+        counts = Counter(tokenize(text))
+        length = sum(counts.values())
+        with self._lock:
+            self._remove_locked(chunk_id)
+            slot = self._free.pop() if self._free else len(self._ids)
+            if slot == len(self._ids):
+                self._ids.append(None)
+                self._doc_ids.append(0)
+                self._terms.append(())
+                self._lengths.append(0)
+            self._ids[slot] = chunk_id
+            self._doc_ids[slot] = document_id
+            self._terms[slot] = tuple(counts)
+            self._lengths[slot] = length
+            self._slot_of[chunk_id] = slot
+            self._by_document.setdefault(document_id, set()).add(slot)
+            self._total_length += length
+            for term, tf in counts.items():
+                self._postings.setdefault(term, {})[slot] = tf
+
+    def remove(self, chunk_id: str) -> None:
+        with self._lock:
+            self._remove_locked(chunk_id)
+
+    def remove_document(self, document_id: int) -> int:
+        with self._lock:
+            slots = list(self._by_document.get(document_id, ()))
+            for slot in slots:
+                self._remove_locked(self._ids[slot])
+            return len(slots)
+
+    def search(
+        self,
+        query: str,
+        top_k: int,
+        document_ids: Collection[int] | None = None,
+    ) -> list[tuple[str, float]]:
+        """Return up to top_k (chunk id, BM25 score) pairs, best first.
+
+        With document_ids, only those documents' chunks are scored: when the scope is
+        smaller than the query terms' posting lists, its slots are walked directly, so
+        the cost follows the scope size rather than the corpus size.
+        """
+        terms = set(tokenize(query))
+        with self._lock:
+            n = len(self._slot_of)
+            if not n or not terms or top_k <= 0:
+                return []
+            avg_length = self._total_length / n
+            scope: set[int] | None = None
+            if document_ids is not None:
+                scope = set()
+                for document_id in document_ids:
+                    scope |= self._by_document.get(document_id, set())
+            scores: dict[int, float] = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1.0 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                if scope is None:
+                    matches = postings.items()
+                elif len(scope) < len(postings):
+                    matches = ((slot, postings[slot]) for slot in scope if slot in postings)
+                else:
+                    matches = ((slot, tf) for slot, tf in postings.items() if slot in scope)
+                for slot, tf in matches:
+                    norm = self.k1 * (1.0 - self.b + self.b * self._lengths[slot] / avg_length)
+                    scores[slot] = scores.get(slot, 0.0) + idf * tf * (self.k1 + 1.0) / (tf + norm)
+            best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+            return [(self._ids[slot], score) for slot, score in best]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"chunks": len(self._slot_of), "terms": len(self._postings), "documents": len(self._by_document)}
+
+    def _remove_locked(self, chunk_id: str | None) -> None:
+        slot = self._slot_of.pop(chunk_id, None) if chunk_id is not None else None
+        if slot is None:
+            return
+        for term in self._terms[slot]:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(slot, None)
+                if not postings:
+                    del self._postings[term]
+        document_slots = self._by_document.get(self._doc_ids[slot])
+        if document_slots is not None:
+            document_slots.discard(slot)
+            if not document_slots:
+                del self._by_document[self._doc_ids[slot]]
+        self._total_length -= self._lengths[slot]
+        self._ids[slot] = None
+        self._terms[slot] = ()
+        self._lengths[slot] = 0
+        self._free.append(slot)
+
+
+_index = BM25Index()
+_ready = threading.Event()
+
+
+def get_lexical_index() -> BM25Index:
+    return _index
+
+
+def is_ready() -> bool:
+    """True once the startup build from the embeddings table has finished."""
+    return _ready.is_set()
+
+
+def index_chunks(ids: list[str], document_id: int, texts: list[str]) -> None:
+    for chunk_id, text in zip(ids, texts):
+        _index.add(chunk_id, document_id, text)
+
+
+def remove_chunks(ids: list[str]) -> None:
+    for chunk_id in ids:
+        _index.remove(chunk_id)
+
+
+def remove_document(document_id: int) -> None:
+    _index.remove_document(document_id)
+
+
+def _add_rows(rows) -> None:
+    for vector_id, document_id, chunk_index, text in rows:
+        _index.add(vector_id or f"{document_id}_{chunk_index}", document_id, text)
+
+
+async def build_lexical_index() -> int:
+    """Index every EmbeddingMeta row, streamed in batches (call once at startup)."""
+    async with AsyncSessionLocal() as session:
+        result = await session.stream(
+            select(
+                EmbeddingMeta.vector_id,
+                EmbeddingMeta.document_id,
+                EmbeddingMeta.chunk_index,
+                EmbeddingMeta.chunk_text,
+            ).execution_options(yield_per=BUILD_BATCH_SIZE)
+        )
+        total = 0
+        async for partition in result.partitions(BUILD_BATCH_SIZE):
+            # Tokenizing is CPU work: keep it off the event loop
+            await asyncio.to_thread(_add_rows, partition)
+            total += len(partition)
+    _ready.set()
+    logger.info("Lexical index built: %d chunks", total)
+    return total
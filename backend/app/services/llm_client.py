@@ -0,0 +1,53 @@
+"""Shared async HTTP client for Ollama.
+
+One httpx.AsyncClient per app (opened in lifespan) keeps connections alive across
+requests; its pool limits also cap how many generations hit Ollama at once.
+"""
+
+from __future__ import annotations
+
+import httpx
+
+from app.config import get_settings
+
+_client: httpx.AsyncClient | None = None
+
+
+def get_timeout() -> httpx.Timeout:
+    """Timeouts for Ollama calls (also used by the sync fallback client)."""
+    settings = get_settings()
+    return httpx.Timeout(
+        connect=settings.ollama_connect_timeout,
+        read=settings.ollama_read_timeout,
+        write=settings.ollama_connect_timeout,
+        pool=settings.ollama_pool_timeout,
+    )
+
+
+async def open_llm_client() -> httpx.AsyncClient:
+    """Create the shared client (idempotent)."""
+    global _client
+    if _client is None:
+        settings = get_settings()
+        _client = httpx.AsyncClient(
+            base_url=settings.ollama_base_url.rstrip("/"),
+            timeout=get_timeout(),
+            limits=httpx.Limits(
+                max_connections=settings.ollama_max_connections,
+                max_keepalive_connections=settings.ollama_max_keepalive_connections,
+                keepalive_expiry=settings.ollama_keepalive_expiry,
+            ),
+        )
+    return _client
+
+
+async def close_llm_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_llm_client() -> httpx.AsyncClient | None:
+    """The shared client, or None outside the app lifespan (scripts, CLI)."""
+    return _client
@@ -0,0 +1,499 @@
+"""In-process NumPy vector engine: brute-force search over a memory-mapped embedding matrix.
+
+Layout under settings.numpy_index_path:
+- vectors.bin: contiguous (capacity, dim) matrix of L2-normalized embeddings in
+  settings.numpy_index_dtype, memory-mapped so the OS pages it in and out. "int8" is
+  scalar quantization: each row is stored as round(v / scale) with its own
+  scale = max|v| / 127, kept in scales.bin (one float32 per row);
+- full.bin: float32 copies of the rows, only when a quantized dtype is combined with
+  settings.numpy_rescore_factor > 0. Search scans the quantized matrix, shortlists
+  top_k * factor rows and re-ranks just those with exact float32 scores, so only the
+  shortlisted rows of full.bin are ever paged in;
+- rows.sqlite3: one row per chunk (row number, Chroma-style id, document_id, metadata,
+  text), read only for the top-k hits.
+
+In memory the engine keeps the parallel per-row arrays search needs: ids, document
+ids and a validity mask, plus the row ranges of every document. A query (or a batch
+of queries, in search_many) is one blocked matrix product (cosine similarity) with
+a running argpartition top-k; a document scope only multiplies those documents' row
+ranges. Rows are append-only; deletes leave tombstones that are compacted away (rows
+regrouped by document) when the index is opened with too many of them.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MIN_CAPACITY = 1024
+SEARCH_BLOCK_ROWS = 4096  # rows per matmul block: the float32 buffer for quantized rows stays cache-sized
+COMPACT_MIN_TOMBSTONES = 1024
+COMPACT_TOMBSTONE_RATIO = 0.3
+FETCH_BATCH = 500  # rows per SELECT ... IN (...) when loading hits
+SUPPORTED_DTYPES = ("float32", "float16", "int8")
+INT8_LEVELS = 127.0
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def quantize(vectors: np.ndarray, dtype: np.dtype) -> tuple[np.ndarray, np.ndarray | None]:
+    """Encode float32 rows in dtype. int8 also returns the per-row float32 scale."""
+    if dtype == np.int8:
+        scales = np.abs(vectors).max(axis=1) / INT8_LEVELS
+        scales[scales == 0] = 1.0
+        codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+        return codes, scales.astype(np.float32)
+    return vectors.astype(dtype), None
+
+
+def dequantize(codes: np.ndarray, scales: np.ndarray | None) -> np.ndarray:
+    vectors = np.asarray(codes).astype(np.float32)
+    if scales is not None:
+        vectors *= np.asarray(scales)[:, None]
+    return vectors
+
+
+class NumpyEngine:
+    name = "numpy"
+
+    def __init__(self, path: str, dtype: str = "float32", rescore_factor: int = 0):
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"Unsupported numpy index dtype {dtype!r}; use one of {SUPPORTED_DTYPES}")
+        self.path = Path(path)
+        self.dtype = np.dtype(dtype)
+        # Rescoring needs float32 copies; with float32 storage the scan is already exact
+        self.rescore_factor = max(0, rescore_factor) if self.dtype != np.float32 else 0
+        self._lock = threading.RLock()
+        self._db: sqlite3.Connection | None = None
+        self._matrix: np.memmap | None = None
+        self._scales: np.memmap | None = None  # int8 only
+        self._full: np.memmap | None = None  # float32 copies for rescoring
+        self._dim = 0
+        self._n = 0  # rows used (live + tombstones)
+        self._live = 0
+        self._ids: list[str | None] = []
+        self._row_of: dict[str, int] = {}
+        self._doc_ids = np.zeros(0, dtype=np.int64)
+        self._valid = np.zeros(0, dtype=bool)
+        self._doc_ranges: dict[int, list[list[int]]] = {}  # document_id -> [[start, stop), ...]
+
+    # --- lifecycle -------------------------------------------------------------------
+
+    @property
+    def _vectors_file(self) -> Path:
+        return self.path / "vectors.bin"
+
+    @property
+    def _scales_file(self) -> Path:
+        return self.path / "scales.bin"
+
+    @property
+    def _full_file(self) -> Path:
+        return self.path / "full.bin"
+
+    def open(self) -> "NumpyEngine":
+        with self._lock:
+            if self._db is not None:
+                return self
+            self.path.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(self.path / "rows.sqlite3", check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS rows (row INTEGER PRIMARY KEY, id TEXT NOT NULL UNIQUE, "
+                "document_id INTEGER, metadata TEXT NOT NULL, document TEXT NOT NULL)"
+            )
+            db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            db.commit()
+            self._db = db
+            meta = dict(db.execute("SELECT key, value FROM meta"))
+            self._dim = int(meta.get("dim", 0))
+            stored_dtype = meta.get("dtype", self.dtype.name)
+            self._load_rows()
+            if self._dim:
+                self._map_storage(np.dtype(stored_dtype))
+                if self._matrix is not None and (
+                    stored_dtype != self.dtype.name or (self._full is not None) != bool(self.rescore_factor)
+                ):
+                    self._convert_storage()
+            if self._n - self._live >= max(COMPACT_MIN_TOMBSTONES, COMPACT_TOMBSTONE_RATIO * self._n):
+                self.compact()
+        return self
+
+    def close(self) -> None:
+        with self._lock:
+            for mapped in (self._matrix, self._scales, self._full):
+                if mapped is not None:
+                    mapped.flush()
+            if self._db is not None:
+                self._db.close()
+            self._db = None
+            self._matrix = self._scales = self._full = None
+
+    def _load_rows(self) -> None:
+        rows = self._db.execute("SELECT row, id, document_id FROM rows ORDER BY row").fetchall()
+        self._n = (rows[-1][0] + 1) if rows else 0
+        self._ids = [None] * self._n
+        self._row_of = {}
+        self._doc_ids = np.full(max(self._n, 1), -1, dtype=np.int64)
+        self._valid = np.zeros(max(self._n, 1), dtype=bool)
+        self._doc_ranges = {}
+        for row, chunk_id, document_id in rows:
+            self._ids[row] = chunk_id
+            self._row_of[chunk_id] = row
+            self._doc_ids[row] = document_id if document_id is not None else -1
+            self._valid[row] = True
+            self._extend_range(document_id, row)
+        self._live = len(rows)
+
+    @staticmethod
+    def _map(path: Path, dtype, shape: tuple[int, ...], mode: str = "r+") -> np.memmap:
+        return np.memmap(path, dtype=dtype, mode=mode, shape=shape)
+
+    def _map_storage(self, dtype: np.dtype) -> None:
+        size = self._vectors_file.stat().st_size if self._vectors_file.exists() else 0
+        capacity = size // (self._dim * dtype.itemsize)
+        if capacity < self._n:
+            raise RuntimeError(f"{self._vectors_file} is shorter than its {self._n} indexed rows")
+        if not capacity:
+            return
+        self._matrix = self._map(self._vectors_file, dtype, (capacity, self._dim))
+        if dtype == np.int8:
+            if not self._scales_file.exists() or self._scales_file.stat().st_size < capacity * 4:
+                raise RuntimeError(f"{self._scales_file} is missing or shorter than {self._vectors_file}")
+            self._scales = self._map(self._scales_file, np.float32, (capacity,))
+        full_size = self._full_file.stat().st_size if self._full_file.exists() else 0
+        if full_size >= capacity * self._dim * 4:  # also the best source when converting
+            self._full = self._map(self._full_file, np.float32, (capacity, self._dim))
+        self._grow_arrays(capacity)
+
+    def _convert_storage(self) -> None:
+        """Rewrite the index in the configured dtype, adding or dropping the float32 copies."""
+        old = self._matrix.dtype
+        if old != self.dtype:
+            lossy = self._full is None and old.itemsize < self.dtype.itemsize
+            logger.log(
+                logging.WARNING if lossy else logging.INFO,
+                "Converting vector index from %s to %s%s", old, self.dtype,
+                " (precision already lost is not recovered)" if lossy else "",
+            )
+        self._write_storage(self._matrix.shape[0], np.arange(self._n))
+        self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('dtype', ?)", (self.dtype.name,))
+        self._db.commit()
+
+    # --- storage helpers -------------------------------------------------------------
+
+    def _decode(self, rows: np.ndarray) -> np.ndarray:
+        """Best available float32 version of existing rows."""
+        if self._full is not None:
+            return np.asarray(self._full[rows])
+        return dequantize(self._matrix[rows], self._scales[rows] if self._scales is not None else None)
+
+    def _write_storage(self, capacity: int, rows: np.ndarray) -> None:
+        """Build new files of the given capacity holding the existing `rows` (in that order,
+        from row 0), then swap them in. Searches still holding the old memmaps keep reading
+        the old (unlinked) files."""
+        files = {self._vectors_file: (self.dtype, (capacity, self._dim))}
+        if self.dtype == np.int8:
+            files[self._scales_file] = (np.float32, (capacity,))
+        if self.rescore_factor:
+            files[self._full_file] = (np.float32, (capacity, self._dim))
+        new = {path: self._map(path.with_suffix(".tmp"), dtype, shape, "w+") for path, (dtype, shape) in files.items()}
+        same_dtype = self._matrix is not None and self._matrix.dtype == self.dtype
+        for start in range(0, len(rows), SEARCH_BLOCK_ROWS):
+            part = rows[start:start + SEARCH_BLOCK_ROWS]
+            dst = slice(start, start + len(part))
+            vectors = None
+            if same_dtype:
+                new[self._vectors_file][dst] = self._matrix[part]
+                if self._scales is not None:
+                    new[self._scales_file][dst] = self._scales[part]
+            else:
+                vectors = self._decode(part)
+                codes, scales = quantize(vectors, self.dtype)
+                new[self._vectors_file][dst] = codes
+                if scales is not None:
+                    new[self._scales_file][dst] = scales
+            if self._full_file in new:
+                new[self._full_file][dst] = vectors if vectors is not None else self._decode(part)
+        for path, mapped in new.items():
+            mapped.flush()
+        new.clear()
+        for path, (dtype, shape) in files.items():
+            os.replace(path.with_suffix(".tmp"), path)
+        for stale in {self._scales_file, self._full_file} - files.keys():
+            stale.unlink(missing_ok=True)
+        self._matrix = self._map(self._vectors_file, self.dtype, (capacity, self._dim))
+        self._scales = self._map(self._scales_file, np.float32, (capacity,)) if self._scales_file in files else None
+        self._full = self._map(self._full_file, np.float32, (capacity, self._dim)) if self._full_file in files else None
+
+    def _grow_arrays(self, capacity: int) -> None:
+        if len(self._doc_ids) < capacity:
+            extra = capacity - len(self._doc_ids)
+            self._doc_ids = np.concatenate([self._doc_ids, np.full(extra, -1, dtype=np.int64)])
+            self._valid = np.concatenate([self._valid, np.zeros(extra, dtype=bool)])
+
+    def _ensure_capacity(self, rows_needed: int) -> None:
+        capacity = self._matrix.shape[0] if self._matrix is not None else 0
+        if rows_needed <= capacity:
+            return
+        new_capacity = max(MIN_CAPACITY, 2 * capacity, rows_needed)
+        self._write_storage(new_capacity, np.arange(self._n))
+        self._grow_arrays(new_capacity)
+
+    def _extend_range(self, document_id: int | None, row: int) -> None:
+        if document_id is None:
+            return
+        ranges = self._doc_ranges.setdefault(document_id, [])
+        if ranges and ranges[-1][1] == row:
+            ranges[-1][1] = row + 1
+        else:
+            ranges.append([row, row + 1])
+
+    # --- writes ----------------------------------------------------------------------
+
+    def count(self) -> int:
+        self.open()
+        return self._live
+
+    def add(self, ids, embeddings, metadatas, documents) -> None:
+        self.upsert(ids, embeddings, metadatas, documents)
+
+    def upsert(self, ids, embeddings, metadatas, documents) -> None:
+        vectors = _normalize(embeddings)
+        self.open()
+        with self._lock:
+            if not self._dim:
+                self._dim = vectors.shape[1]
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                    [("dim", str(self._dim)), ("dtype", self.dtype.name)],
+                )
+            elif vectors.shape[1] != self._dim:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match index ({self._dim})")
+            rows: list[int] = []
+            appended = 0
+            for chunk_id in ids:
+                row = self._row_of.get(chunk_id)
+                if row is None:
+                    row = self._n + appended
+                    appended += 1
+                rows.append(row)
+            self._ensure_capacity(self._n + appended)
+            row_array = np.asarray(rows)
+            codes, scales = quantize(vectors, self.dtype)
+            self._matrix[row_array] = codes
+            if self._scales is not None:
+                self._scales[row_array] = scales
+            if self._full is not None:
+                self._full[row_array] = vectors
+            for mapped in (self._matrix, self._scales, self._full):
+                if mapped is not None:
+                    mapped.flush()
+            self._db.executemany(
+                "INSERT OR REPLACE INTO rows (row, id, document_id, metadata, document) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (row, chunk_id, (meta or {}).get("document_id"), json.dumps(meta or {}), doc or "")
+                    for row, chunk_id, meta, doc in zip(rows, ids, metadatas, documents)
+                ],
+            )
+            self._db.commit()
+            self._n += appended
+            if len(self._ids) < self._n:
+                self._ids.extend([None] * (self._n - len(self._ids)))
+            for row, chunk_id, meta in zip(rows, ids, metadatas):
+                document_id = (meta or {}).get("document_id")
+                if chunk_id not in self._row_of:
+                    self._row_of[chunk_id] = row
+                    self._ids[row] = chunk_id
+                    self._live += 1
+                    self._extend_range(document_id, row)
+                self._doc_ids[row] = document_id if document_id is not None else -1
+                self._valid[row] = True
+
+    def update_metadata(self, ids, metadatas) -> None:
+        self.open()
+        with self._lock:
+            self._db.executemany(
+                "UPDATE rows SET metadata = ? WHERE id = ?",
+                [(json.dumps(meta or {}), chunk_id) for chunk_id, meta in zip(ids, metadatas)],
+            )
+            self._db.commit()
+
+    def delete(self, ids=None, document_id=None) -> int:
+        self.open()
+        with self._lock:
+            if ids is None:
+                if document_id is None:
+                    return 0
+                ids = [self._ids[row] for row in self._document_rows(document_id) if self._valid[row]]
+            rows = [self._row_of[i] for i in ids if i in self._row_of]
+            if not rows:
+                return 0
+            self._db.executemany("DELETE FROM rows WHERE row = ?", [(row,) for row in rows])
+            self._db.commit()
+            for row in rows:
+                del self._row_of[self._ids[row]]
+                self._ids[row] = None
+                self._valid[row] = False
+                self._doc_ids[row] = -1
+            self._live -= len(rows)
+            if document_id is not None:
+                self._doc_ranges.pop(document_id, None)
+            return len(rows)
+
+    def compact(self) -> None:
+        """Drop tombstones and regroup rows by document so each has few, long ranges."""
+        with self._lock:
+            live = np.flatnonzero(self._valid[: self._n])
+            order = live[np.lexsort((live, self._doc_ids[live]))]
+            new_row = {int(old): new for new, old in enumerate(order)}
+            capacity = max(MIN_CAPACITY, len(order))
+            if self._matrix is not None:
+                self._write_storage(capacity, order)
+            self._db.execute("UPDATE rows SET row = -row - 1")
+            self._db.executemany(
+                "UPDATE rows SET row = ? WHERE row = ?", [(new, -old - 1) for old, new in new_row.items()]
+            )
+            self._db.commit()
+            self._load_rows()
+            self._grow_arrays(capacity)
+            logger.info("Compacted vector index to %d rows", self._live)
+
+    # --- reads -----------------------------------------------------------------------
+
+    def _document_rows(self, document_id: int) -> np.ndarray:
+        ranges = self._doc_ranges.get(document_id) or []
+        if not ranges:
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate([np.arange(start, stop) for start, stop in ranges])
+
+    def _fetch(self, rows: list[int]) -> dict[int, dict]:
+        found = []
+        with self._lock:
+            for start in range(0, len(rows), FETCH_BATCH):
+                batch = rows[start:start + FETCH_BATCH]
+                marks = ",".join("?" * len(batch))
+                found += self._db.execute(
+                    f"SELECT row, id, metadata, document FROM rows WHERE row IN ({marks})", batch
+                ).fetchall()
+        return {row: {"id": chunk_id, "metadata": json.loads(meta), "document": doc} for row, chunk_id, meta, doc in found}
+
+    def get(self, ids) -> list[dict]:
+        self.open()
+        with self._lock:
+            rows = [self._row_of[i] for i in ids if i in self._row_of]
+        by_row = self._fetch(rows)
+        return [by_row[row] for row in rows if row in by_row]
+
+    @staticmethod
+    def _top_rows(
+        matrix: np.ndarray,
+        scales: np.ndarray | None,
+        valid: np.ndarray,
+        queries: np.ndarray,
+        ranges: list[tuple[int, int]],
+        shortlist: int,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Best `shortlist` (rows, scores) per query, both (queries, <= shortlist).
+
+        The matrix is read once, block by block, for all queries; each block's scores
+        are merged into the running per-query top list, so memory stays
+        O(queries * block) whatever the corpus size.
+        """
+        m = queries.shape[0]
+        best_rows = np.zeros((m, 0), dtype=np.int64)
+        best_scores = np.zeros((m, 0), dtype=np.float32)
+        buffer = np.empty((SEARCH_BLOCK_ROWS, matrix.shape[1]), dtype=np.float32) if matrix.dtype != np.float32 else None
+        for start, stop in ranges:
+            for block in range(start, stop, SEARCH_BLOCK_ROWS):
+                end = min(stop, block + SEARCH_BLOCK_ROWS)
+                # Plain ndarray view: memmap subclass slicing adds per-call overhead
+                chunk = np.asarray(matrix[block:end])
+                if buffer is not None:
+                    widened = buffer[: end - block]
+                    widened[...] = chunk
+                    chunk = widened
+                scores = queries @ chunk.T
+                if scales is not None:
+                    scores *= scales[block:end]
+                scores[:, ~valid[block:end]] = -np.inf
+                rows = np.broadcast_to(np.arange(block, end), scores.shape)
+                if best_scores.shape[1]:
+                    scores = np.concatenate([best_scores, scores], axis=1)
+                    rows = np.concatenate([best_rows, rows], axis=1)
+                if scores.shape[1] > shortlist:
+                    keep = np.argpartition(-scores, shortlist - 1, axis=1)[:, :shortlist]
+                    scores = np.take_along_axis(scores, keep, axis=1)
+                    rows = np.take_along_axis(rows, keep, axis=1)
+                best_scores, best_rows = scores, np.asarray(rows)
+        return best_rows, best_scores
+
+    def search(self, query_embedding, top_k, document_ids=None) -> list[dict]:
+        return self.search_many([query_embedding], top_k, document_ids=document_ids)[0]
+
+    def search_many(self, query_embeddings, top_k, document_ids=None) -> list[list[dict]]:
+        """Top_k chunks for each query, scanning the matrix once for the whole batch."""
+        self.open()
+        queries = _normalize(query_embeddings)
+        empty: list[list[dict]] = [[] for _ in range(queries.shape[0])]
+        with self._lock:
+            # Snapshot: appends after this point are not visible to this query
+            matrix, scales, full, n, valid = self._matrix, self._scales, self._full, self._n, self._valid
+            ranges = [(0, n)]
+            if document_ids is not None:
+                # Only the scoped documents' row ranges are scored
+                ranges = sorted(tuple(r) for d in set(document_ids) for r in self._doc_ranges.get(d) or [])
+        if matrix is None or not n or top_k <= 0 or queries.shape[1] != matrix.shape[1]:
+            return empty
+        candidates = sum(int(valid[start:stop].sum()) for start, stop in ranges)
+        k = min(top_k, candidates)
+        if k <= 0:
+            return empty
+        shortlist = min(k * self.rescore_factor, candidates) if full is not None else k
+        top_rows, top_scores = self._top_rows(matrix, scales, valid, queries, ranges, shortlist)
+        ranked: list[list[int]] = []
+        for q, rows, scores in zip(queries, top_rows, top_scores):
+            live = np.isfinite(scores)
+            rows, scores = rows[live], scores[live]
+            if full is not None:
+                # Exact float32 re-rank: only the shortlisted rows of full.bin are read
+                scores = np.asarray(full[rows]) @ q
+            ranked.append([int(r) for r in rows[np.argsort(-scores)[:k]]])
+        by_row = self._fetch(sorted({row for hits in ranked for row in hits}))
+        return [[by_row[row] for row in hits if row in by_row] for hits in ranked]
+
+    @property
+    def bytes_per_chunk(self) -> int:
+        """Bytes each row costs in the scanned matrix (plus its int8 scale); full.bin not counted."""
+        return self._dim * self.dtype.itemsize + (4 if self.dtype == np.int8 else 0)
+
+    def stats(self) -> dict:
+        with self._lock:
+            capacity = self._matrix.shape[0] if self._matrix is not None else 0
+            return {
+                "rows": self._n,
+                "live": self._live,
+                "capacity": capacity,
+                "dim": self._dim,
+                "dtype": self.dtype.name,
+                "bytes_per_chunk": self.bytes_per_chunk,
+                "matrix_bytes": capacity * self.bytes_per_chunk,
+                "rescore_factor": self.rescore_factor,
+                "full_precision_bytes": capacity * self._dim * 4 if self._full is not None else 0,
+                "documents": len(self._doc_ranges),
+            }
@@ -1,19 +1,140 @@
 """Extract text from PDF files."""
 
+import gc
 import io
-from typing import Iterator
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Iterator, Union
 
 from PyPDF2 import PdfReader
 
+from app.config import get_settings
 
-def extract_text_from_pdf(file_content: bytes) -> list[tuple[int, str]]:
+# A PdfReader caches every object it resolves; page ranges use a fresh reader so
+# memory stays bounded by the range size, not the document size.
+PAGES_PER_RANGE = 32
+
+PdfSource = Union[bytes, str, Path]
+
+_pool: ProcessPoolExecutor | None = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _open_reader(source: PdfSource, stack: ExitStack) -> PdfReader:
+    """PdfReader over bytes or a file path (the file is read lazily, not loaded whole)."""
+    if isinstance(source, (bytes, bytearray)):
+        return PdfReader(io.BytesIO(source))
+    return PdfReader(stack.enter_context(open(source, "rb")))
+
+
+def _extract_range(source: PdfSource, start: int, stop: int, collect: bool = False) -> list[tuple[int, str]]:
+    """Open the PDF independently and extract pages [start, stop). Also the pool worker."""
+    with ExitStack() as stack:
+        reader = _open_reader(source, stack)
+        pages: list[tuple[int, str]] = []
+        for i in range(start, stop):
+            text = reader.pages[i].extract_text() or ""
+            pages.append((i + 1, text.strip()))
+    if collect:
+        # PyPDF2 object graphs are cyclic; a pool worker frees the reader before its next
+        # task. In-process callers leave it to the regular GC instead of paying a full
+        # collection per range on the request path.
+        del reader
+        gc.collect()
+    return pages
+
+
+def count_pages(source: PdfSource) -> int:
+    with ExitStack() as stack:
+        return len(_open_reader(source, stack).pages)
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """Process pool shared across extractions (spawned, so no forked model/DB state)."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+
+def shutdown_extract_pool() -> None:
+    """Stop extraction worker processes (on shutdown)."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+        _pool_workers = 0
+
+
+def _page_ranges(n_pages: int, size: int) -> Iterator[tuple[int, int]]:
+    """Split [0, n_pages) into contiguous ranges of at most size pages."""
+    for start in range(0, n_pages, size):
+        yield start, min(start + size, n_pages)
+
+
+def iter_pages(
+    source: PdfSource,
+    workers: int | None = None,
+    parallel_min_pages: int | None = None,
+    n_pages: int | None = None,
+) -> Iterator[tuple[int, str]]:
+    """
+    Yield (page_number, text) in page order (1-based page numbers), one range at a time.
+    source is PDF bytes or a path. PDFs with at least parallel_min_pages pages are
+    extracted by a process pool (each worker opens the PDF itself) with a bounded
+    number of ranges in flight, so memory does not grow with page count. Pass n_pages
+    when the caller already counted them (counting parses the PDF's page tree).
     """
-    Extract text per page from PDF bytes.
+    settings = get_settings()
+    if workers is None:
+        workers = settings.pdf_extract_workers or (os.cpu_count() or 1)
+    if parallel_min_pages is None:
+        parallel_min_pages = settings.pdf_parallel_min_pages
+
+    if n_pages is None:
+        n_pages = count_pages(source)
+    if workers <= 1 or n_pages < max(parallel_min_pages, 2):
+        for start, stop in _page_ranges(n_pages, PAGES_PER_RANGE):
+            yield from _extract_range(source, start, stop)
+        return
+
+    if isinstance(source, (bytes, bytearray)):
+        # Bytes are pickled to the worker per task: one range per worker
+        ranges = _page_ranges(n_pages, -(-n_pages // workers))
+    else:
+        ranges = _page_ranges(n_pages, PAGES_PER_RANGE)
+    pool = _get_pool(workers)
+    in_flight: deque[Future] = deque()
+    try:
+        for start, stop in ranges:
+            in_flight.append(pool.submit(_extract_range, source, start, stop, True))
+            if len(in_flight) >= 2 * workers:
+                yield from in_flight.popleft().result()
+        while in_flight:
+            yield from in_flight.popleft().result()
+    finally:
+        for future in in_flight:
+            future.cancel()
+
+
+def extract_text_from_pdf(
+    file_content: PdfSource,
+    workers: int | None = None,
+    parallel_min_pages: int | None = None,
+) -> list[tuple[int, str]]:
+    """
+    Extract text per page from PDF bytes (or a path).
     Returns list of (page_number, text) (1-based page numbers).
     """
-    reader = PdfReader(io.BytesIO(file_content))
-    pages: list[tuple[int, str]] = []
-    for i, page in enumerate(reader.pages):
-        text = page.extract_text() or ""
-        pages.append((i + 1, text.strip()))
-    return pages
+    return list(iter_pages(file_content, workers=workers, parallel_min_pages=parallel_min_pages))
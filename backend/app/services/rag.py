@@ -2,11 +2,25 @@
 
 from __future__ import annotations
 
+import json
+import time
+from collections.abc import Collection
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator
+
 import httpx
+import numpy as np
 
 from app.config import get_settings
+from app.core.executors import get_cpu_executor, get_llm_executor
+from app.core.metrics import CHAT_STAGE_SECONDS, ERRORS
+from app.services.answer_cache import get_answer_cache
+from app.services.context_packer import CONTEXT_SEPARATOR, pack_context
+from app.services.llm_client import get_llm_client, get_timeout
 from app.services.embeddings import get_embedding_function
-from app.services.vector_store import similarity_search, get_collection_count
+from app.services.hybrid_search import hybrid_search_many
+from app.services.vector_store import get_collection_count
 
 RAG_PROMPT = """You are an AI assistant.
 Answer ONLY using the provided context.
@@ -26,66 +40,312 @@ OLLAMA_NOT_RUNNING_MSG = (
 )
 
 
-def get_llm_response(question: str, context: str) -> str:
-    """Call local Ollama to generate answer from context and question."""
+class LLMError(Exception):
+    """Ollama call failed; str(e) is the user-facing message."""
+
+
+def _format_llm_error(e: Exception) -> str:
+    """User-facing message for a failed Ollama call (counted in rag_errors_total)."""
     settings = get_settings()
-    prompt = RAG_PROMPT.format(context=context, question=question)
-    url = f"{settings.ollama_base_url.rstrip('/')}/api/generate"
-    payload = {
-        "model": settings.ollama_model,
-        "prompt": prompt,
-        "stream": False,
-    }
-    try:
-        with httpx.Client(timeout=120.0) as client:
-            resp = client.post(url, json=payload)
-            resp.raise_for_status()
-            data = resp.json()
-        return (data.get("response") or "").strip()
-    except httpx.ConnectError:
+    if isinstance(e, httpx.ConnectError):
+        ERRORS.inc("ollama_not_running")
         return OLLAMA_NOT_RUNNING_MSG
-    except httpx.HTTPStatusError as e:
+    if isinstance(e, httpx.PoolTimeout):
+        ERRORS.inc("ollama_busy")
+        return "Local LLM is busy, please retry shortly."
+    if isinstance(e, httpx.HTTPStatusError):
         if e.response.status_code == 404:
+            ERRORS.inc("ollama_model_missing")
             return (
                 f"Ollama model '{settings.ollama_model}' not found. "
                 f"Run: ollama run {settings.ollama_model}"
             )
+        ERRORS.inc("ollama_http")
         return f"Ollama error: {e.response.status_code} - {e.response.text}"
+    ERRORS.inc("llm")
+    return f"Local LLM error: {e}"
+
+
+def _ollama_request(question: str, context: str, stream: bool) -> tuple[str, dict]:
+    """Return (url, payload) for an Ollama /api/generate call."""
+    settings = get_settings()
+    prompt = RAG_PROMPT.format(context=context, question=question)
+    url = f"{settings.ollama_base_url.rstrip('/')}/api/generate"
+    payload = {
+        "model": settings.ollama_model,
+        "prompt": prompt,
+        "stream": stream,
+        # How long Ollama keeps the model loaded after this call
+        "keep_alive": settings.ollama_keep_alive,
+    }
+    return url, payload
+
+
+def _generate(question: str, context: str) -> str:
+    """Call local Ollama; raises on connection/HTTP errors."""
+    url, payload = _ollama_request(question, context, stream=False)
+    with httpx.Client(timeout=get_timeout()) as client:
+        resp = client.post(url, json=payload)
+        resp.raise_for_status()
+        data = resp.json()
+    return (data.get("response") or "").strip()
+
+
+def get_llm_response(question: str, context: str) -> str:
+    """Call local Ollama to generate answer from context and question."""
+    try:
+        return _generate(question, context)
     except Exception as e:
-        return f"Local LLM error: {e}"
+        return _format_llm_error(e)
+
 
+@dataclass
+class Retrieval:
+    """Result of the retrieval stage of a chat request.
 
-def rag_query(question: str, top_k: int = 5) -> tuple[str, list[dict]]:
+    answer is set when no LLM call is needed (cache hit, empty corpus, errors);
+    otherwise context holds the prompt context for generate().
     """
-    Run RAG: embed question, retrieve top_k chunks, build context, call local LLM.
-    Returns (response_text, sources) where sources are list of {document, metadata}.
+
+    question: str
+    sources: list[dict] = field(default_factory=list)
+    context: str = ""
+    answer: str | None = None
+    query_embedding: np.ndarray | None = None
+    corpus_version: int = 0
+    # Context packing report: tokens, naive_tokens, tokens_saved, ... (see context_packer)
+    context_stats: dict | None = None
+    # Sorted document ids retrieval was restricted to (None = whole corpus)
+    scope: tuple[int, ...] | None = None
+
+
+def retrieve(question: str, top_k: int = 5, document_ids: Collection[int] | None = None) -> Retrieval:
+    """
+    Embed question, consult the answer cache, then retrieve top_k chunks (vector + BM25,
+    rank-fused) and pack them into a token-budgeted context. With document_ids, only
+    those documents are searched.
+    """
+    return retrieve_many([question], top_k=top_k, document_ids=document_ids)[0]
+
+
+def retrieve_many(
+    questions: list[str],
+    top_k: int = 5,
+    document_ids: Collection[int] | None = None,
+) -> list[Retrieval]:
+    """
+    retrieve() for a batch of questions sharing one scope: all questions are embedded
+    in one call and the answer-cache misses are searched with one vector-store query.
+    Returns one Retrieval per question, in order.
     """
+    if not questions:
+        return []
+    scope = tuple(sorted(set(document_ids))) if document_ids is not None else None
+    cache = get_answer_cache()
+    corpus_version = cache.corpus_version
     try:
         embed_fn = get_embedding_function()
-        query_embedding = embed_fn([question])[0]
+        with CHAT_STAGE_SECONDS.time("embed"):
+            query_embeddings = embed_fn(list(questions))
     except Exception as e:
-        return (f"Embedding error: {e}", [])
+        ERRORS.inc("embedding")
+        return [Retrieval(question, answer=f"Embedding error: {e}") for question in questions]
+
+    results: list[Retrieval | None] = [None] * len(questions)
+    misses: list[int] = []
+    use_cache = get_settings().answer_cache_enabled
+    with CHAT_STAGE_SECONDS.time("cache_lookup"):
+        for i, (question, query_embedding) in enumerate(zip(questions, query_embeddings)):
+            cached = cache.get(query_embedding, scope=scope) if use_cache else None
+            if cached is None:
+                misses.append(i)
+                continue
+            response, sources = cached
+            results[i] = Retrieval(
+                question, sources=sources, answer=response, query_embedding=query_embedding, scope=scope
+            )
 
-    chunks = similarity_search(query_embedding, top_k=top_k)
+    if misses:
+        found = hybrid_search_many(
+            [questions[i] for i in misses],
+            np.asarray([query_embeddings[i] for i in misses]),
+            top_k=top_k,
+            document_ids=scope,
+        )
+        with CHAT_STAGE_SECONDS.time("context"):
+            for i, chunks in zip(misses, found):
+                results[i] = _build_retrieval(questions[i], query_embeddings[i], chunks, scope, corpus_version)
+    return results
+
+
+def _build_retrieval(
+    question: str,
+    query_embedding: np.ndarray,
+    chunks: list[dict],
+    scope: tuple[int, ...] | None,
+    corpus_version: int,
+) -> Retrieval:
+    """Pack retrieved chunks into the prompt context and sources (or a no-results answer)."""
     if not chunks:
+        if scope is not None:
+            return Retrieval(
+                question,
+                answer="No relevant passages found in the selected documents. Try widening the scope or rephrasing.",
+                scope=scope,
+            )
         total_chunks = get_collection_count()
         if total_chunks == 0:
-            return (
-                "No documents have been uploaded yet. "
-                "Upload PDFs in the Documents page (admin) to get started, then ask questions about their content.",
-                [],
+            return Retrieval(
+                question,
+                answer=(
+                    "No documents have been uploaded yet. "
+                    "Upload PDFs in the Documents page (admin) to get started, then ask questions about their content."
+                ),
             )
-        return (
-            "No relevant passages found for your question. "
-            "Try asking something that relates to your uploaded documents, or rephrase your question.",
-            [],
+        return Retrieval(
+            question,
+            answer=(
+                "No relevant passages found for your question. "
+                "Try asking something that relates to your uploaded documents, or rephrase your question."
+            ),
         )
 
-    context = "\n\n---\n\n".join(c.get("document", "") or "" for c in chunks)
+    context_stats = None
+    if get_settings().context_packing_enabled:
+        packed = pack_context(chunks)
+        context, context_stats = packed.text, packed.as_dict()
+    else:
+        context = CONTEXT_SEPARATOR.join(c.get("document", "") or "" for c in chunks)
     sources = []
     for c in chunks:
         doc = c.get("document") or ""
         text = (doc[:200] + "...") if len(doc) > 200 else doc
         sources.append({"text": text, "metadata": c.get("metadata") or {}})
-    response = get_llm_response(question, context)
-    return response, sources
+    return Retrieval(
+        question,
+        sources=sources,
+        context=context,
+        query_embedding=query_embedding,
+        corpus_version=corpus_version,
+        context_stats=context_stats,
+        scope=scope,
+    )
+
+
+def cache_answer(retrieval: Retrieval, response: str) -> None:
+    """Store a successful LLM answer in the semantic answer cache. Empty answers are not
+    cached: they would be served to every similar question until the corpus changes."""
+    if not response.strip() or retrieval.query_embedding is None or not get_settings().answer_cache_enabled:
+        return
+    get_answer_cache().put(
+        retrieval.query_embedding,
+        response,
+        retrieval.sources,
+        corpus_version=retrieval.corpus_version,
+        scope=retrieval.scope,
+    )
+
+
+def generate(retrieval: Retrieval) -> str:
+    """Call the local LLM for a retrieval that needs one; successful answers are cached."""
+    try:
+        with CHAT_STAGE_SECONDS.time("llm"):
+            response = _generate(retrieval.question, retrieval.context)
+    except Exception as e:
+        return _format_llm_error(e)
+    cache_answer(retrieval, response)
+    return response
+
+
+@asynccontextmanager
+async def _async_client():
+    """Yield the app's pooled Ollama client, or a one-off client outside the app."""
+    client = get_llm_client()
+    if client is not None:
+        yield client
+        return
+    async with httpx.AsyncClient(timeout=get_timeout()) as one_off:
+        yield one_off
+
+
+async def agenerate(retrieval: Retrieval) -> str:
+    """Async generate(): uses the shared pooled client; successful answers are cached."""
+    if get_llm_client() is None:
+        return await get_llm_executor().run(generate, retrieval)
+    url, payload = _ollama_request(retrieval.question, retrieval.context, stream=False)
+    try:
+        with CHAT_STAGE_SECONDS.time("llm"):
+            resp = await get_llm_client().post(url, json=payload)
+            resp.raise_for_status()
+            response = (resp.json().get("response") or "").strip()
+    except Exception as e:
+        return _format_llm_error(e)
+    cache_answer(retrieval, response)
+    return response
+
+
+async def stream_generate(retrieval: Retrieval) -> AsyncIterator[str]:
+    """Yield answer tokens as Ollama generates them; the full answer is cached at the end.
+
+    Raises LLMError (with a user-facing message) if Ollama fails.
+    """
+    url, payload = _ollama_request(retrieval.question, retrieval.context, stream=True)
+    parts: list[str] = []
+    started = time.perf_counter()
+    try:
+        async with _async_client() as client:
+            async with client.stream("POST", url, json=payload) as resp:
+                if resp.is_error:
+                    await resp.aread()
+                    resp.raise_for_status()
+                # Ollama streams one JSON object per line: {"response": "<token>", "done": false}
+                async for line in resp.aiter_lines():
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    if data.get("error"):
+                        ERRORS.inc("ollama_http")
+                        raise LLMError(f"Ollama error: {data['error']}")
+                    token = data.get("response") or ""
+                    if token:
+                        if not parts:
+                            CHAT_STAGE_SECONDS.observe("llm_first_token", time.perf_counter() - started)
+                        parts.append(token)
+                        yield token
+                    if data.get("done"):
+                        break
+    except LLMError:
+        raise
+    except Exception as e:
+        raise LLMError(_format_llm_error(e)) from e
+    CHAT_STAGE_SECONDS.observe("llm", time.perf_counter() - started)
+    cache_answer(retrieval, "".join(parts).strip())
+
+
+def rag_query(
+    question: str,
+    top_k: int = 5,
+    document_ids: Collection[int] | None = None,
+) -> tuple[str, list[dict]]:
+    """
+    Run RAG: embed question, retrieve top_k chunks, build context, call local LLM.
+    Returns (response_text, sources) where sources are list of {document, metadata}.
+    Near-duplicate questions are answered from the semantic answer cache.
+    A thin wrapper over retrieve + generate for synchronous callers.
+    """
+    retrieval = retrieve(question, top_k=top_k, document_ids=document_ids)
+    if retrieval.answer is not None:
+        return retrieval.answer, retrieval.sources
+    return generate(retrieval), retrieval.sources
+
+
+async def rag_query_async(
+    question: str,
+    top_k: int = 5,
+    document_ids: Collection[int] | None = None,
+) -> tuple[str, list[dict]]:
+    """rag_query for async callers: retrieval on the cpu pool, LLM call on the pooled async client."""
+    retrieval = await get_cpu_executor().run(retrieve, question, top_k, document_ids)
+    if retrieval.answer is not None:
+        return retrieval.answer, retrieval.sources
+    return await agenerate(retrieval), retrieval.sources
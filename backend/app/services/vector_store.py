@@ -1,88 +1,170 @@
-"""ChromaDB vector store: add chunks and similarity search."""
+"""Vector store facade: add chunks, similarity search, counts.
+
+The storage engine is chosen by settings.vector_engine:
+- "chroma" (default): ChromaDB persistent collection, plus (opt-in) one
+  collection per document group for whole-group scopes; any other scope is a
+  `where` filter over the global collection (services/chroma_engine.py);
+- "numpy": brute-force search over a memory-mapped float32/float16/int8 matrix
+  (services/numpy_engine.py).
+
+Both implement the VectorEngine protocol below. One engine per process is opened at
+startup (open_store) and reused by every call. Results are dicts with id, metadata
+and document (chunk text), whatever the engine.
+"""
 
 from __future__ import annotations
 
-import os
-# Disable Chroma telemetry before import (avoids capture() argument errors)
-os.environ.setdefault("ANONYMIZED_TELEMETRY", "FALSE")
+import threading
+from collections.abc import Collection
+from typing import Protocol
 
-import chromadb
-from chromadb.config import Settings as ChromaSettings
+import numpy as np
 
 from app.config import get_settings
-from app.services.embeddings import get_embedding_function
 
-COLLECTION_NAME = "rag_chunks"
+Embeddings = np.ndarray | list[list[float]]
+
+
+class VectorEngine(Protocol):
+    name: str
+
+    def open(self): ...
+
+    def close(self) -> None: ...
+
+    def count(self) -> int: ...
+
+    def add(self, ids: list[str], embeddings: Embeddings, metadatas: list[dict], documents: list[str]) -> None: ...
+
+    def upsert(self, ids: list[str], embeddings: Embeddings, metadatas: list[dict], documents: list[str]) -> None: ...
+
+    def update_metadata(self, ids: list[str], metadatas: list[dict]) -> None: ...
 
+    def delete(self, ids: list[str] | None = None, document_id: int | None = None) -> int: ...
 
-def _get_client():
+    def get(self, ids: list[str]) -> list[dict]: ...
+
+    def search(self, query_embedding, top_k: int, document_ids: Collection[int] | None = None) -> list[dict]: ...
+
+    def search_many(
+        self, query_embeddings: Embeddings, top_k: int, document_ids: Collection[int] | None = None
+    ) -> list[list[dict]]: ...
+
+
+_engine: VectorEngine | None = None
+_lock = threading.Lock()
+
+
+def _create_engine() -> VectorEngine:
     settings = get_settings()
-    return chromadb.PersistentClient(
-        path=settings.vector_store_path,
-        settings=ChromaSettings(anonymized_telemetry=False),
-    )
+    if settings.vector_engine == "chroma":
+        from app.services.chroma_engine import ChromaEngine
+
+        return ChromaEngine(partitions=settings.chroma_group_partitions)
+    if settings.vector_engine == "numpy":
+        from app.services.numpy_engine import NumpyEngine
+
+        return NumpyEngine(
+            settings.numpy_index_path,
+            dtype=settings.numpy_index_dtype,
+            rescore_factor=settings.numpy_rescore_factor,
+        )
+    raise ValueError(f"Unknown VECTOR_ENGINE {settings.vector_engine!r} (use 'chroma' or 'numpy')")
+
 
+def get_engine() -> VectorEngine:
+    """The process-wide engine, opened on first use."""
+    global _engine
+    if _engine is None:
+        with _lock:
+            if _engine is None:
+                engine = _create_engine()
+                engine.open()
+                _engine = engine
+    return _engine
 
-def get_collection():
-    """Get or create the RAG collection with our embedding function."""
-    client = _get_client()
-    return client.get_or_create_collection(
-        name=COLLECTION_NAME,
-        metadata={"description": "RAG document chunks"},
-    )
+
+def open_store() -> VectorEngine:
+    """Open the configured engine (idempotent; called from lifespan)."""
+    return get_engine()
+
+
+def close_store() -> None:
+    """Release the engine on shutdown."""
+    global _engine
+    with _lock:
+        if _engine is not None:
+            _engine.close()
+        _engine = None
 
 
 def get_collection_count() -> int:
-    """Return number of chunks in the RAG collection (0 if empty or error)."""
+    """Return number of chunks in the store (0 if empty or error)."""
     try:
-        coll = get_collection()
-        return coll.count()
+        return get_engine().count()
     except Exception:
         return 0
 
 
 def add_chunks(
     ids: list[str],
-    embeddings: list[list[float]],
+    embeddings: Embeddings,
+    metadatas: list[dict],
+    documents: list[str],
+) -> None:
+    """Add chunk embeddings and text. ids unique (e.g. doc_id_chunk_idx)."""
+    get_engine().add(ids, embeddings, metadatas, documents)
+
+
+def upsert_chunks(
+    ids: list[str],
+    embeddings: Embeddings,
     metadatas: list[dict],
     documents: list[str],
 ) -> None:
-    """Add chunk embeddings and text to Chroma. ids unique (e.g. doc_id_chunk_idx)."""
-    coll = get_collection()
-    coll.add(ids=ids, embeddings=embeddings, metadatas=metadatas, documents=documents)
+    """Add or overwrite chunks by id (re-ingestion; safe to repeat)."""
+    get_engine().upsert(ids, embeddings, metadatas, documents)
+
+
+def update_chunk_metadata(ids: list[str], metadatas: list[dict]) -> None:
+    """Replace the metadata of existing chunks without touching their vectors."""
+    if ids:
+        get_engine().update_metadata(ids, metadatas)
+
+
+def delete_chunks(ids: list[str] | None = None, document_id: int | None = None) -> int:
+    """Delete chunks by id or by document_id. Returns the number removed."""
+    return get_engine().delete(ids=ids, document_id=document_id)
+
+
+def get_chunks(ids: list[str]) -> list[dict]:
+    """Fetch chunks by id (same dict shape as similarity_search); missing ids are skipped."""
+    if not ids:
+        return []
+    return get_engine().get(ids)
 
 
 def similarity_search(
-    query_embedding: list[float],
+    query_embedding: np.ndarray | list[float],
     top_k: int = 5,
-    document_id: int | None = None,
+    document_ids: Collection[int] | None = None,
 ) -> list[dict]:
     """
     Return top_k most similar chunks. Each dict has id, metadata, document (chunk text).
-    If document_id is set, filter to that document only.
+    If document_ids is set, only those documents are searched. NumPy scores only their
+    rows, and partitioned Chroma queries only their groups' collections, so the cost
+    follows the scope rather than the corpus.
     """
-    coll = get_collection()
-    where = {"document_id": document_id} if document_id is not None else None
-    # Chroma returns lists of lists: one list per query; we pass a single query
-    results = coll.query(
-        query_embeddings=[query_embedding],
-        n_results=min(top_k, max(1, coll.count())),  # avoid asking for more than exist
-        where=where,
-        include=["metadatas", "documents"],
-    )
-    ids_list = results.get("ids") or []
-    if not ids_list or not ids_list[0]:
+    return get_engine().search(query_embedding, top_k, document_ids=document_ids)
+
+
+def similarity_search_many(
+    query_embeddings: Embeddings,
+    top_k: int = 5,
+    document_ids: Collection[int] | None = None,
+) -> list[list[dict]]:
+    """similarity_search for a batch of queries in one engine call (one Chroma query
+    with all embeddings, or one pass over the NumPy matrix); one result list per query."""
+    if len(query_embeddings) == 0:
         return []
-    first_ids = ids_list[0]
-    metadatas_list = results.get("metadatas") or [[]]
-    documents_list = results.get("documents") or [[]]
-    first_metas = metadatas_list[0] if metadatas_list else []
-    first_docs = documents_list[0] if documents_list else []
-    out: list[dict] = []
-    for i, chunk_id in enumerate(first_ids):
-        meta = first_metas[i] if i < len(first_metas) else {}
-        doc = first_docs[i] if i < len(first_docs) else ""
-        if not isinstance(doc, str):
-            doc = str(doc) if doc is not None else ""
-        out.append({"id": chunk_id, "metadata": meta, "document": doc})
-    return out
+    return get_engine().search_many(query_embeddings, top_k, document_ids=document_ids)
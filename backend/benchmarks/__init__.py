@@ -0,0 +1 @@
+"""Benchmarks. Run from backend/: python -m benchmarks.<name> --help"""
@@ -0,0 +1,99 @@
+"""Per-request cost of the auth dependency (get_current_user_optional).
+
+Seeds --users rows in a fresh SQLite database, then resolves a bearer token
+--requests times in each mode:
+
+- lookup: principal cache disabled (TTL 0), so every request decodes the JWT and
+  runs SELECT ... WHERE email = ? in its own session (the behaviour before the cache)
+- cache: a token without uid/role claims; the first request queries, the rest hit
+  the cache
+- claims: a token with uid/role claims and the cache cleared before every request,
+  so each one is served from the token alone
+
+JWT decoding is common to all three and reported on its own.
+
+    cd backend && python -m benchmarks.bench_auth --users 10000 --requests 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from benchmarks.common import isolate_data_dir
+
+isolate_data_dir()
+
+from fastapi.security import HTTPAuthorizationCredentials  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from app.core import principals  # noqa: E402
+from app.core.dependencies import get_current_user_optional  # noqa: E402
+from app.core.security import create_access_token, decode_token  # noqa: E402
+from app.db.session import AsyncSessionLocal, engine, init_db  # noqa: E402
+from app.models import User  # noqa: E402
+
+
+async def seed(users: int) -> None:
+    await init_db()
+    async with AsyncSessionLocal() as db:
+        for start in range(0, users, 5000):
+            rows = [
+                {"name": f"user {i}", "email": f"user{i}@example.com", "password": "x", "role": "user"}
+                for i in range(start, min(start + 5000, users))
+            ]
+            await db.execute(insert(User), rows)
+        await db.commit()
+
+
+async def run(token: str, requests: int, clear: bool = False) -> list[float]:
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    assert await get_current_user_optional(credentials) is not None
+    latencies = []
+    for _ in range(requests):
+        if clear:
+            principals.get_principal_cache().clear()
+        t0 = time.perf_counter()
+        await get_current_user_optional(credentials)
+        latencies.append(time.perf_counter() - t0)
+    return latencies
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    await seed(args.users)
+    subject = f"user{args.users // 2}@example.com"
+    plain = create_access_token(subject=subject)
+    with_claims = create_access_token(subject=subject, claims={"uid": args.users // 2 + 1, "role": "user"})
+
+    t0 = time.perf_counter()
+    for _ in range(args.requests):
+        decode_token(plain)
+    decode_us = (time.perf_counter() - t0) / args.requests * 1e6
+
+    results = {}
+    principals._cache = principals.PrincipalCache(ttl_seconds=0, max_entries=0)
+    results["lookup"] = await run(plain, args.requests)
+    principals._cache = principals.PrincipalCache(ttl_seconds=60, max_entries=10000)
+    results["cache"] = await run(plain, args.requests)
+    results["claims"] = await run(with_claims, args.requests, clear=True)
+
+    print(f"{args.users} users, {args.requests} requests per mode; JWT decode alone {decode_us:.1f} us")
+    print(f"{'mode':>8} {'p50 us':>8} {'p95 us':>8} {'req/s':>9}")
+    for mode, latencies in results.items():
+        quantiles = statistics.quantiles(latencies, n=100)
+        print(
+            f"{mode:>8} {quantiles[49] * 1e6:>8.1f} {quantiles[94] * 1e6:>8.1f}"
+            f" {len(latencies) / sum(latencies):>9.0f}"
+        )
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
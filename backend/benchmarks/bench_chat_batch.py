@@ -0,0 +1,98 @@
+"""Retrieval cost of N questions: one retrieve() per question vs. one retrieve_many().
+
+retrieve() per question is what N calls to POST /chat/ do: N embedding calls and N
+vector-store queries. retrieve_many() is POST /chat/batch: one embedding call and one
+vector-store query carrying every embedding. Context packing runs per question in
+both, and so does BM25, which is why hybrid search is off unless --hybrid is given.
+The LLM stage is excluded (it is bounded by chat_batch_concurrency and Ollama, not
+by batching).
+
+Chunks use clustered vectors with page-like text. By default questions are embedded
+with the model-free hash embedder; --model uses the configured sentence-transformers
+model, whose per-call overhead is what batching saves most on.
+
+    cd backend && python -m benchmarks.bench_chat_batch --chunks 20000 --questions 200
+    cd backend && python -m benchmarks.bench_chat_batch --engine numpy --model
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import time
+
+from benchmarks.common import clustered_vectors, hash_embed, isolate_data_dir
+from benchmarks.pdfgen import page_text
+
+isolate_data_dir()
+
+BATCH = 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--documents", type=int, default=100)
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--engine", default="chroma", choices=["chroma", "numpy"])
+    parser.add_argument("--model", action="store_true", help="embed questions with the real model")
+    parser.add_argument("--hybrid", action="store_true", help="include BM25 (identical per-question cost in both)")
+    args = parser.parse_args()
+    os.environ["VECTOR_ENGINE"] = args.engine
+    os.environ["ANSWER_CACHE_ENABLED"] = "false"
+    os.environ["HYBRID_SEARCH_ENABLED"] = str(args.hybrid).lower()
+
+    from app.services import lexical_index, rag
+    from app.services.embeddings import get_embedding_function
+    from app.services.vector_store import add_chunks, close_store
+
+    if not args.model:
+        rag.get_embedding_function = lambda: hash_embed
+    else:
+        get_embedding_function()(["warm-up"])
+
+    per_doc = -(-args.chunks // args.documents)
+    vectors, _ = clustered_vectors(args.chunks, args.documents, 0)
+    texts = [page_text(i)[:800] for i in range(args.chunks)]
+    for start in range(0, args.chunks, BATCH):
+        rows = range(start, min(start + BATCH, args.chunks))
+        ids = [f"{i // per_doc}_{i}" for i in rows]
+        add_chunks(
+            ids,
+            vectors[start:rows.stop],
+            [{"document_id": i // per_doc, "chunk_index": i, "page_number": 1, "filename": "bench.pdf"} for i in rows],
+            [texts[i] for i in rows],
+        )
+        if args.hybrid:
+            for i, chunk_id in zip(rows, ids):
+                lexical_index.get_lexical_index().add(chunk_id, i // per_doc, texts[i])
+    if args.hybrid:
+        lexical_index._ready.set()  # normally set by the startup build from the embeddings table
+
+    rng = random.Random(0)
+    words = " ".join(texts[:50]).split()
+    questions = [" ".join(rng.sample(words, 8)) + "?" for _ in range(args.questions)]
+
+    rag.retrieve(questions[0])  # warm caches
+    t0 = time.perf_counter()
+    one_by_one = [rag.retrieve(q) for q in questions]
+    sequential = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    batched = rag.retrieve_many(questions)
+    batch = time.perf_counter() - t0
+
+    same = sum(
+        [s["metadata"]["chunk_index"] for s in a.sources] == [s["metadata"]["chunk_index"] for s in b.sources]
+        for a, b in zip(one_by_one, batched)
+    )
+    print(f"{args.engine}, {args.chunks} chunks, {args.questions} questions, embedder={'model' if args.model else 'hash'}, hybrid={args.hybrid}")
+    print(f"{'':>14} {'total s':>8} {'ms/question':>12}")
+    print(f"{'retrieve x N':>14} {sequential:>8.2f} {sequential / args.questions * 1000:>12.2f}")
+    print(f"{'retrieve_many':>14} {batch:>8.2f} {batch / args.questions * 1000:>12.2f}")
+    print(f"speedup {sequential / batch:.1f}x; identical sources for {same}/{args.questions} questions")
+    close_store()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""/chat/history query latency on a large chats table, with and without the
+(user_id, timestamp, id) index, idle and with a concurrent chat writer.
+
+Builds --rows chat rows spread over --users users in a SQLite file (kept with
+--db PATH so later runs skip the build). It then runs the history endpoint's
+query (history_page: one user's newest --limit rows) through the app's async
+engine, so the pool and the SQLITE_* pragmas apply:
+
+- no index: ix_chats_user_id_timestamp_id dropped, every query scans and sorts
+- index: after CREATE INDEX (its build time is printed: the migration's cost)
+- page N: the keyset page N pages in, for each N in --depths. The cursor is
+  reached by walking history_page untimed; only the last page is timed. With
+  the index the latency should stay flat as N grows. Users with fewer than N
+  pages are skipped.
+- index + writer: the same while a thread saves one chat row every --write-ms,
+  each in its own transaction like /chat/. Under SQLITE_JOURNAL_MODE=DELETE
+  readers wait out each write; under WAL they do not.
+
+    cd backend && python -m benchmarks.bench_chat_history --rows 10000000 --db /tmp/chats.db
+    cd backend && SQLITE_JOURNAL_MODE=DELETE python -m benchmarks.bench_chat_history --db /tmp/chats.db
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import threading
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import isolate_data_dir
+
+INDEX = "ix_chats_user_id_timestamp_id"
+BATCH = 100_000
+
+
+def build(path: str, rows: int, users: int) -> None:
+    """Fill chats (and users) with synthetic rows, timestamps increasing with id."""
+    db = sqlite3.connect(path)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=OFF")
+    db.execute(f"DROP INDEX IF EXISTS {INDEX}")
+    db.executemany(
+        "INSERT INTO users (id, name, email, password, role) VALUES (?, ?, ?, 'x', 'user')",
+        ((i, f"user {i}", f"user{i}@example.com") for i in range(1, users + 1)),
+    )
+    rng = random.Random(0)
+    start = datetime(2025, 1, 1)
+    for begin in range(0, rows, BATCH):
+        db.executemany(
+            "INSERT INTO chats (user_id, question, response, timestamp) VALUES (?, ?, ?, ?)",
+            (
+                (
+                    rng.randint(1, users),
+                    f"question {i} about the warranty terms?",
+                    f"answer {i}: see section {i % 97} of the manual.",
+                    (start + timedelta(seconds=i * 3)).strftime("%Y-%m-%d %H:%M:%S"),
+                )
+                for i in range(begin, min(begin + BATCH, rows))
+            ),
+        )
+        db.commit()
+        print(f"\r  {min(begin + BATCH, rows):,} rows", end="", flush=True)
+    print()
+    db.close()
+
+
+def writer(path: str, users: int, interval: float, stop: threading.Event, saved: list[int]) -> None:
+    db = sqlite3.connect(path, timeout=30)
+    db.execute(f"PRAGMA synchronous={os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')}")
+    rng = random.Random(1)
+    while not stop.is_set():
+        db.execute(
+            "INSERT INTO chats (user_id, question, response, timestamp) VALUES (?, 'new question?', 'new answer.', CURRENT_TIMESTAMP)",
+            (rng.randint(1, users),),
+        )
+        db.commit()
+        saved[0] += 1
+        time.sleep(interval)
+    db.close()
+
+
+async def cursor_at(user_id: int, depth: int, limit: int) -> str | None:
+    """Cursor of the user's page `depth` pages in, or None if the history is shorter."""
+    from app.db.session import AsyncSessionLocal
+    from app.services.chat_history import history_page
+
+    cursor = None
+    async with AsyncSessionLocal() as db:
+        for _ in range(depth):
+            _, cursor = await history_page(db, user_id, limit, cursor)
+            if cursor is None:
+                return None
+    return cursor
+
+
+async def time_queries(users: int, queries: int, limit: int, depth: int = 0) -> list[float]:
+    from app.db.session import AsyncSessionLocal
+    from app.services.chat_history import history_page
+
+    rng = random.Random(2)
+    latencies = []
+    misses = 0
+    while len(latencies) < queries and misses < queries * 10:
+        user_id = rng.randint(1, users)
+        cursor = await cursor_at(user_id, depth, limit) if depth else None
+        if depth and cursor is None:
+            misses += 1
+            continue
+        t0 = time.perf_counter()
+        async with AsyncSessionLocal() as db:
+            await history_page(db, user_id, limit, cursor)
+        latencies.append(time.perf_counter() - t0)
+    return latencies
+
+
+def row(label: str, latencies: list[float], extra: str = "") -> None:
+    quantiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    print(f"{label:>16} {quantiles[49] * 1000:>9.2f} {quantiles[94] * 1000:>9.2f} {len(latencies):>8}  {extra}")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--db", help="SQLite file to build or reuse (default: a temp dir)")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--scan-queries", type=int, default=5, help="queries without the index (each scans the table)")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--write-ms", type=float, default=5.0)
+    parser.add_argument("--depths", default="1,5,15", help="comma-separated page depths to time with the index")
+    args = parser.parse_args()
+
+    tmp = isolate_data_dir()
+    path = args.db or os.path.join(tmp, "chats.db")
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{path}"
+    fresh = not os.path.exists(path)
+
+    from app.db.session import engine, init_db
+
+    await init_db()  # creates tables (and the index, dropped again below) on a new file
+    if fresh:
+        print(f"building {args.rows:,} chat rows for {args.users:,} users in {path}")
+        await engine.dispose()
+        build(path, args.rows, args.users)
+
+    db = sqlite3.connect(path)
+    total = db.execute("SELECT count(*) FROM chats").fetchone()[0]
+    db.execute(f"DROP INDEX IF EXISTS {INDEX}")
+    db.commit()
+    await engine.dispose()
+    async with engine.connect() as conn:
+        mode = (await conn.exec_driver_sql("PRAGMA journal_mode")).scalar()
+
+    print(f"{total:,} chats, {args.users:,} users, newest {args.limit} per query, journal_mode={mode}")
+    print(f"{'':>16} {'p50 ms':>9} {'p95 ms':>9} {'queries':>8}")
+    row("no index", await time_queries(args.users, args.scan_queries, args.limit))
+
+    t0 = time.perf_counter()
+    db.execute(f"CREATE INDEX {INDEX} ON chats (user_id, timestamp, id)")
+    db.commit()
+    db.close()
+    built = time.perf_counter() - t0
+    row("index", await time_queries(args.users, args.queries, args.limit), f"CREATE INDEX took {built:.1f} s")
+    for depth in (int(d) for d in args.depths.split(",") if d.strip()):
+        latencies = await time_queries(args.users, args.queries, args.limit, depth)
+        if len(latencies) < 2:
+            print(f"{f'page {depth}':>16} skipped: too few users have {depth} pages of {args.limit}")
+            continue
+        row(f"page {depth}", latencies, f"rows {depth * args.limit + 1}-{(depth + 1) * args.limit}")
+
+    stop, saved = threading.Event(), [0]
+    thread = threading.Thread(target=writer, args=(path, args.users, args.write_ms / 1000, stop, saved))
+    thread.start()
+    t0 = time.perf_counter()
+    try:
+        latencies = await time_queries(args.users, args.queries, args.limit)
+    finally:
+        stop.set()
+        thread.join()
+    writes = saved[0] / (time.perf_counter() - t0)
+    row("index + writer", latencies, f"{writes:.0f} chat writes/s alongside")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
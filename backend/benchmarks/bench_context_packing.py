@@ -0,0 +1,130 @@
+"""Prompt size and Ollama prefill latency: naive top_k join vs. the context packer.
+
+Retrieval sets are drawn from a synthetic document chunked by the real splitter
+(CHUNK_SIZE / CHUNK_OVERLAP): each set has top_k chunks, and with probability
+--adjacent a chunk is a neighbour of one already picked (what hybrid retrieval
+returns for a passage spanning chunks). Both contexts are rendered into RAG_PROMPT.
+
+Prompt tokens are estimated at 4 chars/token. Without --ollama, prefill time is
+only an estimate: estimated tokens divided by an assumed --prefill-tps, so its ratio
+is the token ratio and says nothing about the model. With --ollama, each prompt is
+sent to /api/generate with num_predict=1 and Ollama's own prompt_eval_count /
+prompt_eval_duration are reported as the measured prefill (the model must be pulled).
+
+    cd backend && python -m benchmarks.bench_context_packing --sets 200 --top-k 5
+    cd backend && python -m benchmarks.bench_context_packing --sets 20 --ollama http://localhost:11434
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+
+import httpx
+
+from benchmarks.common import isolate_data_dir
+from benchmarks.pdfgen import page_text
+
+isolate_data_dir()
+
+from app.config import get_settings  # noqa: E402
+from app.services.chunker import iter_chunks  # noqa: E402
+from app.services.context_packer import CONTEXT_SEPARATOR, estimate_tokens, pack_context  # noqa: E402
+from app.services.rag import RAG_PROMPT  # noqa: E402
+
+QUESTION = "What does the manual say about resetting the network module?"
+
+
+def corpus(pages: int) -> list[dict]:
+    chunks = []
+    for index, (text, page) in enumerate(iter_chunks((p, page_text(p)) for p in range(1, pages + 1))):
+        chunks.append(
+            {"id": f"1_{index}", "document": text, "metadata": {"document_id": 1, "page_number": page, "chunk_index": index}}
+        )
+    return chunks
+
+
+def retrieval_set(chunks: list[dict], top_k: int, adjacent: float, rng: random.Random) -> list[dict]:
+    picked: list[int] = []
+    while len(picked) < top_k:
+        if picked and rng.random() < adjacent:
+            candidate = rng.choice(picked) + rng.choice((-1, 1))
+        else:
+            candidate = rng.randrange(len(chunks))
+        if 0 <= candidate < len(chunks) and candidate not in picked:
+            picked.append(candidate)
+    return [chunks[i] for i in picked]
+
+
+def ollama_prefill(client: httpx.Client, model: str, prompt: str) -> tuple[int, float]:
+    """(prompt tokens, prefill seconds) as measured by Ollama."""
+    resp = client.post(
+        "/api/generate",
+        json={"model": model, "prompt": prompt, "stream": False, "options": {"num_predict": 1}},
+    )
+    resp.raise_for_status()
+    data = resp.json()
+    return data.get("prompt_eval_count", 0), data.get("prompt_eval_duration", 0) / 1e9
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--sets", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--adjacent", type=float, default=0.5, help="chance a pick neighbours an earlier pick")
+    parser.add_argument("--budget", type=int, default=None, help="token budget (default: CONTEXT_TOKEN_BUDGET)")
+    parser.add_argument("--prefill-tps", type=float, default=250.0, help="prefill tokens/s for the estimate")
+    parser.add_argument("--ollama", default=None, help="Ollama base URL to measure real prefill")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    chunks = corpus(args.pages)
+    sets = [retrieval_set(chunks, args.top_k, args.adjacent, rng) for _ in range(args.sets)]
+    naive_prompts = [
+        RAG_PROMPT.format(context=CONTEXT_SEPARATOR.join(c["document"] for c in s), question=QUESTION) for s in sets
+    ]
+    packed_prompts = [
+        RAG_PROMPT.format(context=pack_context(s, args.budget).text, question=QUESTION) for s in sets
+    ]
+    naive_tokens = [estimate_tokens(p) for p in naive_prompts]
+    packed_tokens = [estimate_tokens(p) for p in packed_prompts]
+    naive_mean, packed_mean = statistics.mean(naive_tokens), statistics.mean(packed_tokens)
+    budget = args.budget if args.budget is not None else get_settings().context_token_budget
+    print(f"{len(chunks)} chunks, {args.sets} sets of top_k={args.top_k}, adjacent={args.adjacent}, budget={budget}")
+    print(f"{'':>8} {'prompt tokens (est.)':>21} {'prefill s (est.)':>17}")
+    print(f"{'naive':>8} {naive_mean:>21,.0f} {naive_mean / args.prefill_tps:>17.2f}")
+    print(f"{'packed':>8} {packed_mean:>21,.0f} {packed_mean / args.prefill_tps:>17.2f}")
+    print(f"saved {1 - packed_mean / naive_mean:.1%} of prompt tokens (estimated)")
+    if not args.ollama:
+        print(
+            f"prefill is estimated at an assumed {args.prefill_tps:.0f} tokens/s, not measured;"
+            " pass --ollama URL to measure it"
+        )
+
+    if args.ollama:
+        model = get_settings().ollama_model
+        with httpx.Client(base_url=args.ollama.rstrip("/"), timeout=600) as client:
+            ollama_prefill(client, model, "warm up")  # load the model first
+            measured = {"naive": [], "packed": []}
+            for naive, packed in zip(naive_prompts, packed_prompts):
+                measured["naive"].append(ollama_prefill(client, model, naive))
+                measured["packed"].append(ollama_prefill(client, model, packed))
+        print(f"\nOllama ({model}) {'prompt tokens':>14} {'prefill ms p50':>15} {'prefill ms mean':>16}")
+        means = {}
+        for name, rows in measured.items():
+            tokens = statistics.mean(r[0] for r in rows)
+            seconds = [r[1] for r in rows]
+            means[name] = statistics.mean(seconds)
+            print(
+                f"{name:>15} {tokens:>14,.0f} {statistics.median(seconds) * 1000:>15,.0f}"
+                f" {means[name] * 1000:>16,.0f}"
+            )
+        if means["naive"]:
+            print(f"measured prefill reduction: {1 - means['packed'] / means['naive']:.1%}")
+
+
+if __name__ == "__main__":
+    main()
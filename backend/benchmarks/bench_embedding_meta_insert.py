@@ -0,0 +1,84 @@
+"""Rows/sec inserting EmbeddingMeta on SQLite: per-row ORM db.add vs. Core bulk insert.
+
+"orm" is the original upload path (one tracked EmbeddingMeta per chunk, flushed at
+commit); "core" is app.db.bulk.bulk_insert_embedding_meta fed from a generator.
+
+    cd backend && python -m benchmarks.bench_embedding_meta_insert --rows 5000 50000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import isolate_data_dir
+
+isolate_data_dir()
+
+from sqlalchemy import delete  # noqa: E402
+
+from app.db.bulk import bulk_insert_embedding_meta  # noqa: E402
+from app.db.session import AsyncSessionLocal, init_db  # noqa: E402
+from app.models import Document, EmbeddingMeta, User  # noqa: E402
+
+CHUNK_TEXT = "lorem ipsum dolor sit amet " * 37  # ~1000 chars, like a real chunk
+
+
+def chunk_rows(n: int):
+    for i in range(n):
+        yield CHUNK_TEXT, i // 4 + 1, i
+
+
+async def orm_insert(document_id: int, n: int) -> None:
+    async with AsyncSessionLocal() as session:
+        for text, page, index in chunk_rows(n):
+            session.add(EmbeddingMeta(document_id=document_id, page_number=page, chunk_text=text, chunk_index=index))
+        await session.commit()
+
+
+async def core_insert(document_id: int, n: int, batch_size: int) -> None:
+    async with AsyncSessionLocal() as session:
+        await bulk_insert_embedding_meta(session, document_id, chunk_rows(n), batch_size=batch_size)
+        await session.commit()
+
+
+async def clear(document_id: int) -> None:
+    async with AsyncSessionLocal() as session:
+        await session.execute(delete(EmbeddingMeta).where(EmbeddingMeta.document_id == document_id))
+        await session.commit()
+
+
+async def timed(coro) -> float:
+    t0 = time.perf_counter()
+    await coro
+    return time.perf_counter() - t0
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[5000, 50000])
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    await init_db()
+    async with AsyncSessionLocal() as session:
+        user = User(name="bench", email="bench@example.com", password="x", role="admin")
+        session.add(user)
+        await session.flush()
+        doc = Document(filename="bench.pdf", uploaded_by=user.id)
+        session.add(doc)
+        await session.commit()
+        document_id = doc.id
+
+    print(f"{'rows':>8} {'orm rows/s':>12} {'core rows/s':>12} {'speedup':>8}")
+    for n in args.rows:
+        orm_s = await timed(orm_insert(document_id, n))
+        await clear(document_id)
+        core_s = await timed(core_insert(document_id, n, args.batch_size))
+        await clear(document_id)
+        print(f"{n:>8} {n / orm_s:>12,.0f} {n / core_s:>12,.0f} {orm_s / core_s:>7.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,96 @@
+"""Peak memory of ingestion vs. document size: materialized pipeline vs. streaming.
+
+The materialized variant reproduces the original ingest_pdf (all pages, all chunks,
+all embeddings as float lists, one add_chunks call, rows returned for the caller).
+The streaming variant is ingest_pdf_stream reading the spooled file with a no-op sink.
+Peak is measured with tracemalloc (Python + NumPy allocations) in-process, so PDF
+extraction runs serially (PDF_EXTRACT_WORKERS=1). Streaming peak still grows slowly
+with page count: PyPDF2 has to hold the page tree (a few KB per page), but not the
+page text, chunks or vectors.
+
+    cd backend && python -m benchmarks.bench_ingestion_memory --pages 50 200 800
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import os
+import time
+import tracemalloc
+
+from benchmarks.common import hash_embed, isolate_data_dir
+from benchmarks.pdfgen import make_document
+
+isolate_data_dir()
+os.environ["PDF_EXTRACT_WORKERS"] = "1"
+
+from app.services import ingestion  # noqa: E402
+from app.services.chunker import chunk_pages  # noqa: E402
+from app.services.pdf_extractor import extract_text_from_pdf  # noqa: E402
+from app.services.vector_store import add_chunks, delete_chunks  # noqa: E402
+
+
+def materialized(content: bytes, document_id: int, embed) -> int:
+    pages = extract_text_from_pdf(content)
+    chunks = chunk_pages(pages)
+    texts = [c[0] for c in chunks]
+    embeddings = [e.tolist() for e in embed(texts)]
+    add_chunks(
+        ids=[f"{document_id}_{i}" for i in range(len(texts))],
+        embeddings=embeddings,
+        metadatas=[{"document_id": document_id, "chunk_index": i, "page_number": c[1] or 0, "filename": "bench.pdf"}
+                   for i, c in enumerate(chunks)],
+        documents=texts,
+    )
+    rows = [(texts[i], chunks[i][1] or 0, i) for i in range(len(texts))]
+    return len(rows)
+
+
+def streaming(path: str, document_id: int, embed) -> int:
+    return ingestion.ingest_pdf_stream(path, document_id, "bench.pdf", sink=lambda rows: None)
+
+
+def measure(fn, *args) -> tuple[int, float, float]:
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    n = fn(*args)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return n, peak / 1e6, elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[50, 200, 800])
+    parser.add_argument("--model", action="store_true", help="use the real sentence-transformers model")
+    args = parser.parse_args()
+
+    if args.model:
+        from app.services.embeddings import get_embedding_function
+        embed = get_embedding_function()
+    else:
+        embed = hash_embed
+        ingestion.get_embedding_function = lambda: hash_embed
+
+    tmp = os.environ["UPLOAD_DIR"]
+    os.makedirs(tmp, exist_ok=True)
+    print(f"{'pages':>6} {'chunks':>7} {'materialized MB':>16} {'streaming MB':>13} {'mat s':>7} {'stream s':>9}")
+    for i, n_pages in enumerate(args.pages):
+        content = make_document(n_pages)
+        path = os.path.join(tmp, f"bench_{n_pages}.pdf")
+        with open(path, "wb") as f:
+            f.write(content)
+
+        n, mat_peak, mat_s = measure(materialized, content, 2 * i + 1, embed)
+        delete_chunks(document_id=2 * i + 1)
+        del content
+        _, stream_peak, stream_s = measure(streaming, path, 2 * i + 2, embed)
+        delete_chunks(document_id=2 * i + 2)
+        print(f"{n_pages:>6} {n:>7} {mat_peak:>16.1f} {stream_peak:>13.1f} {mat_s:>7.2f} {stream_s:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
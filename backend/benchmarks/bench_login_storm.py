@@ -0,0 +1,162 @@
+"""Chat-side latency during a login storm: bcrypt on the password pool vs. inline.
+
+Starts the API under uvicorn in a subprocess (one worker, fresh data dir) and
+registers one chat user plus --storm-users users. Then it runs two phases of
+--duration seconds each:
+
+1. quiet: the chat user sends GET /chat/history every --interval seconds
+2. storm: the same chat traffic while --concurrency clients log in back to back
+
+Per phase it prints chat latency p50/p95/max and the login status counts. The
+storm phase returns 200 for logins that were served and 429 for those shed
+because the password pool was full. The run is repeated with --inline, which
+patches login back to calling bcrypt on the event loop (the old behaviour).
+History requests stand in for chat because they need neither the embedding model
+nor Ollama; any request waiting on the same event loop sees the same stalls.
+
+    cd backend && python -m benchmarks.bench_login_storm --duration 10 --concurrency 32
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+
+import httpx
+
+from benchmarks.common import isolate_data_dir
+
+PASSWORD = "storm-password"
+
+
+def serve(port: int, inline: bool) -> None:
+    """Subprocess entry point: run the app, optionally with bcrypt back on the loop."""
+    isolate_data_dir()
+    os.environ["EMBEDDING_WARMUP"] = "false"
+    import uvicorn
+
+    from app.api import auth
+    from app.core import security
+
+    if inline:
+
+        async def verify_inline(plain: str, hashed: str) -> bool:
+            return security.verify_password(plain, hashed)
+
+        auth.verify_password_async = verify_inline
+    from app.main import app
+
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def wait_ready(client: httpx.AsyncClient) -> None:
+    for _ in range(600):
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+async def register(client: httpx.AsyncClient, email: str) -> str:
+    r = await client.post("/api/v1/auth/register", json={"name": email, "email": email, "password": PASSWORD})
+    r.raise_for_status()
+    return r.json()["access_token"]
+
+
+async def chat_traffic(client: httpx.AsyncClient, token: str, duration: float, interval: float) -> list[float]:
+    latencies = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        r = await client.get("/api/v1/chat/history", params={"limit": 20}, headers={"Authorization": f"Bearer {token}"})
+        r.raise_for_status()
+        latencies.append(time.perf_counter() - t0)
+        await asyncio.sleep(max(0.0, interval - latencies[-1]))
+    return latencies
+
+
+async def login_storm(client: httpx.AsyncClient, emails: list[str], duration: float, concurrency: int) -> Counter:
+    statuses: Counter = Counter()
+    deadline = time.perf_counter() + duration
+
+    async def worker(n: int) -> None:
+        while time.perf_counter() < deadline:
+            r = await client.post("/api/v1/auth/login", json={"email": emails[n % len(emails)], "password": PASSWORD})
+            statuses[r.status_code] += 1
+            if r.status_code == 429:
+                await asyncio.sleep(0.05)
+
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    return statuses
+
+
+def summary(label: str, latencies: list[float], statuses: Counter | None) -> str:
+    quantiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    logins = ", ".join(f"{code}: {count}" for code, count in sorted(statuses.items())) if statuses else "-"
+    return (
+        f"{label:>14} {quantiles[49] * 1000:>8.1f} {quantiles[94] * 1000:>8.1f}"
+        f" {max(latencies) * 1000:>8.1f}   {logins}"
+    )
+
+
+async def run(args: argparse.Namespace, inline: bool) -> list[str]:
+    port = free_port()
+    command = [sys.executable, "-m", "benchmarks.bench_login_storm", "--serve", str(port)]
+    server = subprocess.Popen(command + (["--inline"] if inline else []))
+    limits = httpx.Limits(max_connections=args.concurrency + 4)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=120, limits=limits) as client:
+            await wait_ready(client)
+            token = await register(client, "chat@example.com")
+            emails = [f"storm{i}@example.com" for i in range(args.storm_users)]
+            for email in emails:
+                await register(client, email)
+            mode = "inline" if inline else "pool"
+            quiet = await chat_traffic(client, token, args.duration, args.interval)
+            stormy, statuses = await asyncio.gather(
+                chat_traffic(client, token, args.duration, args.interval),
+                login_storm(client, emails, args.duration, args.concurrency),
+            )
+            return [summary(f"{mode} quiet", quiet, None), summary(f"{mode} storm", stormy, statuses)]
+    finally:
+        server.terminate()
+        server.wait()
+
+
+async def main(args: argparse.Namespace) -> None:
+    rows = await run(args, inline=False) + await run(args, inline=True)
+    print(f"{args.concurrency} concurrent logins, chat request every {args.interval * 1000:.0f} ms, {args.duration:.0f} s per phase")
+    print(f"{'phase':>14} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}   logins by status")
+    for row in rows:
+        print(row)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per phase")
+    parser.add_argument("--interval", type=float, default=0.05, help="seconds between chat requests")
+    parser.add_argument("--concurrency", type=int, default=32, help="clients logging in at once")
+    parser.add_argument("--storm-users", type=int, default=8)
+    parser.add_argument("--serve", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    parser.add_argument("--inline", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args.serve, args.inline)
+    else:
+        asyncio.run(main(args))
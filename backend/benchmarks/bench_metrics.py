@@ -0,0 +1,72 @@
+"""Cost of the /metrics instrumentation on the hot path.
+
+Times --ops calls of each operation a request makes: Histogram.observe, a
+`with Histogram.time(...)` block around nothing, and Counter.inc. Each runs on
+one thread and then on --threads threads at once, so the locks are contended.
+It also times one render_metrics() over every stage series (a scrape). Compare
+the per-call cost with the stages being timed: embedding a query or calling the
+LLM takes milliseconds to seconds, and a chat request makes about ten calls.
+
+    cd backend && python -m benchmarks.bench_metrics --ops 1000000 --threads 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import threading
+import time
+
+from benchmarks.common import isolate_data_dir
+
+isolate_data_dir()
+
+from app.core.metrics import CHAT_STAGE_SECONDS, ERRORS, INGEST_STAGE_SECONDS, render_metrics  # noqa: E402
+
+
+def observe(n: int) -> None:
+    for i in range(n):
+        CHAT_STAGE_SECONDS.observe("embed", (i % 1000) * 1e-4)
+
+
+def timer(n: int) -> None:
+    for _ in range(n):
+        with CHAT_STAGE_SECONDS.time("vector_search"):
+            pass
+
+
+def counter(n: int) -> None:
+    for _ in range(n):
+        ERRORS.inc("embedding")
+
+
+def per_call_ns(fn, ops: int, threads: int) -> float:
+    per_thread = ops // threads
+    workers = [threading.Thread(target=fn, args=(per_thread,)) for _ in range(threads)]
+    t0 = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return (time.perf_counter() - t0) / (per_thread * threads) * 1e9
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ops", type=int, default=1_000_000)
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"{args.ops:,} calls per row")
+    print(f"{'operation':>22} {'1 thread ns':>12} {f'{args.threads} threads ns':>14}")
+    for label, fn in (("Histogram.observe", observe), ("with Histogram.time()", timer), ("Counter.inc", counter)):
+        print(f"{label:>22} {per_call_ns(fn, args.ops, 1):>12.0f} {per_call_ns(fn, args.ops, args.threads):>14.0f}")
+
+    for stage in ("extract", "chunk", "embed", "store"):
+        INGEST_STAGE_SECONDS.observe(stage, 0.01)
+    t0 = time.perf_counter()
+    text = render_metrics()
+    print(f"render_metrics: {(time.perf_counter() - t0) * 1000:.2f} ms for {len(text.splitlines())} lines")
+
+
+if __name__ == "__main__":
+    main()
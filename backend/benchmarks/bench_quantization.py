@@ -0,0 +1,93 @@
+"""Quantized NumPy index: memory per chunk and recall@k vs. full-precision search.
+
+Builds one NumpyEngine per storage mode over the same clustered 384-d unit vectors
+(see common.clustered_vectors) and compares each one's top-k with exact float32
+cosine top-k computed directly in NumPy:
+
+- float32 (baseline; recall is 1.0 by construction)
+- float16
+- int8 (scalar quantization, one float32 scale per vector)
+- float16 / int8 + rescore: shortlist top_k * --rescore on the quantized matrix,
+  re-rank with the float32 copies in full.bin
+
+"bytes/chunk" is what the scanned matrix costs per row (the part that has to stay
+in RAM for fast search); the float32 rescoring copies stay on disk and only the
+shortlisted rows are read, so they are reported separately as "disk/chunk".
+
+    cd backend && python -m benchmarks.bench_quantization --chunks 100000 --k 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import time
+
+import numpy as np
+
+from benchmarks.common import clustered_vectors, isolate_data_dir
+
+tmp = isolate_data_dir()
+
+from app.services.numpy_engine import NumpyEngine  # noqa: E402
+
+BATCH = 5000
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int) -> list[set[int]]:
+    qn = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    scores = qn @ vectors.T
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return [set(row.tolist()) for row in top]
+
+
+def build(name: str, dtype: str, rescore: int, vectors: np.ndarray) -> NumpyEngine:
+    engine = NumpyEngine(os.path.join(tmp, name), dtype=dtype, rescore_factor=rescore).open()
+    for start in range(0, len(vectors), BATCH):
+        rows = range(start, min(start + BATCH, len(vectors)))
+        engine.add([str(i) for i in rows], vectors[start:rows.stop], [{"document_id": 0}] * len(rows), [""] * len(rows))
+    return engine
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=100000)
+    parser.add_argument("--documents", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rescore", type=int, default=4, help="shortlist factor for the rescoring runs")
+    args = parser.parse_args()
+
+    vectors, queries = clustered_vectors(args.chunks, args.documents, args.queries)
+    truth = exact_top_k(vectors, queries, args.k)
+    modes = [
+        ("float32", "float32", 0),
+        ("float16", "float16", 0),
+        ("int8", "int8", 0),
+        (f"float16+rescore x{args.rescore}", "float16", args.rescore),
+        (f"int8+rescore x{args.rescore}", "int8", args.rescore),
+    ]
+    print(f"{args.chunks} chunks, {args.queries} queries, recall@{args.k} vs exact float32")
+    print(f"{'mode':>20} {'bytes/chunk':>12} {'disk/chunk':>11} {'recall':>7} {'p50 ms':>7} {'p95 ms':>7}")
+    for index, (label, dtype, rescore) in enumerate(modes):
+        engine = build(f"index{index}", dtype, rescore, vectors)
+        engine.search(queries[0], args.k)  # warm the page cache
+        latencies, recalls = [], []
+        for q, expected in zip(queries, truth):
+            t0 = time.perf_counter()
+            hits = engine.search(q, args.k)
+            latencies.append(time.perf_counter() - t0)
+            recalls.append(len({int(h["id"]) for h in hits} & expected) / args.k)
+        stats = engine.stats()
+        disk = stats["full_precision_bytes"] // max(1, stats["capacity"])
+        quantiles = statistics.quantiles(latencies, n=100)
+        print(
+            f"{label:>20} {stats['bytes_per_chunk']:>12} {disk:>11} {statistics.mean(recalls):>7.3f}"
+            f" {quantiles[49] * 1000:>7.2f} {quantiles[94] * 1000:>7.2f}"
+        )
+        engine.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Scoped similarity_search latency as the corpus grows.
+
+A chat request with document_ids / collection only searches those documents. This
+grows one corpus in steps (--sizes, in chunks; --per-doc chunks per document,
+--group-docs documents per collection) and, at each step, times queries scoped to
+one whole collection and to --scope random documents on:
+
+- chroma-where: the global Chroma collection with a `where` document_id filter
+- chroma-partitioned: per-collection Chroma partitions (CHROMA_GROUP_PARTITIONS):
+  one query for a collection scope; other scopes fall back to chroma-where
+- numpy: the NumPy engine's per-document row ranges
+
+Partitioned engines should stay flat as the corpus grows; the `where` filter does not.
+
+    cd backend && python -m benchmarks.bench_scoped_retrieval --sizes 2000,8000,32000 --scope 2
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import time
+
+import numpy as np
+
+from benchmarks.common import clustered_vectors, isolate_data_dir
+
+tmp = isolate_data_dir()
+
+from app.services.chroma_engine import ChromaEngine  # noqa: E402
+from app.services.numpy_engine import NumpyEngine  # noqa: E402
+
+BATCH = 1000
+
+
+def grow(engine, vectors: np.ndarray, start: int, stop: int, per_doc: int, group_docs: int) -> None:
+    for begin in range(start, stop, BATCH):
+        rows = range(begin, min(begin + BATCH, stop))
+        engine.add(
+            [f"{i // per_doc}_{i}" for i in rows],
+            vectors[begin:rows.stop],
+            [
+                {
+                    "document_id": i // per_doc,
+                    "chunk_index": i,
+                    "page_number": 1,
+                    "filename": "bench.pdf",
+                    "collection": f"group {i // per_doc // group_docs}",
+                }
+                for i in rows
+            ],
+            [f"chunk {i}" for i in rows],
+        )
+
+
+def time_scopes(engine, queries: list, scopes: list[list[int]], k: int) -> float:
+    """Median latency in ms."""
+    engine.search(queries[0], k, document_ids=scopes[0])  # warm caches
+    latencies = []
+    for q, scope in zip(queries, scopes):
+        t0 = time.perf_counter()
+        engine.search(q, k, document_ids=scope)
+        latencies.append(time.perf_counter() - t0)
+    return statistics.median(latencies) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="2000,8000,32000", help="corpus sizes in chunks, ascending")
+    parser.add_argument("--per-doc", type=int, default=200)
+    parser.add_argument("--group-docs", type=int, default=5, help="documents per collection")
+    parser.add_argument("--scope", type=int, default=2, help="documents per random-document scope")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",")]
+    largest = sizes[-1]
+    vectors, _ = clustered_vectors(largest, -(-largest // args.per_doc), 0)
+    rng = np.random.default_rng(1)
+
+    # Separate Chroma directories: the partitions flag is stored per collection
+    engines = {
+        "chroma-where": ChromaEngine(os.path.join(tmp, "chroma-where"), partitions=False),
+        "chroma-partitioned": ChromaEngine(os.path.join(tmp, "chroma-partitioned"), partitions=True),
+        "numpy": NumpyEngine(os.path.join(tmp, "numpy_index")),
+    }
+    for engine in engines.values():
+        engine.open()
+
+    print(
+        f"{args.group_docs} documents x {args.per_doc} chunks per collection, random scope {args.scope} documents,"
+        f" k={args.k}, {args.queries} queries per step; p50 ms"
+    )
+    print(f"{'chunks':>8} {'scope':>10} " + " ".join(f"{name:>20}" for name in engines))
+    loaded = 0
+    for size in sizes:
+        for engine in engines.values():
+            grow(engine, vectors, loaded, size, args.per_doc, args.group_docs)
+        loaded = size
+        documents = -(-size // args.per_doc)
+        groups = -(-documents // args.group_docs)
+        scope_sets = {
+            "collection": [
+                list(range(g * args.group_docs, min((g + 1) * args.group_docs, documents)))
+                for g in rng.integers(0, groups, args.queries)
+            ],
+            "documents": [
+                rng.choice(documents, size=min(args.scope, documents), replace=False).tolist()
+                for _ in range(args.queries)
+            ],
+        }
+        for label, scopes in scope_sets.items():
+            # Query near a chunk of the first scoped document
+            queries = [
+                vectors[min(size - 1, s[0] * args.per_doc + int(rng.integers(args.per_doc)))]
+                + 0.05 * rng.standard_normal(vectors.shape[1]).astype(np.float32)
+                for s in scopes
+            ]
+            row = [time_scopes(engine, queries, scopes, args.k) for engine in engines.values()]
+            print(f"{size:>8} {label:>10} " + " ".join(f"{ms:>20.2f}" for ms in row))
+
+    for engine in engines.values():
+        engine.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""similarity_search latency: Chroma vs. the NumPy engine, unfiltered and per document.
+
+Clustered unit vectors (384-d, like all-MiniLM-L6-v2; one cluster per document) are
+spread over --documents documents and loaded into both engines through the same add_chunks-style batches.
+Queries are timed end to end through engine.search (including metadata/text fetch).
+Recall@k of Chroma's approximate HNSW search is measured against the NumPy engine's
+exact results.
+
+    cd backend && python -m benchmarks.bench_vector_engines --chunks 20000 --queries 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import time
+
+import numpy as np
+
+from benchmarks.common import clustered_vectors, isolate_data_dir
+
+tmp = isolate_data_dir()
+
+from app.services.chroma_engine import ChromaEngine  # noqa: E402
+from app.services.numpy_engine import SUPPORTED_DTYPES, NumpyEngine  # noqa: E402
+
+BATCH = 1000
+
+
+def load(engine, vectors: np.ndarray, documents: int) -> float:
+    t0 = time.perf_counter()
+    per_doc = -(-len(vectors) // documents)
+    for start in range(0, len(vectors), BATCH):
+        rows = range(start, min(start + BATCH, len(vectors)))
+        engine.add(
+            [f"{i // per_doc}_{i}" for i in rows],
+            vectors[start:rows.stop],
+            [{"document_id": i // per_doc, "chunk_index": i, "page_number": 1, "filename": "bench.pdf"} for i in rows],
+            [f"chunk {i}" for i in rows],
+        )
+    return time.perf_counter() - t0
+
+
+def timed_search(engine, queries: np.ndarray, k: int, document_ids: list[int | None]) -> tuple[list[float], list[list[str]]]:
+    latencies, results = [], []
+    for q, document_id in zip(queries, document_ids):
+        t0 = time.perf_counter()
+        hits = engine.search(q, k, document_ids=None if document_id is None else [document_id])
+        latencies.append(time.perf_counter() - t0)
+        results.append([h["id"] for h in hits])
+    return latencies, results
+
+
+def ms(values: list[float], pct: float) -> float:
+    return statistics.quantiles(values, n=100)[int(pct) - 1] * 1000 if len(values) > 1 else values[0] * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--documents", type=int, default=100)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--dtype", default="float32", choices=list(SUPPORTED_DTYPES))
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors, queries = clustered_vectors(args.chunks, args.documents, args.queries)
+    scoped = [int(d) for d in rng.integers(0, args.documents, args.queries)]
+
+    engines = {"chroma": ChromaEngine(), "numpy": NumpyEngine(os.path.join(tmp, "numpy_index"), dtype=args.dtype)}
+    print(f"{args.chunks} chunks in {args.documents} documents, {args.queries} queries, k={args.k}")
+    print(f"{'engine':>8} {'load s':>8} {'all p50 ms':>11} {'all p95 ms':>11} {'doc p50 ms':>11} {'doc p95 ms':>11}")
+    results = {}
+    for name, engine in engines.items():
+        engine.open()
+        load_s = load(engine, vectors, args.documents)
+        engine.search(queries[0], args.k)  # warm caches
+        all_lat, all_ids = timed_search(engine, queries, args.k, [None] * args.queries)
+        doc_lat, _ = timed_search(engine, queries, args.k, scoped)
+        results[name] = all_ids
+        print(
+            f"{name:>8} {load_s:>8.1f} {ms(all_lat, 50):>11.2f} {ms(all_lat, 95):>11.2f}"
+            f" {ms(doc_lat, 50):>11.2f} {ms(doc_lat, 95):>11.2f}"
+        )
+        engine.close()
+
+    recall = statistics.mean(
+        len(set(approx) & set(exact)) / max(1, len(exact)) for approx, exact in zip(results["chroma"], results["numpy"])
+    )
+    print(f"chroma recall@{args.k} vs exact: {recall:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Shared helpers for benchmarks: isolated data dirs and a model-free embedder."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+
+EMBED_DIM = 384  # all-MiniLM-L6-v2
+
+
+def isolate_data_dir(prefix: str = "rag-bench-") -> str:
+    """Point DB, vector stores, caches and uploads at a temp dir. Call before importing app modules."""
+    tmp = tempfile.mkdtemp(prefix=prefix)
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tmp}/rag.db"
+    os.environ["VECTOR_STORE_PATH"] = os.path.join(tmp, "chroma")
+    os.environ["UPLOAD_DIR"] = os.path.join(tmp, "uploads")
+    os.environ["EMBEDDING_CACHE_PATH"] = os.path.join(tmp, "embedding_cache.sqlite3")
+    os.environ["NUMPY_INDEX_PATH"] = os.path.join(tmp, "numpy_index")
+    os.environ["DEBUG"] = "false"
+    os.environ.setdefault("ANONYMIZED_TELEMETRY", "FALSE")
+    return tmp
+
+
+def hash_embed(texts: list[str]) -> np.ndarray:
+    """Deterministic unit vectors derived from the text (stands in for the model)."""
+    out = np.empty((len(texts), EMBED_DIM), dtype=np.float32)
+    for i, text in enumerate(texts):
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        v = np.random.default_rng(seed).standard_normal(EMBED_DIM).astype(np.float32)
+        out[i] = v / np.linalg.norm(v)
+    return out
+
+
+def clustered_vectors(chunks: int, documents: int, queries: int, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    """Unit vectors with one cluster per document (chunk i belongs to document i // per_doc),
+    plus queries that land near existing chunks, like questions about a passage.
+    Neighbourhoods look like real embeddings rather than uniform noise."""
+    rng = np.random.default_rng(seed)
+    per_doc = -(-chunks // documents)
+    centers = rng.standard_normal((documents, EMBED_DIM)).astype(np.float32)
+    vectors = centers[np.arange(chunks) // per_doc] + 0.8 * rng.standard_normal((chunks, EMBED_DIM)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    picked = vectors[rng.integers(0, chunks, queries)]
+    return vectors, picked + 0.05 * rng.standard_normal((queries, EMBED_DIM)).astype(np.float32)
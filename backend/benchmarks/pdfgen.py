@@ -0,0 +1,50 @@
+"""Generate simple text-only PDFs for benchmarks (no extra dependencies)."""
+
+from __future__ import annotations
+
+import random
+
+WORDS = (
+    "manual device error code clause section install configure reset network power "
+    "warranty sensor module firmware update procedure safety voltage cable port status"
+).split()
+
+
+def page_text(page: int, words: int = 350, seed: int = 0) -> str:
+    rng = random.Random(seed * 100_003 + page)
+    return f"Page {page}. " + " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def make_pdf(pages: list[str]) -> bytes:
+    """Build a minimal PDF with one Helvetica text page per string."""
+    n = len(pages)
+    font_obj = 3 + 2 * n
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [%s] /Count %d >>" % (" ".join(f"{3 + 2 * i} 0 R" for i in range(n)), n),
+    ]
+    for i, text in enumerate(pages):
+        lines = [text[j:j + 90] for j in range(0, len(text), 90)]
+        escaped = (ln.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") for ln in lines)
+        ops = "BT /F1 9 Tf 20 780 Td 11 TL " + " ".join(f"({ln}) '" for ln in escaped) + " ET"
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {4 + 2 * i} 0 R "
+            f"/Resources << /Font << /F1 {font_obj} 0 R >> >> >>"
+        )
+        objects.append(f"<< /Length {len(ops)} >>\nstream\n{ops}\nendstream")
+    objects.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for k, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{k} 0 obj\n{obj}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    out += "".join(f"{o:010d} 00000 n \n" for o in offsets).encode("latin-1")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    return bytes(out)
+
+
+def make_document(n_pages: int, words_per_page: int = 350, seed: int = 0) -> bytes:
+    return make_pdf([page_text(p, words_per_page, seed) for p in range(1, n_pages + 1)])
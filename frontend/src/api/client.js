@@ -32,17 +32,35 @@ export const auth = {
 };
 
 export const chat = {
-  send: (question) => client.post("/chat/", { question }),
-  history: (limit = 50) => client.get("/chat/history", { params: { limit } }),
+  // scope (optional): { document_ids: [..] } and/or { collection: "name" }
+  send: (question, scope = {}) => client.post("/chat/", { question, ...scope }),
+  // NDJSON: one {index, question, response, sources, context} line per answer, in completion order
+  batch: (questions, scope = {}, saveHistory = true) =>
+    client.post("/chat/batch", { questions, save_history: saveHistory, ...scope }, { responseType: "text" }),
+  // Newest first; pass the previous response's next_cursor to load older chats
+  history: (limit = 50, cursor) => client.get("/chat/history", { params: cursor ? { limit, cursor } : { limit } }),
+  // Admin only: NDJSON, one chat per line (userId omitted = every user)
+  export: (userId) =>
+    client.get("/chat/export", { params: userId != null ? { user_id: userId } : {}, responseType: "blob" }),
 };
 
 export const documents = {
-  list: () => client.get("/documents/"),
-  upload: (file) => {
+  list: (collection) => client.get("/documents/", { params: collection ? { collection } : {} }),
+  upload: (file, collection) => {
     const form = new FormData();
     form.append("file", file);
+    if (collection) form.append("collection", collection);
     return client.post("/documents/upload", form, {
       headers: { "Content-Type": "multipart/form-data" },
     });
   },
+  update: (id, file) => {
+    const form = new FormData();
+    form.append("file", file);
+    return client.put(`/documents/${id}`, form, {
+      headers: { "Content-Type": "multipart/form-data" },
+    });
+  },
+  job: (id) => client.get(`/documents/jobs/${id}`),
+  search: (q, cursor) => client.get("/documents/search", { params: { q, cursor } }),
 };
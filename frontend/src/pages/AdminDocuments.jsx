@@ -28,8 +28,13 @@ export default function AdminDocuments() {
     setUploading(true);
     try {
       const { data } = await docsApi.upload(file);
-      setUploadSuccess(`${data.filename} uploaded (${data.chunks} chunks).`);
+      if (data.duplicate) {
+        setUploadSuccess(data.message);
+        return;
+      }
+      setUploadSuccess(`${data.filename} queued for ingestion...`);
       setList((prev) => [{ id: data.id, filename: data.filename, uploaded_by: 0, upload_date: new Date().toISOString() }, ...prev]);
+      pollJob(data.job_id, data.filename);
     } catch (err) {
       setError(err.response?.data?.detail || "Upload failed");
     } finally {
@@ -38,6 +43,26 @@ export default function AdminDocuments() {
     }
   };
 
+  const pollJob = async (jobId, filename) => {
+    try {
+      const { data: job } = await docsApi.job(jobId);
+      if (job.status === "succeeded") {
+        const reused = job.chunks_reused ? `, ${job.chunks_reused} reused from cache` : "";
+        setUploadSuccess(`${filename} ingested (${job.chunks_total} chunks${reused}).`);
+      } else if (job.status === "failed") {
+        setUploadSuccess("");
+        setError(job.error || "Ingestion failed");
+      } else {
+        setUploadSuccess(
+          `${filename}: ${job.status} (pages ${job.pages_parsed}/${job.pages_total}, chunks ${job.chunks_embedded}/${job.chunks_total})`
+        );
+        setTimeout(() => pollJob(jobId, filename), 1000);
+      }
+    } catch {
+      setError("Failed to load ingestion status");
+    }
+  };
+
   const formatDate = (d) => {
     try {
       return new Date(d).toLocaleString();